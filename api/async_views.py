@@ -0,0 +1,150 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.response import Response
+
+ASYNC_METHODS = ('GET', 'HEAD')
+
+
+class AsyncReadMixin:
+    """
+    Serve GET and HEAD of a DRF generic view as a coroutine under ASGI.
+
+    Lookups, counts and page fetches use Django's async ORM; steps that
+    may query the database from plain Python (authentication, filter
+    backends, serializers loading viewer state) run via sync_to_async.
+    Other methods go through the regular sync view, and responses are
+    identical to it. Views with a custom `list` or `retrieve` override
+    `alist` or `aretrieve` to match.
+
+    Only active with the API_ASYNC_VIEWS setting; under WSGI the plain
+    sync view is returned, since every request would otherwise pay for
+    the hops between the event loop and the thread pool.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        sync_view = super().as_view(**initkwargs)
+        if not getattr(settings, 'API_ASYNC_VIEWS', False):
+            return sync_view
+        run_sync = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if request.method not in ASYNC_METHODS:
+                return await run_sync(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        # cls, initkwargs, csrf_exempt, login_required, ...
+        view.__dict__.update(sync_view.__dict__)
+        view.__doc__ = sync_view.__doc__
+        view.__module__ = sync_view.__module__
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        # Mirrors APIView.dispatch
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.aget(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget(self, request, *args, **kwargs):
+        if isinstance(self, ListModelMixin):
+            return await self.alist(request, *args, **kwargs)
+        if isinstance(self, RetrieveModelMixin):
+            return await self.aretrieve(request, *args, **kwargs)
+        return await sync_to_async(self.get)(request, *args, **kwargs)
+
+    async def aserialize(self, instance, **kwargs):
+        def serialize():
+            return self.get_serializer(instance, **kwargs).data
+        return await sync_to_async(serialize)()
+
+    async def afilter_queryset(self, queryset):
+        # Filter backends such as the in-process search index may query
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        paginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if paginate is not None:
+            return await paginate(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(
+            queryset, self.request, view=self)
+
+    async def aget_object(self):
+        # Mirrors GenericAPIView.get_object
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                "No %s matches the given query."
+                % queryset.model._meta.object_name)
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            data = await self.aserialize(page, many=True)
+            return self.get_paginated_response(data)
+
+        objects = [obj async for obj in queryset]
+        return Response(await self.aserialize(objects, many=True))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(await self.aserialize(instance))
+
+
+async def apaginate_pages(paginator, queryset, request, view=None):
+    """
+    PageNumberPagination.paginate_queryset with the count and the page
+    fetched through the async ORM.
+    """
+    paginator.request = request
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+
+    try:
+        page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        msg = paginator.invalid_page_message.format(
+            page_number=page_number, message=str(exc)
+        )
+        raise NotFound(msg)
+    page.object_list = [obj async for obj in page.object_list]
+    paginator.page = page
+
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+
+    return list(page)
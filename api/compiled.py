@@ -0,0 +1,268 @@
+import functools
+import types
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from interactions.viewer_state import get_viewer_state
+from .pagination import KeysetPagination
+from .renderers import fast_path_enabled
+
+_TEXT = (models.CharField, models.TextField)
+# Serializer fields whose to_representation returns these model fields'
+# database values unchanged
+PASSTHROUGH_FIELDS = {
+    serializers.BooleanField: models.BooleanField,
+    serializers.CharField: _TEXT,
+    serializers.ChoiceField: _TEXT,
+    serializers.EmailField: _TEXT,
+    serializers.IntegerField: models.IntegerField,
+    serializers.ReadOnlyField: models.Field,
+    PrimaryKeyRelatedField: models.ForeignKey,
+}
+
+# Generated functions compiled per source. ?fields=, ?exclude= and
+# ?expand= choose the shape, so the number of sources is bounded here
+CODE_CACHE_SIZE = 256
+
+
+class Unsupported(Exception):
+    """The serializer has a field the compiler can't reproduce"""
+
+
+def _model_field(model, path):
+    # Concrete field at the end of a lookup path over forward foreign keys
+    parts = path.split('__')
+    for part in parts[:-1]:
+        field = model._meta.get_field(part)
+        if not field.many_to_one:
+            raise Unsupported(path)
+        model = field.related_model
+    field = model._meta.get_field(parts[-1])
+    if not field.concrete or field.many_to_many:
+        raise Unsupported(path)
+    return field
+
+
+def _converter(field, model_field):
+    if isinstance(model_field, models.FileField):
+        # File fields render the FieldFile a model instance would hold
+        attr_class = model_field.attr_class
+        return lambda name: field.to_representation(
+            attr_class(None, model_field, name))
+    if isinstance(model_field, PASSTHROUGH_FIELDS.get(type(field), ())):
+        return None
+    return field.to_representation
+
+
+def _attributes(model, prefix, paths):
+    """(attribute, column) pairs standing in for an instance's attributes"""
+    pk = model._meta.pk
+    pairs = [('pk', prefix + pk.name), (pk.attname, prefix + pk.name)]
+    for path in paths:
+        if '__' in path:
+            raise Unsupported(path)
+        pairs.append((_model_field(model, path).attname, prefix + path))
+    return pairs
+
+
+def _row_caller(function, pairs):
+    # Call a method or property getter with the row's columns as attributes
+    def call(row):
+        return function(types.SimpleNamespace(
+            **{attr: row[column] for attr, column in pairs}))
+    return call
+
+
+@functools.lru_cache(maxsize=CODE_CACHE_SIZE)
+def _compile_source(source):
+    return compile(source, '<compiled serializer>', 'exec')
+
+
+def _generate(items):
+    """
+    A function building the serializer's dict from a .values() row, with
+    one dict display instead of a loop over fields.
+    """
+    namespace = {}
+    entries = []
+    for i, (name, kind, column, function) in enumerate(items):
+        if function is not None:
+            namespace[f'f{i}'] = function
+        if kind == 'value' and function is None:
+            expr = f'row[{column!r}]'
+        elif kind == 'value':
+            expr = f'(f{i}(v) if (v := row[{column!r}]) is not None else None)'
+        elif kind == 'nested':
+            expr = f'(f{i}(row) if row[{column!r}] is not None else None)'
+        else:
+            expr = f'f{i}(row)'
+        entries.append(f'        {name!r}: {expr},\n')
+    source = 'def to_dict(row):\n    return {\n' + ''.join(entries) + '    }\n'
+    exec(_compile_source(source), namespace)
+    return namespace['to_dict']
+
+
+def _compile(serializer, prefix=''):
+    """(to_dict, columns) for a bound ModelSerializer, columns under `prefix`"""
+    model = serializer.Meta.model
+    field_columns = getattr(serializer.Meta, 'field_columns', {})
+    columns = [prefix + model._meta.pk.name]
+    items = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            if not isinstance(field, serializers.ModelSerializer):
+                raise Unsupported(name)
+            path = '__'.join(field.source_attrs)
+            if not _model_field(model, path).many_to_one:
+                raise Unsupported(name)
+            to_dict, nested_columns = _compile(field, f'{prefix}{path}__')
+            columns += [prefix + path, *nested_columns]
+            items.append((name, 'nested', prefix + path, to_dict))
+            continue
+
+        if isinstance(field, serializers.SerializerMethodField):
+            pairs = _attributes(model, prefix, field_columns.get(name, ()))
+            columns += [column for _, column in pairs]
+            method = getattr(field.parent, field.method_name)
+            items.append((name, 'call', None, _row_caller(method, pairs)))
+            continue
+        if field.source == '*':
+            raise Unsupported(name)
+
+        path = '__'.join(field.source_attrs)
+        try:
+            model_field = _model_field(model, path)
+        except FieldDoesNotExist:
+            # Model properties, reading the columns from Meta.field_columns
+            prop = getattr(model, path, None)
+            if (type(field) is not serializers.ReadOnlyField
+                    or not isinstance(prop, property) or name not in field_columns):
+                raise Unsupported(name)
+            pairs = _attributes(model, prefix, field_columns[name])
+            columns += [column for _, column in pairs]
+            items.append((name, 'call', None, _row_caller(prop.fget, pairs)))
+            continue
+        if model_field.many_to_one and type(field) is not PrimaryKeyRelatedField:
+            raise Unsupported(name)
+        columns.append(prefix + path)
+        items.append((name, 'value', prefix + path, _converter(field, model_field)))
+
+    return _generate(items), columns
+
+
+class CompiledSerializer:
+    """
+    A list serializer's child turned into one function from .values() rows
+    to dicts, equal to what the serializer renders for the model instances.
+
+    Skips building model instances and DRF's per-field get_attribute /
+    to_representation dispatch: plain columns are copied as they are, and
+    only fields that format their value (dates, files, image variants,
+    method fields) call into the serializer. Viewer state is still loaded
+    in bulk through the child's load_viewer_state().
+    """
+
+    def __init__(self, list_serializer):
+        self.serializer = list_serializer
+        self.child = list_serializer.child
+        self.to_dict, columns = _compile(self.child)
+        self.columns = list(dict.fromkeys(columns))
+        model = self.child.Meta.model
+        self.attributes = _attributes(
+            model, '', [c for c in self.columns if '__' not in c])
+
+    def values(self, queryset, keep=()):
+        """`queryset` as the rows to_dict() reads, plus the `keep` columns"""
+        model = queryset.model
+        columns = list(self.columns)
+        for name in keep:
+            if not isinstance(name, str):
+                continue
+            name = name.lstrip('-')
+            if name in queryset.query.annotations:
+                columns.append(name)
+                continue
+            try:
+                _model_field(model, name)
+            except (FieldDoesNotExist, Unsupported):
+                continue
+            if '__' not in name:
+                columns.append(name)
+        return queryset.prefetch_related(None).values(*dict.fromkeys(columns))
+
+    def render(self, rows):
+        load = getattr(self.child, 'load_viewer_state', None)
+        if load is not None:
+            load(get_viewer_state(self.child.context), [
+                types.SimpleNamespace(
+                    **{attr: row[column] for attr, column in self.attributes})
+                for row in rows
+            ])
+        to_dict = self.to_dict
+        return ReturnList([to_dict(row) for row in rows], serializer=self.serializer)
+
+
+def compile_serializer(list_serializer):
+    """A CompiledSerializer, or None if the child has unsupported fields"""
+    try:
+        return CompiledSerializer(list_serializer)
+    except (Unsupported, FieldDoesNotExist):
+        return None
+
+
+class CompiledRows:
+    # What get_serializer() returns for rows: just the rendered .data
+    def __init__(self, compiled, rows):
+        self.compiled = compiled
+        self.instance = rows
+
+    @property
+    def data(self):
+        return self.compiled.render(self.instance)
+
+
+class CompiledListMixin:
+    """
+    View mixin serving list GETs through a CompiledSerializer: the queryset
+    is read with .values() and get_serializer(many=True) renders the rows
+    without model instances. Falls back to the regular serializer when it
+    can't be compiled or API_FAST_PATH is off. Views overriding `list`
+    pass their queryset through compiled_queryset().
+    """
+
+    def get_compiled_serializer(self):
+        if not hasattr(self, '_compiled_serializer'):
+            compiled = None
+            if fast_path_enabled() and self.request.method in SAFE_METHODS:
+                compiled = compile_serializer(super().get_serializer(many=True))
+            self._compiled_serializer = compiled
+        return self._compiled_serializer
+
+    def compiled_queryset(self, queryset):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return queryset
+        # Columns the ordering and keyset cursors read from each row
+        keep = [*queryset.query.order_by, *queryset.model._meta.ordering]
+        keep += getattr(self, 'cursor_ordering', None) or KeysetPagination.ordering
+        return compiled.values(queryset, keep)
+
+    def filter_queryset(self, queryset):
+        return self.compiled_queryset(super().filter_queryset(queryset))
+
+    def get_serializer(self, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is not None and args and kwargs.get('many'):
+            rows = list(args[0])
+            if all(isinstance(row, dict) for row in rows):
+                return CompiledRows(compiled, rows)
+            args = (rows, *args[1:])
+        return super().get_serializer(*args, **kwargs)
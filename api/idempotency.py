@@ -0,0 +1,89 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Seconds a key stays locked while its first request runs
+LOCK_TIMEOUT = 30
+
+
+def idempotency_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def _cache_key(request, key):
+    user_id = getattr(request.user, 'pk', None)
+    raw = f'{user_id}:{request.method}:{request.path}:{key}'
+    return 'idempotency:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _body_hash(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def _replay(stored, body_hash):
+    # Responses stored before bodies were hashed carry no hash
+    if stored.get('body', body_hash) != body_hash:
+        return Response({
+            "error": f"{IDEMPOTENCY_HEADER} was already used with a different request body."
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(stored['data'], status=stored['status'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Let clients retry a write safely by sending an Idempotency-Key header.
+
+    The first response for a key is stored for IDEMPOTENCY_KEY_TTL seconds
+    and returned again for repeats of the same method and path by the same
+    user, without running the handler. A repeat with a different body gets
+    422, and one that arrives while the first request is still running
+    gets 409. Requests without the header run normally; server errors are
+    never stored.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                "error": f"{IDEMPOTENCY_HEADER} may be at most {MAX_KEY_LENGTH} characters."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = _cache_key(request, key)
+        body_hash = _body_hash(request)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, body_hash)
+
+        lock = f'{cache_key}:lock'
+        if not cache.add(lock, True, LOCK_TIMEOUT):
+            # The first request may have finished in between
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _replay(stored, body_hash)
+            return Response({
+                "error": "A request with this Idempotency-Key is still being processed."
+            }, status=status.HTTP_409_CONFLICT)
+        try:
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code < 500 and hasattr(response, 'data'):
+                cache.set(cache_key, {
+                    'status': response.status_code,
+                    'data': response.data,
+                    'body': body_hash,
+                }, idempotency_ttl())
+        finally:
+            cache.delete(lock)
+        return response
+
+    return wrapper
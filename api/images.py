@@ -0,0 +1,185 @@
+import hashlib
+import io
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from tasks.queue import enqueue, task
+from .renderers import float_free
+
+# Pillow format and save options per variant format
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+
+# (model label, field) -> (variants field, callback run with the pk once
+# variants are stored)
+_watched = {}
+
+
+def variant_widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 320, 640, 1280))
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.open('rb')
+    try:
+        for chunk in file.chunks():
+            digest.update(chunk)
+    finally:
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(file, storage=default_storage):
+    """
+    Resized WebP and JPEG copies of an image file, as
+    {format: {width: storage name}}.
+
+    Variants are stored under the SHA-256 of the original bytes, so the
+    same picture uploaded twice is only processed and stored once.
+    """
+    digest = content_hash(file)
+    prefix = f'{VARIANTS_DIR}/{digest[:2]}/{digest}'
+    manifest_name = f'{prefix}/manifest.json'
+    if storage.exists(manifest_name):
+        with storage.open(manifest_name) as manifest:
+            return json.load(manifest)
+
+    with Image.open(file) as original:
+        largest = max(variant_widths())
+        # JPEG decoders can scale down while decoding, which is much faster
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        # Never upscale; an image narrower than every width gets one variant
+        widths = [w for w in variant_widths() if w < image.width] or [image.width]
+        variants = {fmt: {} for fmt in FORMATS}
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in FORMATS:
+                name = storage.save(
+                    f'{prefix}/{width}.{fmt}', _encode(resized, fmt))
+                variants[fmt][str(width)] = name
+
+    storage.save(manifest_name, ContentFile(json.dumps(variants).encode()))
+    return variants
+
+
+@task('images.generate_variants')
+def generate_variants(model, pk, field, variants_field):
+    Model = apps.get_model(model)
+    instance = Model.objects.filter(pk=pk).only(field).first()
+    if instance is None:
+        return
+    file = getattr(instance, field)
+    if not file.name:
+        return
+
+    try:
+        variants = build_variants(file)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        # Retrying won't make an unreadable upload readable
+        variants = {'error': 'unreadable'}
+    variants['source'] = file.name
+
+    # Skip the write if a newer upload replaced the image meanwhile
+    updated = Model.objects.filter(pk=pk, **{field: file.name}).update(
+        **{variants_field: variants})
+    _, callback = _watched.get((model, field), (None, None))
+    if updated and callback:
+        callback(pk)
+
+
+def watch_image_field(model, field, variants_field, on_ready=None):
+    """
+    Queue variant generation whenever `field` of `model` gets a new file.
+
+    `variants_field` is a JSONField holding the result; `on_ready(pk)` runs
+    after it is stored, e.g. to drop cached responses.
+    """
+    label = model._meta.label
+    _watched[(label, field)] = (variants_field, on_ready)
+
+    def image_saved(sender, instance, update_fields=None, **kwargs):
+        if update_fields and field not in update_fields:
+            return
+        if field in instance.get_deferred_fields():
+            return
+        name = getattr(instance, field).name or ''
+        variants = getattr(instance, variants_field, None) or {}
+        if name == variants.get('source', ''):
+            return
+        if name:
+            enqueue('images.generate_variants', model=label, pk=instance.pk,
+                    field=field, variants_field=variants_field)
+        else:
+            # Image removed
+            model.objects.filter(pk=instance.pk).update(**{variants_field: {}})
+            setattr(instance, variants_field, {})
+
+    post_save.connect(
+        image_saved, sender=model, weak=False,
+        dispatch_uid=f'image-variants-{label}-{field}')
+
+
+def pending_variants():
+    """
+    Yield (model label, pk, field, variants field) for every stored image
+    whose variants are missing or were made from another file.
+    """
+    for (label, field), (variants_field, _) in _watched.items():
+        Model = apps.get_model(label)
+        rows = (
+            Model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values_list('pk', field, variants_field)
+        )
+        for pk, name, variants in rows.iterator(chunk_size=2000):
+            if (variants or {}).get('source') != name:
+                yield label, pk, field, variants_field
+
+
+@float_free
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Stored variants as absolute URLs plus a `srcset` string per format:
+    {"webp": {"160": url, ...}, "jpeg": {...}, "srcset": {"webp": "url 160w, ..."}}
+    Empty until the background worker has processed the image.
+    """
+
+    def to_representation(self, value):
+        if not value or 'error' in value:
+            return {}
+        request = self.context.get('request')
+        result = {'srcset': {}}
+        for fmt in FORMATS:
+            urls = {}
+            for width, name in value.get(fmt, {}).items():
+                url = default_storage.url(name)
+                urls[width] = request.build_absolute_uri(url) if request else url
+            result[fmt] = urls
+            result['srcset'][fmt] = ', '.join(
+                f'{url} {width}w' for width, url in
+                sorted(urls.items(), key=lambda item: int(item[0])))
+        return result
@@ -0,0 +1,132 @@
+from asgiref.sync import sync_to_async
+from rest_framework import pagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+def query_limit(request, default, maximum, param='limit'):
+    """
+    ?limit= for unpaginated top-N views, clamped to 1..maximum.
+
+    Raises a 400 ValidationError for a value that isn't an integer.
+    """
+    try:
+        limit = int(request.query_params.get(param, default))
+    except ValueError:
+        raise ValidationError({param: "Must be an integer."})
+    return max(1, min(limit, maximum))
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination over an indexed ordering with opaque cursor tokens.
+
+    Deep pages cost the same as the first one because there is no OFFSET
+    scan. The total is only counted when the client asks for it with
+    ?count=true.
+    """
+    ordering = ('-created_at', '-id')
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Include the total number of results.',
+            'schema': {'type': 'boolean'},
+        }]
+
+
+class SelectablePagination(pagination.BasePagination):
+    """
+    Page-number or keyset pagination, chosen per request.
+
+    Views pick their default with `pagination_mode` ('page', 'cursor', or
+    None for unpaginated). Clients override it with ?paginate=page|cursor;
+    sending a cursor token implies cursor mode.
+    """
+    mode_query_param = 'paginate'
+    modes = {
+        'page': pagination.PageNumberPagination,
+        'cursor': KeysetPagination,
+    }
+
+    def get_mode(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in self.modes:
+            return mode
+        if request.query_params.get(KeysetPagination.cursor_query_param):
+            return 'cursor'
+        return getattr(view, 'pagination_mode', 'page')
+
+    def select_paginator(self, request, view):
+        mode = self.get_mode(request, view)
+        if mode is None:
+            return None
+
+        paginator = self.modes[mode]()
+        # Views may declare their own keyset ordering
+        if mode == 'cursor' and getattr(view, 'cursor_ordering', None):
+            paginator.ordering = view.cursor_ordering
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.select_paginator(request, view)
+        if self.paginator is None:
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Used by api.async_views.AsyncReadMixin
+        from .async_views import apaginate_pages
+
+        self.paginator = self.select_paginator(request, view)
+        if self.paginator is None:
+            return None
+        if isinstance(self.paginator, pagination.PageNumberPagination):
+            return await apaginate_pages(self.paginator, queryset, request, view)
+        return await sync_to_async(self.paginator.paginate_queryset)(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return pagination.PageNumberPagination().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *pagination.PageNumberPagination().get_schema_operation_parameters(view),
+            *KeysetPagination().get_schema_operation_parameters(view),
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pagination style: "page" or "cursor".',
+                'schema': {'type': 'string', 'enum': list(self.modes)},
+            },
+        ]
+
+    def to_html(self):
+        return self.paginator.to_html() if self.paginator else ''
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
@@ -0,0 +1,145 @@
+from django.conf import settings
+from rest_framework import relations, serializers
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+_ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+def fast_path_enabled():
+    return getattr(settings, 'API_FAST_PATH', False)
+
+
+# to_representation methods that never return floats; Decimals and dates
+# they return go through default() and are checked there
+_NO_FLOATS = {
+    field.to_representation for field in (
+        serializers.BooleanField, serializers.CharField,
+        serializers.DateField, serializers.DateTimeField,
+        serializers.DecimalField, serializers.FileField,
+        serializers.IntegerField, serializers.TimeField,
+        serializers.UUIDField, relations.PrimaryKeyRelatedField,
+    )
+}
+
+
+def float_free(field_class):
+    """
+    Class decorator for serializer fields whose to_representation never
+    returns floats, so FastJSONRenderer skips checking their output.
+    """
+    _NO_FLOATS.add(field_class.to_representation)
+    return field_class
+
+
+_SEQUENCES = (list, tuple)
+_CONTAINERS = (dict, list, tuple)
+
+
+def _float_keys(serializer):
+    """
+    Keys of a serializer's output that can hold floats, or None if the
+    output has to be checked in full. Nested serializers count as such
+    keys and are checked in full.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.Serializer):
+        return None
+    return [
+        name for name, field in serializer.fields.items()
+        if not field.write_only
+        and type(field).to_representation not in _NO_FLOATS
+    ]
+
+
+def _children(container):
+    keys = _float_keys(getattr(container, 'serializer', None))
+    if isinstance(container, dict):
+        if keys is None:
+            return container.values()
+        return [container[key] for key in keys if key in container]
+    if keys is None:
+        return container
+    # Rows of a ReturnList
+    return [row[key] for row in container for key in keys if key in row]
+
+
+def _floats_match(data):
+    """
+    Whether orjson writes every float in `data` the way the json module
+    does. They only differ outside this range, where json switches to
+    exponent notation (1e-05, 1e+16); NaN and infinity fail too.
+
+    Goes level by level so the per-value work is done by comprehensions,
+    and serializer output (ReturnDict/ReturnList) only contributes the
+    keys its fields can fill with floats.
+    """
+    values = [data]
+    while values:
+        kinds = set(map(type, values))
+        if float in kinds and not all(
+                1e-4 <= abs(value) < 1e16
+                for value in values if type(value) is float and value):
+            return False
+        level = []
+        if dict in kinds:
+            level += [item for value in values if type(value) is dict
+                      for item in value.values()]
+        if list in kinds or tuple in kinds:
+            level += [item for value in values if type(value) in _SEQUENCES
+                      for item in value]
+        # ReturnDict, ReturnList and other subclasses
+        subclasses = tuple(
+            kind for kind in kinds
+            if issubclass(kind, _CONTAINERS) and kind not in _CONTAINERS)
+        if subclasses:
+            for value in [value for value in values if type(value) in subclasses]:
+                level.extend(_children(value))
+        values = level
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed.
+
+    Output is byte-for-byte the same as JSONRenderer's: dates, Decimals
+    and other types orjson would format differently go through the same
+    encoder class, and anything orjson can't reproduce exactly (indented
+    output, floats in exponent notation, non-string keys, huge integers)
+    falls back to the json module.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not fast_path_enabled()
+                or not (self.compact and self.strict and not self.ensure_ascii)
+                or self.get_indent(accepted_media_type, renderer_context or {})
+                is not None
+                or not _floats_match(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+
+        def default(obj):
+            value = encoder.default(obj)
+            if not _floats_match(value):
+                raise TypeError("Float needs the json module's formatting")
+            return value
+
+        try:
+            ret = orjson.dumps(data, default=default, option=_ORJSON_OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping of the JavaScript line terminators as JSONRenderer
+        return (
+            ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
+        )
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'users', 
     'interactions',
     'notifications',
+    'tasks',
     'rest_framework_simplejwt', 
     'rest_framework_simplejwt.token_blacklist',
     'django_filters',
@@ -64,6 +65,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'api.wsgi.application'
+ASGI_APPLICATION = 'api.asgi.application'
 
 
 # Database
@@ -154,7 +156,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.SelectablePagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend', 
@@ -173,6 +179,61 @@ SIMPLE_JWT = {
     # 'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
 
+# Recipe view counting: buffered views are written every N seconds, and
+# repeat views by the same viewer within the window count once
+RECIPE_VIEW_FLUSH_INTERVAL = config(
+    'RECIPE_VIEW_FLUSH_INTERVAL', default=10, cast=int)
+RECIPE_VIEW_DEDUP_WINDOW = config(
+    'RECIPE_VIEW_DEDUP_WINDOW', default=30 * 60, cast=int)
+
+# Dotted path to a recipe.search backend; empty picks one by database
+# vendor (MySQL FULLTEXT, PostgreSQL tsvector, in-process index otherwise)
+RECIPE_SEARCH_BACKEND = config('RECIPE_SEARCH_BACKEND', default='')
+
+# Home feed: 'read' merges followed authors' recipes on each request,
+# 'write' copies new recipes into followers' stored timelines, which are
+# capped at RECIPE_FEED_MAX_LENGTH entries (see trim_feeds)
+RECIPE_FEED_STRATEGY = config('RECIPE_FEED_STRATEGY', default='read')
+RECIPE_FEED_MAX_LENGTH = config('RECIPE_FEED_MAX_LENGTH', default=500, cast=int)
+
+# Background task queue (tasks app): failed tasks are retried with
+# exponential backoff up to this many attempts; run `manage.py run_tasks`
+TASK_MAX_ATTEMPTS = config('TASK_MAX_ATTEMPTS', default=5, cast=int)
+
+# Live recipe events (/api/recipes/<pk>/events/): dotted path to a
+# recipe.events broker, e.g. recipe.events.RedisBroker when running more
+# than one process, and seconds between keep-alive comments
+RECIPE_EVENTS_BROKER = config('RECIPE_EVENTS_BROKER', default='')
+RECIPE_EVENTS_KEEPALIVE = config('RECIPE_EVENTS_KEEPALIVE', default=15, cast=int)
+
+# Seconds the response to a write sent with an Idempotency-Key header is
+# kept and replayed to retries (api.idempotency)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+
+# Opt-in fast path: hot list endpoints render .values() rows through
+# compiled serializers (api.compiled) and JSON is encoded with orjson when
+# it is installed (api.renderers). Both produce the same bytes as the
+# regular path; while off, FastJSONRenderer is plain JSONRenderer
+API_FAST_PATH = config('API_FAST_PATH', default=False, cast=bool)
+
+# Serve GET/HEAD of the AsyncReadMixin views (api.async_views) as
+# coroutines. Enable only when running under ASGI, e.g.
+# `uvicorn api.asgi:application`; under WSGI the plain sync views are used
+API_ASYNC_VIEWS = config('API_ASYNC_VIEWS', default=False, cast=bool)
+
+# Widths (px) of the WebP/JPEG copies made of uploaded images (api.images)
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+
+# Uploaded images are streamed to disk with their metadata stripped and
+# rejected past these limits before being decoded (api.uploads)
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Recipe API',
     'DESCRIPTION': 'API for managing recipes, users, interactions, and notifications.',
@@ -181,12 +242,26 @@ SPECTACULAR_SETTINGS = {
     # OTHER SETTINGS
 }
  
-CACHES = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://127.0.0.1:6379/1",
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+# Redis when REDIS_URL is set (the default), in-process cache otherwise.
+# Tests run against api.test_settings, which never uses Redis
+REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            }
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         }
-    } 
-}
\ No newline at end of file
+    }
+
+# Seconds anonymous recipe list/detail responses stay cached
+RECIPE_CACHE_TIMEOUT = config('RECIPE_CACHE_TIMEOUT', default=300, cast=int)
@@ -0,0 +1,167 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .pagination import KeysetPagination
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+EXPAND_PARAM = 'expand'
+
+
+def _param_names(request, param):
+    values = request.query_params.getlist(param) if request is not None else []
+    return [
+        name.strip()
+        for value in values
+        for name in value.split(',')
+        if name.strip()
+    ]
+
+
+class SparseFieldsetsMixin:
+    """
+    Serializer mixin for ?fields=a,b (only these), ?exclude=a,b (all but
+    these) and ?expand=a (add a field from Meta.expandable_fields).
+
+    Fields left out are never built, so they cost nothing to render, and
+    prune_queryset() drops the columns, joins and prefetches only they
+    need. Only the top-level serializer (or the child of a top-level list)
+    reads the query string; nested serializers render in full.
+
+    Meta options:
+    - expandable_fields: {name: callable returning a field}, fields that
+      are only added on ?expand= (or when named in ?fields=)
+    - field_columns: {name: model field paths} for fields whose columns
+      can't be read from the field source, e.g. model properties
+    - field_prefetches: {name: prefetch lookups}
+    """
+
+    @classmethod
+    def field_names(cls, request):
+        """Names of the fields to render for `request`, in Meta order"""
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        only = _param_names(request, FIELDS_PARAM)
+        exclude = _param_names(request, EXCLUDE_PARAM)
+        expand = _param_names(request, EXPAND_PARAM)
+
+        known = set(cls.Meta.fields) | set(expandable)
+        unknown = [name for name in only + exclude if name not in known]
+        unknown += [name for name in expand if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': [f"Unknown field(s): {', '.join(dict.fromkeys(unknown))}."]
+            })
+
+        expanded = set(expand) | (set(only) & set(expandable))
+        names = list(cls.Meta.fields) + [
+            name for name in expandable if name in expanded]
+        if only:
+            names = [name for name in names if name in only]
+        return [name for name in names if name not in exclude]
+
+    @classmethod
+    def prune_queryset(cls, queryset, request, keep=()):
+        """
+        Load only what the requested fields read: columns via only(),
+        joins via select_related() and the matching prefetches.
+        `keep` names extra columns, e.g. the ones a paginator orders by.
+        """
+        names = cls.field_names(request)
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        full_relations = set()
+        prefetches = []
+        declared = cls._declared_fields
+        field_columns = getattr(cls.Meta, 'field_columns', {})
+        field_prefetches = getattr(cls.Meta, 'field_prefetches', {})
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+
+        for name in names:
+            prefetches += field_prefetches.get(name, ())
+            if name in field_columns:
+                columns.update(field_columns[name])
+                continue
+            field = declared.get(name)
+            if field is None and name in expandable:
+                field = expandable[name]()
+            source = getattr(field, 'source', None) or name
+            if source == '*':
+                continue
+            path = source.replace('.', '__')
+            try:
+                model_field = model._meta.get_field(path.split('__')[0])
+            except FieldDoesNotExist:
+                continue
+            if not model_field.concrete:
+                # Reverse relations come from Meta.field_prefetches
+                continue
+            if isinstance(field, serializers.BaseSerializer) and model_field.many_to_one:
+                # Nested serializer over a foreign key reads the whole row
+                full_relations.add(model_field.name)
+            columns.add(path)
+
+        for name in keep:
+            if not isinstance(name, str):
+                continue
+            name = name.lstrip('-')
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            columns.add(name)
+
+        # A fully loaded relation can't also be limited to some columns
+        columns = {
+            path for path in columns
+            if path.split('__')[0] not in full_relations or '__' not in path
+        }
+        relations = {path.split('__')[0] for path in columns if '__' in path}
+        relations |= full_relations
+        queryset = queryset.select_related(None)
+        if relations:
+            # select_related() without arguments would follow every relation
+            queryset = queryset.select_related(*sorted(relations))
+        return (
+            queryset
+            .prefetch_related(None).prefetch_related(*prefetches)
+            .only(*sorted(columns))
+        )
+
+    def is_sparse_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self.is_sparse_root():
+            return fields
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        selected = {}
+        for name in self.field_names(request):
+            if name in fields:
+                selected[name] = fields[name]
+            elif name in expandable:
+                selected[name] = expandable[name]()
+        return selected
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin pruning the queryset of safe requests to the fields the
+    serializer will render (see SparseFieldsetsMixin.prune_queryset).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if (self.request.method not in SAFE_METHODS
+                or not hasattr(serializer_class, 'prune_queryset')):
+            return queryset
+        # Columns the ordering and keyset cursors read from each row
+        keep = [*queryset.query.order_by, *queryset.model._meta.ordering]
+        keep += getattr(self, 'cursor_ordering', None) or KeysetPagination.ordering
+        return serializer_class.prune_queryset(queryset, self.request, keep)
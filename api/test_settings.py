@@ -0,0 +1,18 @@
+"""
+Settings for running the test suite without Redis or background threads.
+
+    python manage.py test --settings=api.test_settings
+
+Other runners pick it up from DJANGO_SETTINGS_MODULE=api.test_settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# View counts are only written by explicit flushes
+RECIPE_VIEW_FLUSH_INTERVAL = 0
@@ -0,0 +1,322 @@
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+from rest_framework import serializers
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+EXIF_ORIENTATION = 0x0112
+
+
+def max_upload_bytes():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def max_upload_pixels():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)
+
+
+def sniff_format(header):
+    """Image format from the first bytes of a file, or None"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'PNG'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    return None
+
+
+class _MetadataFilter:
+    """
+    Streaming filter that drops metadata blocks from an image file.
+
+    Subclasses implement `step`, which looks at the start of the buffer
+    and sets `copy` or `skip` to the number of bytes to keep or drop, or
+    returns False when it needs more data. Large blocks such as pixel
+    data are passed through without being buffered.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.started = False
+        self.done = False
+        self.copy = 0
+        self.skip = 0
+
+    def feed(self, data):
+        if self.done:
+            return data
+        self.buffer += data
+        out = bytearray()
+        while self.buffer and not self.done:
+            if self.copy or self.skip:
+                size = min(len(self.buffer), self.copy or self.skip)
+                if self.copy:
+                    out += self.buffer[:size]
+                    self.copy -= size
+                else:
+                    self.skip -= size
+                del self.buffer[:size]
+            elif not self.step(out):
+                break
+        if self.done:
+            out += self.buffer
+            self.buffer.clear()
+        return bytes(out)
+
+    def close(self):
+        rest = bytes(self.buffer)
+        self.buffer.clear()
+        return rest
+
+    def step(self, out):
+        raise NotImplementedError
+
+    def finish(self, file, size):
+        """Patch the written file once its final size is known"""
+
+
+class _PassThrough(_MetadataFilter):
+
+    def __init__(self):
+        super().__init__()
+        self.done = True
+
+
+def _orientation_segment(segment):
+    # APP1 segment holding only the orientation of an Exif APP1 segment
+    exif = Image.Exif()
+    try:
+        exif.load(bytes(segment[4:]))
+        orientation = exif.get(EXIF_ORIENTATION)
+    except Exception:
+        return b''
+    if orientation in (None, 1):
+        return b''
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    data = exif.tobytes()
+    return b'\xff\xe1' + (len(data) + 2).to_bytes(2, 'big') + data
+
+
+class _JpegFilter(_MetadataFilter):
+    # APP1 (Exif, XMP), APP13 (IPTC) and comments. The orientation is kept
+    # so that rotated photos still display upright
+    DROP = {0xE1, 0xED, 0xFE}
+
+    def step(self, out):
+        buffer = self.buffer
+        if len(buffer) < 2:
+            return False
+        if not self.started:
+            self.started = True
+            self.copy = 2
+            return True
+        if buffer[0] != 0xFF:
+            self.done = True
+            return True
+        marker = buffer[1]
+        if marker == 0xFF:
+            # Fill byte
+            del buffer[0]
+            return True
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            self.copy = 2
+            return True
+        if marker in (0xD9, 0xDA):
+            # Entropy-coded data follows the start of scan; copy the rest
+            self.done = True
+            return True
+        if len(buffer) < 4:
+            return False
+        end = 2 + int.from_bytes(buffer[2:4], 'big')
+        if marker not in self.DROP:
+            self.copy = end
+        elif marker == 0xE1 and len(buffer) < 10:
+            return False
+        elif marker == 0xE1 and buffer[4:10] == b'Exif\x00\x00':
+            # At most 64 KB
+            if len(buffer) < end:
+                return False
+            out += _orientation_segment(buffer[:end])
+            del buffer[:end]
+        else:
+            self.skip = end
+        return True
+
+
+class _PngFilter(_MetadataFilter):
+    DROP = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+
+    def step(self, out):
+        if not self.started:
+            if len(self.buffer) < 8:
+                return False
+            self.started = True
+            self.copy = 8
+            return True
+        if len(self.buffer) < 8:
+            return False
+        # Length, type, data and CRC
+        size = int.from_bytes(self.buffer[:4], 'big') + 12
+        if bytes(self.buffer[4:8]) in self.DROP:
+            self.skip = size
+        else:
+            self.copy = size
+        return True
+
+
+class _WebpFilter(_MetadataFilter):
+    DROP = {b'EXIF', b'XMP '}
+    # VP8X flags announcing the dropped chunks
+    METADATA_FLAGS = 0x08 | 0x04
+
+    def __init__(self):
+        super().__init__()
+        self.stripped = False
+
+    def step(self, out):
+        if not self.started:
+            if len(self.buffer) < 12:
+                return False
+            self.started = True
+            self.copy = 12
+            return True
+        if len(self.buffer) < 8:
+            return False
+        fourcc = bytes(self.buffer[:4])
+        size = int.from_bytes(self.buffer[4:8], 'little')
+        size += 8 + (size & 1)
+        if fourcc == b'VP8X':
+            if len(self.buffer) < 9:
+                return False
+            self.buffer[8] &= ~self.METADATA_FLAGS & 0xFF
+        if fourcc in self.DROP:
+            self.stripped = True
+            self.skip = size
+        else:
+            self.copy = size
+        return True
+
+    def finish(self, file, size):
+        if self.stripped:
+            # The RIFF header holds the size of the rest of the file
+            file.seek(4)
+            file.write((size - 8).to_bytes(4, 'little'))
+
+
+FILTERS = {'JPEG': _JpegFilter, 'PNG': _PngFilter, 'WEBP': _WebpFilter}
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Streams uploaded images to a temporary file in a single pass, dropping
+    Exif/XMP/text metadata on the way and refusing to store more than
+    IMAGE_UPLOAD_MAX_BYTES.
+
+    Nothing is decoded here, and memory use stays at about one chunk per
+    upload whatever the file size. Files that are not images are left to
+    the next handler in FILE_UPLOAD_HANDLERS.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = None
+        self.filter = None
+        self.received = 0
+        self.written = 0
+        self.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            image_format = sniff_format(raw_data[:12])
+            is_image = (self.content_type or '').startswith('image/')
+            if image_format is None and not is_image:
+                return raw_data
+            self.filter = FILTERS.get(image_format, _PassThrough)()
+            self.file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset,
+                self.content_type_extra)
+        if self.file is None:
+            return raw_data
+
+        self.received += len(raw_data)
+        if self.too_large:
+            return None
+        if self.received > max_upload_bytes():
+            # Drain the rest of the upload without storing it
+            self.too_large = True
+            self.file.seek(0)
+            self.file.truncate()
+            self.written = 0
+            return None
+        self.write(self.filter.feed(raw_data))
+        return None
+
+    def write(self, data):
+        self.file.write(data)
+        self.written += len(data)
+
+    def file_complete(self, file_size):
+        if self.file is None:
+            return None
+        if not self.too_large:
+            self.write(self.filter.close())
+            self.filter.finish(self.file, self.written)
+        self.file.seek(0)
+        self.file.size = self.written
+        self.file.upload_too_large = self.too_large
+        return self.file
+
+    def upload_interrupted(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def validate_image_header(file):
+    """
+    Check the format and dimensions of an image from its header, before
+    anything decodes the pixels.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        source = file.temporary_file_path()
+    else:
+        source = file
+    try:
+        with Image.open(source) as image:
+            image_format = image.format
+            width, height = image.size
+    except (Image.DecompressionBombError, OSError, ValueError):
+        raise serializers.ValidationError(
+            "Upload a valid image. The file you uploaded was either not an "
+            "image or a corrupted image.")
+    finally:
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
+    if image_format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError(
+            f"Unsupported image format. Use one of: "
+            f"{', '.join(ALLOWED_FORMATS)}.")
+    if width * height > max_upload_pixels():
+        raise serializers.ValidationError(
+            f"Image is too large ({width}x{height}). Images may have at "
+            f"most {max_upload_pixels() / 1_000_000:g} megapixels.")
+
+
+class ImageUploadField(serializers.ImageField):
+    """ImageField enforcing the upload size and header limits"""
+
+    def to_internal_value(self, data):
+        limit = max_upload_bytes()
+        if getattr(data, 'upload_too_large', False) or (
+                getattr(data, 'size', 0) or 0) > limit:
+            raise serializers.ValidationError(
+                f"Image files may be at most {filesizeformat(limit)}.")
+        if hasattr(data, 'read'):
+            validate_image_header(data)
+        return super().to_internal_value(data)
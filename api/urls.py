@@ -9,6 +9,7 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/recipes/', include('recipe.urls')),
     path('api/', include('interactions.urls')),
+    path('api/notifications/', include('notifications.urls')),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     # Optional UI: 
     path('api/schema/swagger-ui/',
@@ -0,0 +1,39 @@
+from django.db import connections, router
+from django.db.models import sql
+from django.db.models.constants import OnConflict
+
+# Both helpers use private ORM APIs as of Django 5.2 (pinned in
+# requirements.txt): sql.InsertQuery with on_conflict, insert_values()
+# and QuerySet._raw_delete(). WriteHelperTests in recipe/tests.py checks
+# their signatures; re-check the helpers when upgrading Django.
+
+
+def insert_ignore(model, **values):
+    """
+    Insert one row unless it would violate a unique constraint, in a
+    single INSERT ... ON CONFLICT DO NOTHING (INSERT OR IGNORE on SQLite).
+
+    Returns True if the row was inserted. No signals are sent.
+    """
+    using = router.db_for_write(model)
+    opts = model._meta
+    fields = [
+        field for field in opts.local_concrete_fields
+        if field is not opts.auto_field and not field.generated
+    ]
+    query = sql.InsertQuery(model, on_conflict=OnConflict.IGNORE)
+    query.insert_values(fields, [model(**values)])
+    with connections[using].cursor() as cursor:
+        for statement, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(statement, params)
+        return cursor.rowcount > 0
+
+
+def delete_where(model, **filters):
+    """
+    Delete the matching rows in a single DELETE, without first selecting
+    them. Returns the number of rows deleted. No signals are sent and
+    cascades are not followed.
+    """
+    queryset = model._default_manager.filter(**filters)
+    return queryset._raw_delete(queryset.db)
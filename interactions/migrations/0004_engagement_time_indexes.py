@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0003_savedrecipe'),
+        ('recipe', '0014_recipe_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='interaction_created_fbcd4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['updated_at'], name='interaction_updated_5692b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedrecipe',
+            index=models.Index(fields=['saved_at'], name='interaction_saved_a_af6654_idx'),
+        ),
+    ]
@@ -1,9 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
-class Rating(models.Model):
+class AtomicSaveMixin:
+    # Saves the row and runs its post_save handlers (which update the
+    # recipe's counters) inside one transaction
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class Rating(AtomicSaveMixin, models.Model):
     # """
     # Rating model for recipes
     # """
@@ -30,13 +38,25 @@ class Rating(models.Model):
         indexes = [
             models.Index(fields=['recipe', '-created_at']),
             models.Index(fields=['user', '-created_at']),
+            # New and changed ratings for recipe.scores
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
         return f"{self.user.username} rated {self.recipe.title}: {self.score}/5"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored score so an update only applies the difference
+        if 'score' in field_names:
+            score = values[field_names.index('score')]
+            if score is not models.DEFERRED:
+                instance._stored_score = score
+        return instance
+
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     # """
     # Comment model for recipes
     # """
@@ -59,13 +79,15 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=['recipe', '-created_at']),
             models.Index(fields=['user', '-created_at']),
+            # New comments for recipe.scores
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
         return f"{self.user.username} commented on {self.recipe.title}"
 
 
-class SavedRecipe(models.Model):
+class SavedRecipe(AtomicSaveMixin, models.Model):
     # """
     # Model for users saving/favoriting recipes
     # """
@@ -86,6 +108,8 @@ class SavedRecipe(models.Model):
         ordering = ['-saved_at']
         indexes = [
             models.Index(fields=['user', '-saved_at']),
+            # New saves for recipe.scores
+            models.Index(fields=['saved_at']),
         ]
 
     def __str__(self):
@@ -0,0 +1,37 @@
+from django.db import transaction
+
+from api.writes import delete_where, insert_ignore
+from recipe.cache import invalidate_recipe
+from recipe.counters import adjust_counters
+from recipe.events import publish_engagement
+from .models import SavedRecipe
+
+
+def saves_changed(recipe_id, delta):
+    # Lists don't show save counts, only the detail is dropped
+    adjust_counters(recipe_id, saves_count=delta)
+    invalidate_recipe(recipe_id, lists=False)
+    publish_engagement(recipe_id, 'save')
+
+
+def save_recipe(user, recipe):
+    """
+    Save `recipe` for `user` with a single conditional INSERT.
+
+    Returns False if it was already saved; counters only move for the
+    request that inserted the row.
+    """
+    with transaction.atomic():
+        if not insert_ignore(SavedRecipe, user_id=user.pk, recipe_id=recipe.pk):
+            return False
+        saves_changed(recipe.pk, 1)
+    return True
+
+
+def unsave_recipe(user, recipe):
+    """Remove a saved recipe with a single DELETE; False if it wasn't saved"""
+    with transaction.atomic():
+        if not delete_where(SavedRecipe, user_id=user.pk, recipe_id=recipe.pk):
+            return False
+        saves_changed(recipe.pk, -1)
+    return True
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Rating, Comment, SavedRecipe
 from users.serializers import UserProfileSerializer
+from .viewer_state import ViewerStateListSerializer
  
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -12,6 +13,10 @@ class RatingSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'recipe', 'recipe_title',
                   'score', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def load_viewer_state(self, state, instances):
+        state.load_users(rating.user_id for rating in instances)
 
     def validate_score(self, value):
         # """Validate rating score is between 1 and 5"""
@@ -45,14 +50,20 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'recipe', 'recipe_title',
                   'comment', 'is_author', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
+        # Columns behind method fields, for api.compiled
+        field_columns = {'is_author': ['user']}
 
     def get_is_author(self, obj):
         # """Check if current user is the comment author"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.user == request.user
+            return obj.user_id == request.user.id
         return False
 
+    def load_viewer_state(self, state, instances):
+        state.load_users(comment.user_id for comment in instances)
+
     def validate_comment(self, value):
         # """Validate comment is not empty"""
         if not value.strip():
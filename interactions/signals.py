@@ -0,0 +1,90 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipe.cache import invalidate_recipe
+from recipe.counters import adjust_counters
+from recipe.events import publish_engagement
+from recipe.models import Recipe
+from .models import Comment, Rating, SavedRecipe
+from .saves import saves_changed
+
+
+def _deleted_with_recipe(instance, origin):
+    # Rows cascading from a recipe delete don't need their counters updated
+    if isinstance(origin, Recipe):
+        return origin.pk == instance.recipe_id
+    if isinstance(origin, QuerySet):
+        return origin.model is Recipe
+    return False
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_score(sender, instance, **kwargs):
+    # Ratings loaded from the database already carry their stored score
+    if instance.pk is None or hasattr(instance, '_stored_score'):
+        return
+    instance._stored_score = (
+        Rating.objects.filter(pk=instance.pk)
+        .values_list('score', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stored_score', None)
+    if created or previous is None:
+        adjust_counters(instance.recipe_id, ratings_count=1,
+                        rating_sum=instance.score)
+    else:
+        adjust_counters(instance.recipe_id,
+                        rating_sum=instance.score - previous)
+    instance._stored_score = instance.score
+    invalidate_recipe(instance.recipe_id)
+    publish_engagement(instance.recipe_id, 'rating')
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_with_recipe(instance, origin):
+        return
+    adjust_counters(instance.recipe_id, ratings_count=-1,
+                    rating_sum=-instance.score)
+    invalidate_recipe(instance.recipe_id)
+    publish_engagement(instance.recipe_id, 'rating')
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    # Lists don't show comment or save counts, only the detail is dropped
+    if created:
+        adjust_counters(instance.recipe_id, comments_count=1)
+        invalidate_recipe(instance.recipe_id, lists=False)
+        publish_engagement(instance.recipe_id, 'comment', comment={
+            'id': instance.pk,
+            'user': instance.user.username,
+            'comment': instance.comment,
+            'created_at': instance.created_at.isoformat(),
+        })
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_recipe(instance, origin):
+        adjust_counters(instance.recipe_id, comments_count=-1)
+        invalidate_recipe(instance.recipe_id, lists=False)
+        publish_engagement(instance.recipe_id, 'comment_deleted',
+                           comment_id=instance.pk)
+
+
+@receiver(post_save, sender=SavedRecipe)
+def saved_recipe_saved(sender, instance, created, **kwargs):
+    if created:
+        saves_changed(instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=SavedRecipe)
+def saved_recipe_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_recipe(instance, origin):
+        saves_changed(instance.recipe_id, -1)
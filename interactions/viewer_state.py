@@ -0,0 +1,100 @@
+from django.db import models
+from rest_framework import serializers
+
+from .models import Rating, SavedRecipe
+
+# Most recipes or users one bulk state request may ask about
+MAX_STATE_BATCH = 100
+
+
+class ViewerState:
+    """
+    Per-request cache of what the current user has saved, rated and followed.
+
+    List serializers load the ids on a page in bulk (one query per table);
+    anything not loaded yet is fetched on first access.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._saved = {}
+        self._ratings = {}
+        self._following = {}
+
+    @property
+    def is_authenticated(self):
+        return bool(self.user and self.user.is_authenticated)
+
+    def load_recipes(self, recipe_ids):
+        # Fetch saves and ratings for every recipe id not cached yet
+        ids = {pk for pk in recipe_ids if pk not in self._saved}
+        if not ids or not self.is_authenticated:
+            return
+
+        saved = set(
+            SavedRecipe.objects
+            .filter(user=self.user, recipe_id__in=ids)
+            .values_list('recipe_id', flat=True)
+        )
+        scores = dict(
+            Rating.objects
+            .filter(user=self.user, recipe_id__in=ids)
+            .values_list('recipe_id', 'score')
+        )
+        for pk in ids:
+            self._saved[pk] = pk in saved
+            self._ratings[pk] = scores.get(pk)
+
+    def load_users(self, user_ids):
+        # Fetch follow state for every user id not cached yet
+        ids = {pk for pk in user_ids if pk not in self._following}
+        if not ids or not self.is_authenticated:
+            return
+
+        following = set(
+            self.user.following
+            .filter(id__in=ids)
+            .values_list('id', flat=True)
+        )
+        for pk in ids:
+            self._following[pk] = pk in following
+
+    def is_saved(self, recipe_id):
+        if not self.is_authenticated:
+            return False
+        self.load_recipes([recipe_id])
+        return self._saved[recipe_id]
+
+    def user_rating(self, recipe_id):
+        if not self.is_authenticated:
+            return None
+        self.load_recipes([recipe_id])
+        return self._ratings[recipe_id]
+
+    def is_following(self, user_id):
+        if not self.is_authenticated:
+            return False
+        self.load_users([user_id])
+        return self._following[user_id]
+
+
+def get_viewer_state(context):
+    """Return the ViewerState shared by every serializer in this context"""
+    state = context.get('viewer_state')
+    if state is None:
+        request = context.get('request')
+        state = ViewerState(getattr(request, 'user', None))
+        context['viewer_state'] = state
+    return state
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    # Lets the child serializer bulk-load viewer state for the whole page
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        instances = list(data)
+        self.child.load_viewer_state(
+            get_viewer_state(self.context), instances)
+        return super().to_representation(instances)
@@ -5,12 +5,15 @@ from django.shortcuts import get_object_or_404
 from recipe.models import Recipe
 from .models import Comment
 from rest_framework.exceptions import PermissionDenied
+from api.async_views import AsyncReadMixin
+from api.compiled import CompiledListMixin
 
 from .serializers import CommentSerializer, CommentCreateUpdateSerializer
 # from .permissions import IsCommentAuthorOrReadOnly
 
 
-class RecipeCommentListCreateView(generics.ListCreateAPIView):
+class RecipeCommentListCreateView(CompiledListMixin, AsyncReadMixin,
+                                  generics.ListCreateAPIView):
     # """
     # GET: List all comments for a recipe
     # POST: Create a new comment on a recipe
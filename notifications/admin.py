@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'verb', 'actor', 'recipe', 'is_read', 'created_at']
+    list_filter = ['verb', 'is_read']
+    raw_id_fields = ['recipient', 'actor', 'recipe']
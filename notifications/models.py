@@ -1,3 +1,61 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class Notification(models.Model):
+    FOLLOW = 'follow'
+    COMMENT = 'comment'
+    RATING = 'rating'
+    NEW_RECIPE = 'new_recipe'
+    VERB_CHOICES = [
+        (FOLLOW, 'New follower'),
+        (COMMENT, 'Comment on your recipe'),
+        (RATING, 'Rating on your recipe'),
+        (NEW_RECIPE, 'New recipe from someone you follow'),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    recipe = models.ForeignKey(
+        'recipe.Recipe',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Keyset pages of a user's (unread) notifications
+            models.Index(fields=['recipient', 'is_read', '-id']),
+            models.Index(fields=['recipient', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} -> {self.recipient_id}"
+
+
+class NotificationCounter(models.Model):
+    # Stored unread count so reading it is a primary-key lookup
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from .models import Notification
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Serializer for a user's notifications"""
+    actor_username = serializers.CharField(
+        source='actor.username', read_only=True)
+    recipe_title = serializers.CharField(
+        source='recipe.title', read_only=True, default=None)
+
+    class Meta:
+        model = Notification
+        fields = [
+            'id',
+            'verb',
+            'actor_username',
+            'recipe',
+            'recipe_title',
+            'is_read',
+            'created_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from interactions.models import Comment, Rating
+from recipe.models import Recipe
+from tasks.queue import enqueue
+from .models import Notification
+from .tasks import discount_unread
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def new_follower(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add':
+        return
+    for pk in pk_set:
+        # Forward: instance follows pk. Reverse: pk follows instance
+        follower_id, followed_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+        enqueue('notifications.notify', recipient_id=followed_id,
+                verb=Notification.FOLLOW, actor_id=follower_id)
+
+
+@receiver(post_save, sender=Comment)
+def new_comment(sender, instance, created, **kwargs):
+    if created:
+        enqueue('notifications.notify_author', verb=Notification.COMMENT,
+                actor_id=instance.user_id, recipe_id=instance.recipe_id)
+
+
+@receiver(post_save, sender=Rating)
+def new_rating(sender, instance, created, **kwargs):
+    # Changing an existing rating doesn't notify again
+    if created:
+        enqueue('notifications.notify_author', verb=Notification.RATING,
+                actor_id=instance.user_id, recipe_id=instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def new_recipe(sender, instance, created, **kwargs):
+    if created:
+        enqueue('notifications.new_recipe', recipe_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    # The cascade deletes notifications in bulk, without per-row signals
+    discount_unread(Notification.objects.filter(recipe_id=instance.pk))
+
+
+@receiver(pre_delete, sender=User)
+def actor_removed(sender, instance, **kwargs):
+    # Notifications about the user's own recipes are handled per recipe
+    discount_unread(
+        Notification.objects.filter(actor_id=instance.pk)
+        .exclude(recipe__author_id=instance.pk)
+    )
@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from recipe.models import Recipe
+from tasks.queue import enqueue, task
+from .models import Notification, NotificationCounter
+
+# Recipients written per bulk insert, and per new-recipe fan-out task
+CHUNK_SIZE = 1000
+
+
+def deliver(recipient_ids, verb, actor_id, recipe_id=None):
+    """
+    Create one notification per recipient and bump their unread counters
+    with a fixed number of queries per chunk.
+    """
+    recipient_ids = [pk for pk in recipient_ids if pk != actor_id]
+    for start in range(0, len(recipient_ids), CHUNK_SIZE):
+        chunk = recipient_ids[start:start + CHUNK_SIZE]
+        Notification.objects.bulk_create([
+            Notification(recipient_id=pk, actor_id=actor_id, verb=verb,
+                         recipe_id=recipe_id)
+            for pk in chunk
+        ])
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=pk) for pk in chunk],
+            ignore_conflicts=True,
+        )
+        NotificationCounter.objects.filter(user_id__in=chunk).update(
+            unread=F('unread') + 1)
+
+
+def discount_unread(notifications):
+    """Take unread notifications about to be deleted off the counters"""
+    per_user = defaultdict(int)
+    unread = notifications.filter(is_read=False).values_list(
+        'recipient_id', flat=True)
+    for user_id in unread.iterator(chunk_size=CHUNK_SIZE):
+        per_user[user_id] += 1
+    by_count = defaultdict(list)
+    for user_id, count in per_user.items():
+        by_count[count].append(user_id)
+    for count, user_ids in by_count.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') - count)
+
+
+@task('notifications.notify')
+def notify(recipient_id, verb, actor_id, recipe_id=None):
+    deliver([recipient_id], verb, actor_id, recipe_id)
+
+
+@task('notifications.notify_author')
+def notify_author(verb, actor_id, recipe_id):
+    # The author is looked up here to keep the request path to one insert
+    author_id = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values_list('author_id', flat=True)
+        .first()
+    )
+    if author_id is not None:
+        deliver([author_id], verb, actor_id, recipe_id)
+
+
+@task('notifications.new_recipe')
+def notify_followers(recipe_id, after=0):
+    """
+    Notify one chunk of the author's followers, ordered by id, then queue
+    the next chunk. Each chunk commits with the task that continues it, so
+    a retry never notifies anyone twice.
+    """
+    author_id = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values_list('author_id', flat=True)
+        .first()
+    )
+    if author_id is None:
+        return
+    Follow = get_user_model().following.through
+    follower_ids = list(
+        Follow.objects.filter(to_user_id=author_id, from_user_id__gt=after)
+        .order_by('from_user_id')
+        .values_list('from_user_id', flat=True)[:CHUNK_SIZE]
+    )
+    deliver(follower_ids, Notification.NEW_RECIPE, author_id, recipe_id)
+    if len(follower_ids) == CHUNK_SIZE:
+        enqueue('notifications.new_recipe', recipe_id=recipe_id,
+                after=follower_ids[-1])
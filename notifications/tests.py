@@ -1,3 +1,111 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from interactions.models import Comment, Rating
+from recipe.models import Recipe
+from tasks.models import Task
+from tasks.queue import run_until_empty
+from users.models import User
+from . import tasks as notification_tasks
+from .models import Notification
+
+
+class NotificationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+
+    def setUp(self):
+        cache.clear()
+
+    def make_recipe(self, **kwargs):
+        return Recipe.objects.create(
+            author=self.author, title='Soup', description='Warm',
+            ingredients='water', instructions='Boil', **kwargs)
+
+    def unread_count(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse('notification-unread-count')).data['unread']
+
+    def test_created_by_worker_not_request(self):
+        self.fan.following.add(self.author)
+        recipe = self.make_recipe()
+        Comment.objects.create(user=self.fan, recipe=recipe, comment='Yum')
+        Rating.objects.create(user=self.fan, recipe=recipe, score=5)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(Task.objects.count(), 4)
+
+        run_until_empty()
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient__username', 'verb')),
+            [('author', 'comment'), ('author', 'follow'), ('author', 'rating'),
+             ('fan', 'new_recipe')],
+        )
+        self.assertEqual(self.unread_count(self.author), 3)
+        self.assertEqual(self.unread_count(self.fan), 1)
+
+    def test_own_activity_is_not_notified(self):
+        recipe = self.make_recipe()
+        Comment.objects.create(user=self.author, recipe=recipe, comment='Mine')
+        run_until_empty()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_new_recipe_fans_out_in_chunks(self):
+        followers = User.objects.bulk_create([
+            User(username=f'follower{i}', email=f'follower{i}@example.com')
+            for i in range(25)
+        ])
+        self.author.followers.add(*followers)
+        Task.objects.all().delete()
+
+        self.make_recipe()
+        with mock.patch.object(notification_tasks, 'CHUNK_SIZE', 10):
+            with CaptureQueriesContext(connection) as ctx:
+                run_until_empty()
+        self.assertEqual(
+            Notification.objects.filter(verb=Notification.NEW_RECIPE).count(), 25)
+        # Three chunks; none issues a query per follower
+        self.assertLess(len(ctx.captured_queries), 60)
+        self.assertEqual(self.unread_count(followers[0]), 1)
+
+    def test_unread_list_and_mark_read(self):
+        for _ in range(3):
+            self.make_recipe()
+        self.fan.following.add(self.author)
+        Task.objects.all().delete()
+        for recipe in Recipe.objects.all():
+            notification_tasks.deliver(
+                [self.fan.pk], Notification.NEW_RECIPE, self.author.pk, recipe.pk)
+
+        self.client.force_authenticate(self.fan)
+        url = reverse('notification-list')
+        response = self.client.get(url, {'unread': 'true'})
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 3)
+
+        self.client.post(reverse('notification-read', kwargs={'pk': ids[0]}))
+        self.client.post(reverse('notification-read', kwargs={'pk': ids[0]}))
+        self.assertEqual(self.unread_count(self.fan), 2)
+        response = self.client.get(url, {'unread': 'true'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.client.post(reverse('notification-read-all'))
+        self.assertEqual(self.unread_count(self.fan), 0)
+
+    def test_deleting_recipe_updates_counter(self):
+        self.fan.following.add(self.author)
+        recipe = self.make_recipe()
+        run_until_empty()
+        self.assertEqual(self.unread_count(self.fan), 1)
+        recipe.delete()
+        self.assertEqual(self.unread_count(self.fan), 0)
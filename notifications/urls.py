@@ -0,0 +1,17 @@
+from django.urls import path
+from .views import (
+    NotificationListView,
+    UnreadCountView,
+    MarkNotificationReadView,
+    MarkAllNotificationsReadView
+)
+
+urlpatterns = [
+    path('', NotificationListView.as_view(), name='notification-list'),
+    path('unread-count/', UnreadCountView.as_view(),
+         name='notification-unread-count'),
+    path('read-all/', MarkAllNotificationsReadView.as_view(),
+         name='notification-read-all'),
+    path('<int:pk>/read/', MarkNotificationReadView.as_view(),
+         name='notification-read'),
+]
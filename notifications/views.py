@@ -1,3 +1,95 @@
-from django.shortcuts import render
+from django.db import transaction
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from api.pagination import KeysetPagination
+from .models import Notification, NotificationCounter
+from .serializers import NotificationSerializer
+
+
+class NotificationPagination(KeysetPagination):
+    # Ids increase with creation time, so they make a compact keyset
+    ordering = ('-id',)
+
+
+class NotificationListView(generics.ListAPIView):
+    # """
+    # GET: Current user's notifications, newest first
+    # ?unread=true lists only unread ones
+    # """
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        queryset = (
+            Notification.objects
+            .filter(recipient=self.request.user)
+            .select_related('actor', 'recipe')
+            .only('id', 'verb', 'is_read', 'created_at',
+                  'actor__username', 'recipe__title')
+        )
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class UnreadCountView(generics.GenericAPIView):
+    # """
+    # GET: Number of unread notifications, read from a stored counter
+    # """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        unread = (
+            NotificationCounter.objects
+            .filter(user=request.user)
+            .values_list('unread', flat=True)
+            .first()
+        )
+        return Response({"unread": max(unread or 0, 0)})
+
+
+def _mark_read(user, notifications):
+    # Only rows that actually flip to read come off the counter
+    with transaction.atomic():
+        updated = notifications.filter(is_read=False).update(is_read=True)
+        if updated:
+            NotificationCounter.objects.filter(user=user).update(
+                unread=F('unread') - updated)
+    return updated
+
+
+class MarkNotificationReadView(generics.GenericAPIView):
+    # """
+    # POST: Mark one notification as read
+    # """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        notification = get_object_or_404(
+            Notification.objects.only('id'), pk=pk, recipient=request.user)
+        _mark_read(request.user, Notification.objects.filter(pk=notification.pk))
+        return Response({
+            "message": "Notification marked as read.",
+            "is_read": True
+        })
+
+
+class MarkAllNotificationsReadView(generics.GenericAPIView):
+    # """
+    # POST: Mark all of the current user's notifications as read
+    # """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        updated = _mark_read(
+            request.user, Notification.objects.filter(recipient=request.user))
+        return Response({
+            "message": f"{updated} notification(s) marked as read.",
+            "updated": updated
+        })
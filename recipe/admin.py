@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recipe
+from .models import Ingredient, Recipe
 
 
 @admin.register(Recipe)
@@ -21,7 +21,17 @@ class RecipeAdmin(admin.ModelAdmin):
         'created_at'
     ]
     search_fields = ['title', 'description', 'ingredients', 'author__username']
-    readonly_fields = ['created_at', 'updated_at', 'views_count']
+    readonly_fields = [
+        'created_at',
+        'updated_at',
+        'views_count',
+        'ratings_count',
+        'rating_sum',
+        'comments_count',
+        'saves_count',
+        'score',
+        'trending_score',
+    ]
 
     fieldsets = (
         ('Basic Information', {
@@ -37,7 +47,17 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('prep_time', 'cook_time')
         }),
         ('Metadata', {
-            'fields': ('views_count', 'created_at', 'updated_at'),
+            'fields': (
+                'views_count',
+                'ratings_count',
+                'rating_sum',
+                'comments_count',
+                'saves_count',
+                'score',
+                'trending_score',
+                'created_at',
+                'updated_at',
+            ),
             'classes': ('collapse',)
         }),
     )
@@ -45,3 +65,9 @@ class RecipeAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.select_related('author')
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ReciepeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        # Keep the search index, response cache and parsed ingredients in
+        # sync with recipes
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+
+from .events import (
+    COUNTER_FIELDS,
+    engagement_snapshot,
+    format_sse,
+    get_broker,
+    recipe_channel,
+)
+from .models import Recipe
+
+
+def keepalive_interval():
+    return getattr(settings, 'RECIPE_EVENTS_KEEPALIVE', 15)
+
+
+async def recipe_events(request, pk):
+    # """
+    # GET: Server-sent events for a recipe: a `snapshot` of its counters,
+    # then `rating`, `comment`, `comment_deleted` and `save` events as
+    # they happen. Needs an ASGI server (api.asgi).
+    # """
+    counters = await (
+        Recipe.objects.filter(pk=pk).values(*COUNTER_FIELDS).afirst()
+    )
+    if counters is None:
+        raise Http404("Recipe not found.")
+
+    async def stream():
+        # Subscribed only once the response is being sent, so a request
+        # that never starts streaming can't leave a watcher behind
+        subscription = get_broker().subscribe(recipe_channel(pk))
+        try:
+            yield format_sse('snapshot', engagement_snapshot(counters))
+            while True:
+                event = await subscription.get(timeout=keepalive_interval())
+                if event is None:
+                    # Comment line; keeps proxies from closing the stream
+                    yield ': keep-alive\n\n'
+                else:
+                    yield format_sse(event['event'], event['data'])
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
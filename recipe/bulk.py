@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import uuid
+from collections import Counter
+
+from django.db import connection, transaction
+
+from tasks.queue import enqueue
+from users.counters import adjust_counters as adjust_user_counters
+
+from . import feed
+from .cache import invalidate_lists
+from .ingredients import sync_new_recipes_ingredients
+from .models import Recipe
+from .pantry import pantry_index
+from .search import get_search_backend
+from .serializers import RecipeCreateUpdateSerializer
+
+FORMATS = ('jsonl', 'csv')
+# Columns written by the export and read by the import. `author` and
+# `created_at` are informational: imported recipes belong to the
+# importing user and get a new creation time
+EXPORT_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'ingredients',
+    'instructions',
+    'cuisine_type',
+    'meal_type',
+    'dietary_tags',
+    'prep_time',
+    'cook_time',
+    'servings',
+    'difficulty_level',
+    'author',
+    'created_at',
+]
+IMPORT_FIELDS = [
+    name for name in RecipeCreateUpdateSerializer.Meta.fields
+    if name != 'image'
+]
+BATCH_SIZE = 500
+# Row errors kept in an import result; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def guess_format(filename, default='jsonl'):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict or None, error) from a text stream.
+
+    Rows are read one at a time, so the file is never held in memory.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells fall back to the field defaults
+            yield reader.line_num, {
+                key: value for key, value in row.items()
+                if key and value not in ('', None)
+            }, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object."
+            continue
+        yield line_number, row, None
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _index_recipes(recipes, ingredient_ids):
+    backend = get_search_backend()
+    for recipe in recipes:
+        backend.update(recipe)
+    pantry_index.update_recipes(ingredient_ids)
+
+
+def _after_bulk_create(recipes):
+    # bulk_create skips post_save; do the recipe signal work per batch.
+    # Notifications are deliberately not sent for imported recipes
+    ingredient_ids = sync_new_recipes_ingredients(recipes)
+    for author_id, count in Counter(r.author_id for r in recipes).items():
+        adjust_user_counters([author_id], recipes_count=count)
+    if feed.feed_strategy() == 'write':
+        for recipe in recipes:
+            enqueue('feed.fan_out', recipe_id=recipe.pk)
+    transaction.on_commit(lambda: _index_recipes(recipes, ingredient_ids))
+    invalidate_lists()
+
+
+def _save_batch(recipes):
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            # MySQL doesn't return the new ids: tag the batch, read the
+            # rows back by the tag, then clear it
+            marker = uuid.uuid4()
+            for recipe in recipes:
+                recipe.import_batch = marker
+            Recipe.objects.bulk_create(recipes)
+            batch = Recipe.objects.filter(import_batch=marker)
+            recipes = list(batch.order_by('pk'))
+            batch.update(import_batch=None)
+            for recipe in recipes:
+                recipe.import_batch = None
+        _after_bulk_create(recipes)
+
+
+def import_recipes(rows, author, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Validate rows with RecipeCreateUpdateSerializer and insert the valid
+    ones with bulk_create, one transaction per batch.
+
+    `rows` is an iterable from read_rows(). Returns an ImportResult with
+    the line number and field errors of every rejected row.
+    """
+    result = ImportResult()
+    batch = []
+    for line, row, error in rows:
+        if error:
+            result.add_error(line, {'non_field_errors': [error]})
+            continue
+        data = {key: row[key] for key in IMPORT_FIELDS if key in row}
+        serializer = RecipeCreateUpdateSerializer(data=data)
+        if not serializer.is_valid():
+            result.add_error(line, serializer.errors)
+            continue
+        batch.append(Recipe(author=author, **serializer.validated_data))
+        if len(batch) >= batch_size:
+            if not dry_run:
+                _save_batch(batch)
+            result.created += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            _save_batch(batch)
+        result.created += len(batch)
+    return result
+
+
+class _Echo:
+    # File-like object whose write() returns the value, for csv.writer
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fmt, chunk_size=2000):
+    """
+    Yield the recipes in `queryset` as JSONL or CSV lines.
+
+    Rows are streamed from the database with iterator(), so memory use
+    doesn't grow with the number of recipes.
+    """
+    rows = (
+        queryset.order_by('pk')
+        .values_list(*EXPORT_FIELDS[:-2], 'author__username', 'created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(
+                [value.isoformat() if hasattr(value, 'isoformat') else value
+                 for value in row])
+        return
+
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['created_at'] = record['created_at'].isoformat()
+        yield json.dumps(record) + '\n'
+
+
+def open_text(binary_file, encoding='utf-8'):
+    """Text view of an uploaded or opened binary file, decoded lazily"""
+    return io.TextIOWrapper(binary_file, encoding=encoding, newline='')
@@ -0,0 +1,140 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = 'recipe:list:version'
+STATS_KEYS = {
+    'hits': 'recipe:cache:hits',
+    'misses': 'recipe:cache:misses',
+}
+
+
+def cache_timeout():
+    return getattr(settings, 'RECIPE_CACHE_TIMEOUT', 5 * 60)
+
+
+def is_cacheable(request):
+    # Only anonymous reads share cached responses
+    return request.method == 'GET' and not request.user.is_authenticated
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing key; any new value invalidates the old entries
+        cache.set(key, int(time.time()), timeout=None)
+
+
+def _recipe_version_key(pk):
+    return f'recipe:{pk}:version'
+
+
+def _request_digest(request):
+    # Responses carry absolute URLs (pagination links, images), so the
+    # scheme and host are part of the key. Same parameters in any order
+    # map to the same entry
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in sorted(request.query_params.getlist(key))
+    )
+    origin = f'{request.scheme}://{request.get_host()}'
+    return hashlib.sha1(
+        f'{origin}?{urlencode(params)}'.encode()).hexdigest()
+
+
+def list_cache_key(request):
+    return f'recipe:list:v{_version(LIST_VERSION_KEY)}:{_request_digest(request)}'
+
+
+def detail_cache_key(pk, request=None):
+    key = f'recipe:{pk}:v{_version(_recipe_version_key(pk))}'
+    # Sparse fieldsets (?fields=...) and each host are cached separately
+    if request is not None:
+        key += f':{_request_digest(request)}'
+    return key
+
+
+def invalidate_recipe(pk, lists=True):
+    """
+    Drop cached responses for a recipe once the transaction commits.
+
+    `lists` also drops every cached list page, for changes to fields the
+    list shows.
+    """
+    def bump():
+        _bump(_recipe_version_key(pk))
+        if lists:
+            _bump(LIST_VERSION_KEY)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_lists():
+    """Drop every cached list page once the transaction commits"""
+    transaction.on_commit(lambda: _bump(LIST_VERSION_KEY))
+
+
+def _record(stat):
+    key = STATS_KEYS[stat]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_or_build(key, build, lock_timeout=10, wait=0.05, attempts=20):
+    """
+    Read-through cache with a single-flight lock.
+
+    On a miss, one caller builds the value while the others wait briefly
+    for it rather than all hitting the database at once. Returns
+    (value, hit).
+    """
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value, True
+
+    _record('misses')
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        for _ in range(attempts):
+            time.sleep(wait)
+            value = cache.get(key)
+            if value is not None:
+                return value, True
+
+    try:
+        value = build()
+        cache.set(key, value, timeout=cache_timeout())
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value, False
+
+
+def cache_stats():
+    hits = cache.get(STATS_KEYS['hits'], 0)
+    misses = cache.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0,
+    }
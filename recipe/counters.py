@@ -0,0 +1,58 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def adjust_counters(recipe_id, **deltas):
+    """
+    Apply deltas to a recipe's stored counters in a single UPDATE.
+
+    Uses F() expressions so concurrent writers never overwrite each other.
+    """
+    from .models import Recipe
+
+    changes = {
+        field: F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if changes:
+        Recipe.objects.filter(pk=recipe_id).update(**changes)
+
+
+def _aggregate_subquery(model, aggregate):
+    # Correlated per-recipe aggregate, 0 when there are no rows
+    rows = (
+        model.objects
+        .filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def counter_expressions(rating_model, comment_model, saved_model):
+    """Expressions computing every stored counter from the source tables"""
+    return {
+        'ratings_count': _aggregate_subquery(rating_model, Count('pk')),
+        'rating_sum': _aggregate_subquery(rating_model, Sum('score')),
+        'comments_count': _aggregate_subquery(comment_model, Count('pk')),
+        'saves_count': _aggregate_subquery(saved_model, Count('pk')),
+    }
+
+
+def rebuild_counters(queryset=None):
+    """
+    Recompute stored counters from the interaction tables.
+
+    Runs as one UPDATE with correlated subqueries and returns the number
+    of recipes updated.
+    """
+    from interactions.models import Comment, Rating, SavedRecipe
+    from .models import Recipe
+
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    return queryset.update(
+        **counter_expressions(Rating, Comment, SavedRecipe))
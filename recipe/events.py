@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('ratings_count', 'rating_sum', 'comments_count',
+                  'saves_count')
+
+
+def recipe_channel(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+class Subscription:
+    """One watcher's bounded queue of events on a channel"""
+
+    def __init__(self, broker, channel, loop, max_size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def put(self, event):
+        # Runs on the subscriber's loop. A slow client loses its oldest
+        # events; the counters in newer ones are absolute anyway
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrived within `timeout`"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Pub/sub between threads and event loops of a single process.
+
+    Publishing is a dictionary lookup plus one call_soon_threadsafe per
+    watcher, and an idle watcher is just a coroutine waiting on its queue.
+    """
+    max_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def has_subscribers(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def subscribe(self, channel, loop=None):
+        subscription = Subscription(
+            self, channel, loop or asyncio.get_running_loop(),
+            self.max_queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            watchers = self._subscribers.get(subscription.channel)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, event):
+        self._deliver(channel, event)
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            watchers = list(self._subscribers.get(channel, ()))
+        for subscription in watchers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The watcher's loop has closed
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Relays events between processes through Redis pub/sub.
+
+    Each process holds one Redis subscription, read by a daemon thread,
+    and hands events to its local watchers, so watcher count does not
+    change the number of Redis connections. A lost connection is retried
+    with backoff.
+    """
+    pattern = 'recipe:*'
+    # Seconds before re-subscribing after a lost connection, doubling up
+    # to the maximum while Redis stays unreachable
+    reconnect_delay = 1
+    max_reconnect_delay = 30
+
+    def __init__(self, url=None):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(url or settings.REDIS_URL)
+        self._listener = None
+        self._pubsub = None
+        self._closed = False
+
+    def has_subscribers(self, channel):
+        # Watchers may be connected to any process
+        return True
+
+    def subscribe(self, channel, loop=None):
+        self._ensure_listener()
+        return super().subscribe(channel, loop)
+
+    def publish(self, channel, event):
+        try:
+            self._redis.publish(channel, json.dumps(event))
+        except Exception:
+            logger.exception("Could not publish recipe event")
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name='recipe-events', daemon=True)
+            self._listener.start()
+
+    def close(self):
+        """Drop the Redis subscription and stop the listener thread"""
+        self._closed = True
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+    def _listen(self):
+        import redis
+
+        delay = self.reconnect_delay
+        try:
+            while not self._closed:
+                try:
+                    self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                    self._pubsub.psubscribe(self.pattern)
+                    delay = self.reconnect_delay
+                    for message in self._pubsub.listen():
+                        self._receive(message)
+                except (redis.ConnectionError, redis.TimeoutError):
+                    if self._closed:
+                        break
+                    logger.warning(
+                        "Lost the recipe events subscription, retrying in %ss",
+                        delay, exc_info=True)
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            # Let the next subscribe() start a new listener
+            with self._lock:
+                self._listener = None
+
+    def _receive(self, message):
+        try:
+            channel = message['channel'].decode()
+            self._deliver(channel, json.loads(message['data']))
+        except (KeyError, ValueError, AttributeError):
+            logger.warning("Ignoring malformed recipe event")
+
+
+_broker = None
+
+
+def get_broker():
+    """Broker from RECIPE_EVENTS_BROKER (in-process by default)"""
+    global _broker
+    if _broker is None:
+        path = getattr(settings, 'RECIPE_EVENTS_BROKER', None)
+        _broker = import_string(path)() if path else InProcessBroker()
+    return _broker
+
+
+def engagement_snapshot(counters):
+    """Public counter values from a row of COUNTER_FIELDS"""
+    ratings = counters['ratings_count']
+    return {
+        'average_rating': (
+            round(counters['rating_sum'] / ratings, 1) if ratings else 0),
+        'ratings_count': ratings,
+        'comments_count': counters['comments_count'],
+        'saves_count': counters['saves_count'],
+    }
+
+
+def publish_engagement(recipe_id, event, **data):
+    """
+    Push an engagement event to the recipe's watchers once the current
+    transaction commits, along with the recipe's current counters.
+    """
+    broker = get_broker()
+    channel = recipe_channel(recipe_id)
+    if not broker.has_subscribers(channel):
+        return
+
+    def send():
+        from .models import Recipe
+
+        counters = (
+            Recipe.objects.filter(pk=recipe_id)
+            .values(*COUNTER_FIELDS)
+            .first()
+        )
+        if counters is not None:
+            broker.publish(channel, {
+                'event': event,
+                'data': {**engagement_snapshot(counters), **data},
+            })
+
+    transaction.on_commit(send)
+
+
+def format_sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
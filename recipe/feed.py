@@ -0,0 +1,189 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from tasks.queue import task
+from .models import FeedEntry, Recipe
+
+# Followed authors queried per UNION statement on the fan-out-on-read path
+AUTHOR_CHUNK_SIZE = 100
+# Rows per bulk insert on the fan-out-on-write path
+WRITE_CHUNK_SIZE = 1000
+
+
+def feed_strategy():
+    return getattr(settings, 'RECIPE_FEED_STRATEGY', 'read')
+
+
+def feed_max_length():
+    return getattr(settings, 'RECIPE_FEED_MAX_LENGTH', 500)
+
+
+def encode_cursor(created_at, recipe_id):
+    raw = f'{created_at.isoformat()}|{recipe_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, recipe_id), or raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, recipe_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError('Invalid cursor') from exc
+
+
+def _before(position, created_field='created_at', id_field='id'):
+    # Keyset condition for rows strictly after `position` in feed order
+    created_at, recipe_id = position
+    return (
+        Q(**{f'{created_field}__lt': created_at})
+        | Q(**{created_field: created_at, f'{id_field}__lt': recipe_id})
+    )
+
+
+def _following_ids(user):
+    Follow = get_user_model().following.through
+    return Follow.objects.filter(from_user=user).values_list(
+        'to_user_id', flat=True)
+
+
+def read_feed(user, position=None, limit=10):
+    """
+    Fan-out-on-read: merge per-author keyset streams.
+
+    Each followed author contributes at most `limit` rows read from the
+    (author, -created_at) index, so the cost depends on the number of
+    authors and the page size, not on how many recipes they have.
+    Returns (created_at, recipe_id) pairs, newest first.
+    """
+    compound = connection.features.supports_slicing_ordering_in_compound
+    author_ids = list(_following_ids(user))
+    rows = []
+    for start in range(0, len(author_ids), AUTHOR_CHUNK_SIZE):
+        streams = []
+        for author_id in author_ids[start:start + AUTHOR_CHUNK_SIZE]:
+            stream = Recipe.objects.filter(author_id=author_id)
+            if position:
+                stream = stream.filter(_before(position))
+            streams.append(
+                stream.order_by('-created_at', '-id')
+                .values_list('created_at', 'id')[:limit]
+            )
+        if compound:
+            rows.extend(streams[0].union(*streams[1:], all=True))
+        else:
+            for stream in streams:
+                rows.extend(stream)
+        # Only the newest `limit` rows can end up on this page
+        rows = sorted(rows, reverse=True)[:limit]
+    return rows
+
+
+def write_feed(user, position=None, limit=10):
+    """Fan-out-on-write: read the user's precomputed timeline"""
+    entries = FeedEntry.objects.filter(user=user)
+    if position:
+        entries = entries.filter(_before(position, id_field='recipe_id'))
+    return list(
+        entries.order_by('-created_at', '-recipe_id')
+        .values_list('created_at', 'recipe_id')[:limit]
+    )
+
+
+def get_feed_page(user, position=None, limit=10):
+    """
+    Recipes for the user's home feed with the position of the last one.
+
+    Uses the strategy from RECIPE_FEED_STRATEGY ('read' or 'write').
+    """
+    reader = write_feed if feed_strategy() == 'write' else read_feed
+    rows = reader(user, position, limit)
+    recipes = Recipe.objects.for_list().in_bulk([pk for _, pk in rows])
+    page = [recipes[pk] for _, pk in rows if pk in recipes]
+    last = rows[-1] if len(rows) == limit else None
+    return page, last
+
+
+def fan_out_recipe(recipe):
+    """Insert a new recipe into every follower's timeline"""
+    Follow = get_user_model().following.through
+    follower_ids = (
+        Follow.objects.filter(to_user_id=recipe.author_id)
+        .values_list('from_user_id', flat=True)
+        .iterator(chunk_size=WRITE_CHUNK_SIZE)
+    )
+    chunk = []
+    for follower_id in follower_ids:
+        chunk.append(FeedEntry(
+            user_id=follower_id, recipe=recipe, created_at=recipe.created_at))
+        if len(chunk) >= WRITE_CHUNK_SIZE:
+            FeedEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+            chunk = []
+    if chunk:
+        FeedEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+@task('feed.fan_out')
+def fan_out(recipe_id):
+    # Queued on publish, so popular authors don't hold up the request
+    recipe = Recipe.objects.filter(pk=recipe_id).only('author', 'created_at').first()
+    if recipe is not None:
+        fan_out_recipe(recipe)
+
+
+def backfill_author(user_id, author_id):
+    """Copy an author's latest recipes into a new follower's timeline"""
+    recipes = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:feed_max_length()]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=pk, created_at=created_at)
+            for pk, created_at in recipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id).delete()
+
+
+def trim_feed(user_id):
+    """Delete timeline entries beyond RECIPE_FEED_MAX_LENGTH"""
+    cutoff = (
+        FeedEntry.objects.filter(user_id=user_id)
+        .order_by('-created_at', '-recipe_id')
+        .values_list('created_at', 'recipe_id')[feed_max_length():][:1]
+    )
+    cutoff = list(cutoff)
+    if not cutoff:
+        return 0
+    created_at, recipe_id = cutoff[0]
+    deleted, _ = FeedEntry.objects.filter(user_id=user_id).filter(
+        Q(created_at__lt=created_at)
+        | Q(created_at=created_at, recipe_id__lte=recipe_id)
+    ).delete()
+    return deleted
+
+
+def rebuild_feed(user_id):
+    """Recompute a user's stored timeline from the authors they follow"""
+    user = get_user_model()(pk=user_id)
+    rows = read_feed(user, limit=feed_max_length())
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user_id=user_id, recipe_id=pk, created_at=created_at)
+        for created_at, pk in rows
+    ])
+    return len(rows)
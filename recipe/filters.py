@@ -1,20 +1,37 @@
 import django_filters
+from rest_framework import filters
 from .models import Recipe
 
 
+class StableOrderingFilter(filters.OrderingFilter):
+    # Ties on the requested fields (e.g. equal scores) are broken by id,
+    # so pages never repeat or skip rows
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering = [*ordering, '-id']
+        return ordering
+
+
+
+class NormalizedCharFilter(django_filters.CharFilter):
+    # Choice values are stored lower-case; an exact match on the
+    # lower-cased input can use the column's index, unlike iexact
+    def filter(self, qs, value):
+        if value:
+            value = value.strip().lower()
+        return super().filter(qs, value)
+
+
 class RecipeFilter(django_filters.FilterSet):
     # """
     # Custom filter for recipes
     # """
-    # Exact match filters
-    cuisine = django_filters.CharFilter(
-        field_name='cuisine_type', lookup_expr='iexact')
-    meal = django_filters.CharFilter(
-        field_name='meal_type', lookup_expr='iexact')
-    dietary = django_filters.CharFilter(
-        field_name='dietary_tags', lookup_expr='iexact')
-    difficulty = django_filters.CharFilter(
-        field_name='difficulty_level', lookup_expr='iexact')
+    # Exact match filters, backed by the composite indexes on Recipe
+    cuisine = NormalizedCharFilter(field_name='cuisine_type')
+    meal = NormalizedCharFilter(field_name='meal_type')
+    dietary = NormalizedCharFilter(field_name='dietary_tags')
+    difficulty = NormalizedCharFilter(field_name='difficulty_level')
 
     # Range filters
     prep_time_min = django_filters.NumberFilter(
@@ -32,9 +49,8 @@ class RecipeFilter(django_filters.FilterSet):
     servings_max = django_filters.NumberFilter(
         field_name='servings', lookup_expr='lte')
 
-    # Author filter
-    author = django_filters.CharFilter(
-        field_name='author__username', lookup_expr='iexact')
+    # Author filter; usernames are unique as typed
+    author = django_filters.CharFilter(field_name='author__username')
 
     # Search in title and description
     title_contains = django_filters.CharFilter(
@@ -42,9 +58,4 @@ class RecipeFilter(django_filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = [
-            'cuisine_type',
-            'meal_type',
-            'dietary_tags',
-            'difficulty_level',
-        ]
\ No newline at end of file
+        fields = []
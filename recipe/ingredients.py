@@ -0,0 +1,216 @@
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+UNICODE_FRACTIONS = {
+    '¼': '1/4', '½': '1/2', '¾': '3/4',
+    '⅓': '1/3', '⅔': '2/3', '⅛': '1/8',
+}
+
+# Spelling variants mapped to the unit stored on RecipeIngredient
+UNITS = {
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'g': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch',
+    'clove': 'clove', 'cloves': 'clove',
+    'can': 'can', 'cans': 'can',
+    'slice': 'slice', 'slices': 'slice',
+    'piece': 'piece', 'pieces': 'piece',
+    'bunch': 'bunch', 'bunches': 'bunch',
+    'handful': 'handful', 'handfuls': 'handful',
+}
+
+BULLET_RE = re.compile(r'^\s*(?:[-*•]+|\d+[.)])(?:\s+|$)')
+# A number not cut out of a longer one ("1e400", "1.5.2")
+QUANTITY_RE = re.compile(
+    r'^(?P<quantity>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)(?![\d./]|[eE][-+]?\d)'
+    r'(?:\s*[-–]\s*\d+(?:\.\d+)?)?\s*'
+)
+# Largest quantity RecipeIngredient.quantity (max_digits=10,
+# decimal_places=2) can store
+MAX_QUANTITY = Decimal('99999999.99')
+NAME_NOISE_RE = re.compile(r'\(.*?\)|,.*$|\bof\b\s+')
+
+# Preparation words dropped from the front of a name ("fresh basil")
+DESCRIPTORS = {
+    'fresh', 'chopped', 'minced', 'diced', 'sliced', 'grated', 'finely',
+    'roughly', 'large', 'medium', 'small', 'ripe', 'dried', 'whole',
+}
+# Plant parts dropped from the end of a name ("basil leaves")
+PARTS = {'leaf', 'leaves', 'sprig', 'sprigs', 'stalk', 'stalks'}
+# Units that may also follow the name ("2 garlic cloves")
+TRAILING_UNITS = {'clove', 'cloves', 'slice', 'slices', 'piece', 'pieces'}
+
+
+@dataclass
+class ParsedIngredient:
+    name: str
+    quantity: Decimal = None
+    unit: str = ''
+    text: str = ''
+
+
+def normalize_name(name):
+    """Lowercase, single-spaced and naively singular ingredient name"""
+    words = NAME_NOISE_RE.sub(' ', name.lower()).split()
+    while len(words) > 1 and words[0] in DESCRIPTORS:
+        words.pop(0)
+    while len(words) > 1 and words[-1] in PARTS:
+        words.pop()
+    if words:
+        words[-1] = _singular(words[-1])
+    return ' '.join(words)[:100]
+
+
+def _singular(word):
+    if len(word) <= 3 or word.endswith('ss'):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith('oes'):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def _parse_quantity(value):
+    """The quantity rounded to cents, or None if it can't be stored"""
+    try:
+        total = sum(Fraction(part) for part in value.split())
+        quantity = (
+            Decimal(total.numerator) / Decimal(total.denominator)
+        ).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError, ZeroDivisionError):
+        return None
+    if quantity > MAX_QUANTITY:
+        return None
+    return quantity
+
+
+def parse_ingredient_line(line):
+    """
+    Parse one line of Recipe.ingredients, e.g. "2 1/2 cups plain flour".
+
+    Returns None for blank lines.
+    """
+    text = line.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    text = BULLET_RE.sub('', text).strip()
+    if not text:
+        return None
+
+    quantity = None
+    match = QUANTITY_RE.match(text)
+    if match:
+        quantity = _parse_quantity(match.group('quantity'))
+        text = text[match.end():]
+
+    unit = ''
+    first, _, rest = text.partition(' ')
+    if rest and first.lower().rstrip('.') in UNITS:
+        unit = UNITS[first.lower().rstrip('.')]
+        text = rest
+    else:
+        head, _, last = text.rpartition(' ')
+        last = last.lower().rstrip('.,')
+        if head.strip() and last in TRAILING_UNITS:
+            unit = UNITS[last]
+            text = head
+
+    name = normalize_name(text)
+    if not name:
+        return None
+    return ParsedIngredient(
+        name=name, quantity=quantity, unit=unit, text=line.strip()[:255])
+
+
+def parse_ingredients(text):
+    """Parse every line, keeping the first occurrence of each ingredient"""
+    parsed = {}
+    for line in (text or '').splitlines():
+        item = parse_ingredient_line(line)
+        if item and item.name not in parsed:
+            parsed[item.name] = item
+    return list(parsed.values())
+
+
+def sync_recipe_ingredients(recipe, ingredient_model=None, link_model=None):
+    """
+    Replace a recipe's RecipeIngredient rows with ones parsed from its text.
+
+    Returns the recipe's ingredient ids. The models can be passed in so
+    data migrations can use historical models.
+    """
+    if ingredient_model is None or link_model is None:
+        from .models import Ingredient, RecipeIngredient
+        ingredient_model, link_model = Ingredient, RecipeIngredient
+
+    parsed = parse_ingredients(recipe.ingredients)
+    names = [item.name for item in parsed]
+    ingredient_model.objects.bulk_create(
+        [ingredient_model(name=name) for name in names],
+        ignore_conflicts=True,
+    )
+    ids = dict(
+        ingredient_model.objects
+        .filter(name__in=names)
+        .values_list('name', 'id')
+    )
+
+    link_model.objects.filter(recipe_id=recipe.pk).delete()
+    link_model.objects.bulk_create([
+        link_model(
+            recipe_id=recipe.pk,
+            ingredient_id=ids[item.name],
+            quantity=item.quantity,
+            unit=item.unit,
+            text=item.text,
+            position=position,
+        )
+        for position, item in enumerate(parsed)
+    ])
+    return [ids[item.name] for item in parsed]
+
+
+def sync_new_recipes_ingredients(recipes):
+    """
+    RecipeIngredient rows for freshly bulk-created recipes, in a fixed
+    number of queries. Returns {recipe_id: ingredient ids}.
+    """
+    from .models import Ingredient, RecipeIngredient
+
+    parsed = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    names = {item.name for items in parsed.values() for item in items}
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name) for name in names],
+        ignore_conflicts=True,
+    )
+    ids = dict(
+        Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe_id=recipe_id,
+            ingredient_id=ids[item.name],
+            quantity=item.quantity,
+            unit=item.unit,
+            text=item.text,
+            position=position,
+        )
+        for recipe_id, items in parsed.items()
+        for position, item in enumerate(items)
+    ], batch_size=1000)
+    return {
+        recipe_id: [ids[item.name] for item in items]
+        for recipe_id, items in parsed.items()
+    }
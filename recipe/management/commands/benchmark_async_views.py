@@ -0,0 +1,75 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent GET throughput of the ASGI and WSGI request "
+        "paths in-process, against the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/api/recipes/'])
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help="In-flight ASGI requests / WSGI threads")
+        parser.add_argument('--token', default=None,
+                            help="JWT access token, to bypass the anonymous "
+                                 "response cache")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f"Bearer {options['token']}"
+
+        # The test clients always send Host: testserver
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for path in options['paths']:
+                wsgi = self.run_wsgi(path, headers, options)
+                asgi = asyncio.run(self.run_asgi(path, headers, options))
+                self.stdout.write(path)
+                self.report('WSGI (threads)', *wsgi)
+                self.report('ASGI (coroutines)', *asgi)
+
+    def run_wsgi(self, path, headers, options):
+        def fetch(_):
+            start = time.perf_counter()
+            response = Client(headers=headers).get(path)
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        return time.perf_counter() - start, results
+
+    async def run_asgi(self, path, headers, options):
+        client = AsyncClient(headers=headers)
+        slots = asyncio.Semaphore(options['concurrency'])
+
+        async def fetch():
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(path)
+                return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(fetch() for _ in range(options['requests'])))
+        return time.perf_counter() - start, results
+
+    def report(self, label, elapsed, results):
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, status in results if status >= 400)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"  {label:<20}{len(results) / elapsed:8.1f} req/s  "
+            f"median {statistics.median(latencies):.1f} ms  "
+            f"p95 {p95:.1f} ms  errors {errors}"
+        )
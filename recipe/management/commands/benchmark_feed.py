@@ -0,0 +1,128 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipe import feed
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare fan-out-on-read and fan-out-on-write home feeds on a "
+        "synthetic follow graph. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--authors', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=100,
+                            help="Authors followed per user")
+        parser.add_argument('--recipes', type=int, default=20,
+                            help="Recipes per author")
+        parser.add_argument('--reads', type=int, default=100,
+                            help="Feed pages read per strategy")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users, authors = self._build_graph(rng, options)
+            results = self._run(rng, users, authors, options)
+            transaction.set_rollback(True)
+
+        for label, value in results:
+            self.stdout.write(f"{label:<36}{value}")
+
+    def _build_graph(self, rng, options):
+        User = get_user_model()
+        tag = f"feedbench{int(time.time())}"
+        people = User.objects.bulk_create([
+            User(username=f"{tag}_{i}", email=f"{tag}_{i}@example.com")
+            for i in range(options['users'] + options['authors'])
+        ])
+        users = people[:options['users']]
+        authors = people[options['users']:]
+
+        now = timezone.now()
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                title=f"Benchmark recipe {i}",
+                description="Synthetic",
+                author=author,
+                ingredients="1 cup flour",
+                instructions="Mix.",
+            )
+            for author in authors
+            for i in range(options['recipes'])
+        ])
+        # Spread publish times so authors' streams interleave
+        for recipe in recipes:
+            recipe.created_at = now - timedelta(
+                minutes=rng.randrange(60 * 24 * 30))
+        Recipe.objects.bulk_update(recipes, ['created_at'], batch_size=1000)
+
+        Follow = User.following.through
+        follows = min(options['follows'], len(authors))
+        Follow.objects.bulk_create(
+            [
+                Follow(from_user_id=user.pk, to_user_id=author.pk)
+                for user in users
+                for author in rng.sample(authors, follows)
+            ],
+            batch_size=1000,
+        )
+        return users, authors
+
+    def _time_reads(self, rng, users, reader, reads):
+        timings = []
+        for _ in range(reads):
+            user = rng.choice(users)
+            start = time.perf_counter()
+            rows = reader(user)
+            if rows:
+                # Second page, to include the keyset condition
+                reader(user, rows[-1])
+            timings.append((time.perf_counter() - start) * 1000 / 2)
+        return timings
+
+    def _run(self, rng, users, authors, options):
+        reads = options['reads']
+        read_timings = self._time_reads(rng, users, feed.read_feed, reads)
+
+        start = time.perf_counter()
+        entries = sum(feed.rebuild_feed(user.pk) for user in users)
+        rebuild_ms = (time.perf_counter() - start) * 1000
+
+        write_timings = self._time_reads(rng, users, feed.write_feed, reads)
+
+        # Cost of one new recipe under fan-out-on-write
+        fan_out = []
+        for author in rng.sample(authors, min(20, len(authors))):
+            recipe = Recipe.objects.create(
+                title="Benchmark recipe", description="Synthetic",
+                author=author, ingredients="1 cup flour",
+                instructions="Mix.")
+            start = time.perf_counter()
+            feed.fan_out_recipe(recipe)
+            fan_out.append((time.perf_counter() - start) * 1000)
+
+        def summary(timings):
+            timings = sorted(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1] if timings else 0
+            return (f"median {statistics.median(timings):.2f} ms, "
+                    f"p95 {p95:.2f} ms")
+
+        return [
+            ("Users / authors", f"{len(users)} / {len(authors)}"),
+            ("Fan-out-on-read page", summary(read_timings)),
+            ("Fan-out-on-write page", summary(write_timings)),
+            ("Fan-out-on-write new recipe", summary(fan_out)),
+            ("Timeline rebuild (all users)",
+             f"{rebuild_ms:.0f} ms, {entries} entries"),
+        ]
@@ -0,0 +1,107 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.compiled import compile_serializer
+from api.renderers import FastJSONRenderer, orjson
+from interactions.models import Comment
+from interactions.serializers import CommentSerializer
+from recipe.models import Recipe
+from recipe.serializers import RecipeListSerializer
+from users.models import User
+from users.serializers import FollowSerializer
+
+# name -> (queryset factory, serializer class)
+TARGETS = {
+    'recipes': (Recipe.objects.for_list, RecipeListSerializer),
+    'comments': (
+        lambda: Comment.objects.select_related('user', 'recipe'),
+        CommentSerializer,
+    ),
+    'follows': (User.objects.all, FollowSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows per second of the serializer + JSONRenderer path and "
+        "the compiled serializer + FastJSONRenderer path used by the list "
+        "endpoints, against the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', default=list(TARGETS),
+                            help=f"Any of: {', '.join(TARGETS)}")
+        parser.add_argument('--rows', type=int, default=1000,
+                            help="Rows rendered per run")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Runs per path; the fastest one is reported")
+
+    def handle(self, *args, **options):
+        unknown = set(options['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(sorted(unknown))}")
+        if orjson is None:
+            self.stdout.write("orjson is not installed: both paths use the json module")
+
+        # The request factory sends Host: testserver; the fast path is
+        # measured whether or not this deployment has it enabled
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts, API_FAST_PATH=True):
+            for name in options['targets']:
+                self.benchmark(name, options)
+
+    def benchmark(self, name, options):
+        make_queryset, serializer_class = TARGETS[name]
+        queryset = make_queryset()[:options['rows']]
+        rows = queryset.count()
+        if not rows:
+            self.stdout.write(f"{name}: no rows, skipped")
+            return
+
+        slow, slow_body = self.best_of(
+            options['repeat'], self.render_slow, queryset, serializer_class)
+        fast, fast_body = self.best_of(
+            options['repeat'], self.render_fast, queryset, serializer_class)
+        self.stdout.write(f"{name} ({rows} rows)")
+        self.report('serializer + JSONRenderer', rows, slow)
+        self.report('compiled + FastJSONRenderer', rows, fast)
+        self.stdout.write(f"  speed-up {slow / fast:.1f}x")
+        if slow_body != fast_body:
+            self.stdout.write(self.style.ERROR("  rendered output differs"))
+
+    def serializer(self, serializer_class):
+        # Anonymous request, as for a cache miss on a public list
+        request = Request(APIRequestFactory().get('/'))
+        return serializer_class(many=True, context={'request': request})
+
+    def render_slow(self, queryset, serializer_class):
+        serializer = self.serializer(serializer_class)
+        serializer.instance = list(queryset.all())
+        return JSONRenderer().render(serializer.data)
+
+    def render_fast(self, queryset, serializer_class):
+        compiled = compile_serializer(self.serializer(serializer_class))
+        if compiled is None:
+            raise CommandError(f"{serializer_class.__name__} can't be compiled")
+        rows = list(compiled.values(queryset.all()))
+        return FastJSONRenderer().render(compiled.render(rows))
+
+    def best_of(self, repeat, render, *args):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            body = render(*args)
+            timings.append(time.perf_counter() - start)
+        return min(timings), body
+
+    def report(self, label, rows, elapsed):
+        self.stdout.write(
+            f"  {label:<30}{rows / elapsed:10.0f} rows/s  "
+            f"{elapsed * 1000:8.1f} ms"
+        )
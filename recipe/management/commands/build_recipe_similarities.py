@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipe.recommendations import BATCH_SIZE, TOP_N, build_similarities
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar-recipe table from ratings, saves and "
+        "recipe categories (run periodically)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=TOP_N,
+                            help="Neighbours stored per recipe")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = build_similarities(
+            top_n=options['top'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} recipe similarity row(s)."
+        ))
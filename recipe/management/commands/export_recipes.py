@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipe.bulk import FORMATS, export_rows, guess_format
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Export recipes as JSONL or CSV ('-' or no path writes stdout)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-')
+        parser.add_argument('--format', choices=FORMATS, dest='fmt',
+                            help="Defaults to the file extension, else jsonl")
+        parser.add_argument('--author', help="Only this user's recipes")
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['author']:
+            queryset = queryset.filter(author__username=options['author'])
+
+        path = options['path']
+        fmt = options['fmt'] or guess_format(path)
+        stream = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        count = 0
+        try:
+            for line in export_rows(queryset, fmt):
+                stream.write(line)
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        if path != '-':
+            if fmt == 'csv':
+                count -= 1  # header
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {count} recipe(s) to {path}."
+            ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants, pending_variants
+from tasks.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue thumbnail generation for recipe images and profile pictures "
+        "that have no variants yet, e.g. uploads from before variants existed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true',
+                            help="Generate in this process instead of queueing")
+
+    def handle(self, *args, **options):
+        count = 0
+        for model, pk, field, variants_field in pending_variants():
+            kwargs = dict(model=model, pk=pk, field=field,
+                          variants_field=variants_field)
+            if options['now']:
+                generate_variants(**kwargs)
+            else:
+                enqueue('images.generate_variants', **kwargs)
+            count += 1
+
+        verb = "Generated" if options['now'] else "Queued"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} variants for {count} image(s)."
+        ))
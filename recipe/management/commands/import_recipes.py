@@ -0,0 +1,53 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.bulk import BATCH_SIZE, FORMATS, guess_format, import_recipes, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import recipes from a JSONL or CSV file ('-' reads stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--author', required=True,
+                            help="Username the imported recipes belong to")
+        parser.add_argument('--format', choices=FORMATS, dest='fmt',
+                            help="Defaults to the file extension, else jsonl")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate only, don't write anything")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['author']}' does not exist.")
+
+        path = options['path']
+        fmt = options['fmt'] or guess_format(path)
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            result = import_recipes(
+                read_rows(stream, fmt), author,
+                batch_size=options['batch_size'], dry_run=options['dry_run'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        if result.failed > len(result.errors):
+            self.stderr.write(
+                f"... {result.failed - len(result.errors)} more error(s)")
+
+        verb = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.created} recipe(s), {result.failed} failed."
+        ))
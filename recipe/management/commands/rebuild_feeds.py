@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild stored home-feed timelines, e.g. after switching "
+        "RECIPE_FEED_STRATEGY to 'write'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help="Only rebuild the given user id (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        Follow = get_user_model().following.through
+        user_ids = options['user_ids'] or (
+            Follow.objects.values_list('from_user_id', flat=True).distinct()
+        )
+
+        users = entries = 0
+        for user_id in user_ids:
+            with transaction.atomic():
+                entries += rebuild_feed(user_id)
+            users += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {users} feed(s) with {entries} entry(ies)."
+        ))
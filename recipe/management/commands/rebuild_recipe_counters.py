@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.counters import rebuild_counters
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Rebuild stored rating, comment and save counters on recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe',
+            type=int,
+            action='append',
+            dest='recipe_ids',
+            help="Only rebuild the given recipe id (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['recipe_ids']:
+            queryset = queryset.filter(pk__in=options['recipe_ids'])
+
+        with transaction.atomic():
+            updated = rebuild_counters(queryset)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {updated} recipe(s)."
+        ))
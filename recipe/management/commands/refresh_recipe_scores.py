@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipe.scores import refresh_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the top-rated and trending recipe scores with engagement "
+        "since the last run (schedule every few minutes)"
+    )
+
+    def handle(self, *args, **options):
+        rated, trending = refresh_scores()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {rated} rating score(s) and {trending} trending "
+            f"score(s)."
+        ))
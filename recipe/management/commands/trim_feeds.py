@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from recipe.feed import feed_max_length, trim_feed
+from recipe.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = "Trim stored home-feed timelines to RECIPE_FEED_MAX_LENGTH entries"
+
+    def handle(self, *args, **options):
+        user_ids = (
+            FeedEntry.objects.values('user_id')
+            .annotate(entries=Count('id'))
+            .filter(entries__gt=feed_max_length())
+            .values_list('user_id', flat=True)
+        )
+        deleted = sum(trim_feed(user_id) for user_id in user_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} feed entry(ies)."
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:34
+
+from django.db import migrations, models
+
+from recipe.counters import counter_expressions
+
+
+def backfill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Rating = apps.get_model('interactions', 'Rating')
+    Comment = apps.get_model('interactions', 'Comment')
+    SavedRecipe = apps.get_model('interactions', 'SavedRecipe')
+    Recipe.objects.update(
+        **counter_expressions(Rating, Comment, SavedRecipe))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_remove_recipe_saved_by'),
+        ('interactions', '0003_savedrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ratings_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='saves_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
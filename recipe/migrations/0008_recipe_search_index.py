@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:05
+
+from django.db import migrations
+
+INDEX_NAME = 'recipe_recipe_search_idx'
+
+
+def create_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from recipe.search import search_vector
+
+        schema_editor.add_index(
+            Recipe, GinIndex(search_vector(), name=INDEX_NAME))
+    elif vendor == 'mysql':
+        from recipe.search import SEARCH_FIELDS
+
+        quote = schema_editor.quote_name
+        columns = ', '.join(quote(field) for field in SEARCH_FIELDS)
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX {quote(INDEX_NAME)} '
+            f'ON {quote(Recipe._meta.db_table)} ({columns})'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {quote(INDEX_NAME)}')
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            f'DROP INDEX {quote(INDEX_NAME)} '
+            f'ON {quote(Recipe._meta.db_table)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        # Full-text index for recipe search; SQLite uses the in-process
+        # index in recipe.search instead
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from recipe.ingredients import sync_recipe_ingredients
+
+
+def parse_existing_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Ingredient = apps.get_model('recipe', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipe', 'RecipeIngredient')
+    recipes = Recipe.objects.only('pk', 'ingredients').iterator(chunk_size=500)
+    for recipe in recipes:
+        sync_recipe_ingredients(recipe, Ingredient, RecipeIngredient)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('unit', models.CharField(blank=True, max_length=20)),
+                ('text', models.CharField(blank=True, max_length=255)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipe.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipe.recipe')),
+            ],
+            options={
+                'ordering': ['recipe', 'position'],
+                'indexes': [models.Index(fields=['ingredient', 'recipe'], name='recipe_reci_ingredi_cc8d25_idx')],
+                'unique_together': {('recipe', 'ingredient')},
+            },
+        ),
+        migrations.RunPython(
+            parse_existing_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:06
+
+from django.db import migrations
+
+from recipe.counters import counter_expressions
+
+
+def merge_ratings(apps, schema_editor):
+    # Move ratings from the old recipe.Rating table into interactions.Rating,
+    # the one the API writes to. Existing interaction ratings win
+    OldRating = apps.get_model('recipe', 'Rating')
+    Rating = apps.get_model('interactions', 'Rating')
+    Comment = apps.get_model('interactions', 'Comment')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    SavedRecipe = apps.get_model('interactions', 'SavedRecipe')
+
+    existing = set(Rating.objects.values_list('user_id', 'recipe_id'))
+    old_ratings = (
+        OldRating.objects
+        .select_related('recipe')
+        .order_by('pk')
+        .iterator(chunk_size=2000)
+    )
+    for old in old_ratings:
+        if (old.user_id, old.recipe_id) in existing:
+            continue
+        if old.user_id == old.recipe.author_id:
+            continue
+        rating = Rating.objects.create(
+            user_id=old.user_id, recipe_id=old.recipe_id,
+            score=min(max(old.score, 1), 5))
+        # auto_now_add fields ignore the value given on create
+        Rating.objects.filter(pk=rating.pk).update(
+            created_at=old.created_at, updated_at=old.created_at)
+        if old.comment:
+            comment = Comment.objects.create(
+                user_id=old.user_id, recipe_id=old.recipe_id,
+                comment=old.comment)
+            Comment.objects.filter(pk=comment.pk).update(
+                created_at=old.created_at, updated_at=old.created_at)
+
+    Recipe.objects.update(
+        **counter_expressions(Rating, Comment, SavedRecipe))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0012_image_variants'),
+        ('interactions', '0003_savedrecipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_ratings, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='Rating',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_choices(apps, schema_editor):
+    # The filters now match lower-cased input exactly
+    Recipe = apps.get_model('recipe', 'Recipe')
+    for field in ('cuisine_type', 'meal_type', 'dietary_tags',
+                  'difficulty_level'):
+        Recipe.objects.exclude(**{field: Lower(field)}).update(
+            **{field: Lower(field)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0014_recipe_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_choices, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_reci_cuisine_1ff39b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_reci_meal_ty_996cf6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cuisine_type', 'meal_type', '-created_at', '-id'], name='recipe_reci_cuisine_82932e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['meal_type', '-created_at', '-id'], name='recipe_reci_meal_ty_22761d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['dietary_tags', 'difficulty_level', '-created_at', '-id'], name='recipe_reci_dietary_52f960_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['difficulty_level', '-created_at', '-id'], name='recipe_reci_difficu_ae8479_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0016_recipe_import_batch'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipesimilarity',
+            options={'ordering': ['recipe', '-collaborative', '-score']},
+        ),
+        migrations.AddField(
+            model_name='recipesimilarity',
+            name='collaborative',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -3,6 +3,31 @@ from django.conf import settings
 from django.core.validators import MinValueValidator
 
 
+class RecipeQuerySet(models.QuerySet):
+    # Columns read by RecipeListSerializer
+    LIST_FIELDS = [
+        'id',
+        'title',
+        'description',
+        'author__username',
+        'cuisine_type',
+        'meal_type',
+        'difficulty_level',
+        'image',
+        'image_variants',
+        'prep_time',
+        'cook_time',
+        'servings',
+        'ratings_count',
+        'rating_sum',
+        'created_at',
+    ]
+
+    def for_list(self):
+        # One query per page: author joined, large text columns deferred
+        return self.select_related('author').only(*self.LIST_FIELDS)
+
+
 class Recipe(models.Model):
     CUISINE_CHOICES = [
         ('italian', 'Italian'),
@@ -108,10 +133,30 @@ class Recipe(models.Model):
         blank=True,
         null=True
     )
+    # Resized copies made by the background worker, see api.images
+    image_variants = models.JSONField(default=dict, blank=True)
 
     # Engagement Metrics
     views_count = models.IntegerField(default=0)
 
+    # Denormalized counters, maintained by interactions.signals and
+    # rebuilt with `manage.py rebuild_recipe_counters`
+    ratings_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    saves_count = models.IntegerField(default=0)
+
+    # Ranking scores refreshed by `manage.py refresh_recipe_scores`, see
+    # recipe.scores. `trending_views` is the views_count already counted
+    score = models.FloatField(default=0)
+    trending_score = models.FloatField(default=0)
+    trending_views = models.IntegerField(default=0)
+
+    # Set while recipe.bulk reads back an imported batch on databases
+    # whose bulk inserts don't return ids (MySQL), cleared right after
+    import_batch = models.UUIDField(
+        null=True, blank=True, editable=False, db_index=True)
+
     # saved_by = models.ManyToManyField(
     #     settings.AUTH_USER_MODEL,
     #     related_name="saved_recipes",
@@ -122,18 +167,40 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
-            models.Index(fields=['cuisine_type']),
-            models.Index(fields=['meal_type']),
-            models.Index(fields=['author']),
+            models.Index(fields=['-created_at', '-id']),
+            # Equality filters of RecipeFilter, alone or combined, with the
+            # default ordering
+            models.Index(
+                fields=['cuisine_type', 'meal_type', '-created_at', '-id']),
+            models.Index(fields=['meal_type', '-created_at', '-id']),
+            models.Index(fields=['dietary_tags', 'difficulty_level',
+                                 '-created_at', '-id']),
+            models.Index(fields=['difficulty_level', '-created_at', '-id']),
+            # Per-author keyset reads for the home feed
+            models.Index(fields=['author', '-created_at', '-id']),
+            # ?ordering=-score and /trending/
+            models.Index(fields=['-score', '-id']),
+            models.Index(fields=['-trending_score', '-id']),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored text so saves only re-parse changed ingredients
+        if 'ingredients' in field_names:
+            text = values[field_names.index('ingredients')]
+            if text is not models.DEFERRED:
+                instance._stored_ingredients = text
+        return instance
+
     @property
     def total_time(self):
         # Calculate total cooking time
@@ -143,46 +210,116 @@ class Recipe(models.Model):
 
     @property
     def average_rating(self):
-        # Calculate average rating from all ratings
-        ratings = self.recipe_ratings.all()
-        if ratings.exists():
-            return round(sum(r.score for r in ratings) / ratings.count(), 1)
+        # Average rating from the stored sum and count
+        if self.ratings_count:
+            return round(self.rating_sum / self.ratings_count, 1)
         return 0
 
-    @property
-    def ratings_count(self):
-        # """Get total number of ratings"""
-        return self.recipe_ratings.count()
 
-    @property
-    def comments_count(self):
-        # """Get total number of comments"""
-        return self.comments.count()
+class Ingredient(models.Model):
+    # Normalized name, see recipe.ingredients.normalize_name
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
-    @property
-    def saves_count(self):
-        # """Get total number of saves"""
-        return self.saved_by.count()
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
 
 
-class Rating(models.Model):
+class RecipeIngredient(models.Model):
+    # One parsed line of Recipe.ingredients
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
-        related_name='recipe_ratings'
+        related_name='recipe_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients'
+    )
+    quantity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
     )
+    unit = models.CharField(max_length=20, blank=True)
+    text = models.CharField(max_length=255, blank=True)
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('recipe', 'ingredient')
+        ordering = ['recipe', 'position']
+        indexes = [
+            # Covers "recipes containing these ingredients" lookups
+            models.Index(fields=['ingredient', 'recipe']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id}: {self.text or self.ingredient_id}"
+
+
+class FeedEntry(models.Model):
+    # Precomputed home-feed row, used by the fan-out-on-write strategy
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
     )
-    score = models.PositiveSmallIntegerField(default=1)
-    comment = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copied from the recipe so a timeline is read from this table alone
+    created_at = models.DateTimeField()
 
     class Meta:
-        unique_together = ('recipe', 'user')  # Prevent duplicate user ratings
+        unique_together = ('user', 'recipe')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe']),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} rated {self.recipe.title} ({self.score})"
+        return f"{self.user_id}: {self.recipe_id}"
 
+
+class RecipeSimilarity(models.Model):
+    # Precomputed neighbour of a recipe, see recipe.recommendations
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of'
+    )
+    score = models.FloatField()
+    # False for content-based filler, which ranks after every
+    # co-interaction neighbour whatever the scores
+    collaborative = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ('recipe', 'similar')
+        ordering = ['recipe', '-collaborative', '-score']
+        indexes = [
+            models.Index(fields=['recipe', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class ScoreRefresh(models.Model):
+    # Single row: engagement up to `refreshed_at` is in the stored
+    # trending scores
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Scores refreshed at {self.refreshed_at}"
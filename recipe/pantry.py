@@ -0,0 +1,216 @@
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+
+# Bumped in the shared cache whenever any process changes recipe
+# ingredients; REMOVALS_KEY only when recipes leave the index
+VERSION_KEY = 'pantry:version'
+REMOVALS_KEY = 'pantry:removals'
+
+
+def _bump(key):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted in between
+        cache.add(key, 1, None)
+        return None
+
+
+class PantryIndex:
+    """
+    In-memory ingredient bitsets for "what can I cook" matching.
+
+    Every ingredient gets a bit position and every recipe an integer mask
+    of its ingredients, so matching a pantry is `mask & ~pantry` plus a
+    popcount per recipe, with no database queries. Recipes are bucketed by
+    ingredient count so buckets that cannot match are skipped.
+
+    Built from RecipeIngredient on first use and updated in place when a
+    recipe's ingredients are re-parsed or the recipe is deleted, once the
+    change commits. Changes made by other processes are picked up through
+    a version number in the shared cache: new RecipeIngredient rows are
+    loaded past the highest id seen so far, and removed recipes trigger a
+    rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._bits = None
+        self._ingredients = []
+        self._masks = {}
+        self._buckets = defaultdict(set)
+        self._version = None
+        self._removals = None
+        self._watermark = 0
+
+    def _ensure_built(self):
+        version = cache.get(VERSION_KEY, 0)
+        if self._bits is not None and version == self._version:
+            return
+
+        with self._lock:
+            # Read before loading, so changes committed meanwhile are
+            # picked up on the next call
+            version = cache.get(VERSION_KEY, 0)
+            removals = cache.get(REMOVALS_KEY, 0)
+            if self._bits is not None and version == self._version:
+                return
+            if self._bits is None or removals != self._removals:
+                self._build()
+            else:
+                self._load_changes()
+            self._version, self._removals = version, removals
+
+    def _build(self):
+        from .models import RecipeIngredient
+
+        self._bits = {}
+        self._ingredients = []
+        self._masks = {}
+        self._buckets = defaultdict(set)
+        self._watermark = 0
+        masks = defaultdict(int)
+        rows = (
+            RecipeIngredient.objects
+            .order_by()
+            .values_list('id', 'recipe_id', 'ingredient_id')
+        )
+        for pk, recipe_id, ingredient_id in rows.iterator(chunk_size=5000):
+            masks[recipe_id] |= 1 << self._bit(ingredient_id)
+            self._watermark = max(self._watermark, pk)
+        for recipe_id, mask in masks.items():
+            self._store(recipe_id, mask)
+
+    def _load_changes(self):
+        # Re-parsing replaces a recipe's rows, so recipes with rows past
+        # the watermark are reloaded whole
+        from .models import RecipeIngredient
+
+        recipe_ids = set(
+            RecipeIngredient.objects
+            .filter(id__gt=self._watermark)
+            .values_list('recipe_id', flat=True)
+        )
+        if not recipe_ids:
+            return
+        masks = dict.fromkeys(recipe_ids, 0)
+        rows = (
+            RecipeIngredient.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('id', 'recipe_id', 'ingredient_id')
+        )
+        for pk, recipe_id, ingredient_id in rows:
+            masks[recipe_id] |= 1 << self._bit(ingredient_id)
+            self._watermark = max(self._watermark, pk)
+        for recipe_id, mask in masks.items():
+            self._discard(recipe_id)
+            if mask:
+                self._store(recipe_id, mask)
+
+    def _publish(self, removed=False):
+        # Tell other processes; skip our own reload when no other change
+        # came in since our last sync
+        version = _bump(VERSION_KEY)
+        removals = _bump(REMOVALS_KEY) if removed else self._removals
+        in_step = (
+            self._version is not None and version == self._version + 1
+            and (not removed or (
+                self._removals is not None and removals == self._removals + 1))
+        )
+        if in_step:
+            self._version, self._removals = version, removals
+
+    def _bit(self, ingredient_id):
+        bit = self._bits.get(ingredient_id)
+        if bit is None:
+            bit = self._bits[ingredient_id] = len(self._ingredients)
+            self._ingredients.append(ingredient_id)
+        return bit
+
+    def _store(self, recipe_id, mask):
+        self._masks[recipe_id] = mask
+        self._buckets[mask.bit_count()].add(recipe_id)
+
+    def _discard(self, recipe_id):
+        mask = self._masks.pop(recipe_id, None)
+        if mask is not None:
+            self._buckets[mask.bit_count()].discard(recipe_id)
+
+    def mask_for(self, ingredient_ids):
+        # Unknown ingredients can't appear in any recipe, so they are skipped
+        self._ensure_built()
+        mask = 0
+        for ingredient_id in ingredient_ids:
+            bit = self._bits.get(ingredient_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def ingredient_ids(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self._ingredients[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        self.update_recipes({recipe_id: ingredient_ids})
+
+    def update_recipes(self, ingredient_ids_by_recipe):
+        """Set the ingredients of {recipe_id: ingredient ids}"""
+        with self._lock:
+            if self._bits is not None:
+                for recipe_id, ingredient_ids in ingredient_ids_by_recipe.items():
+                    self._discard(recipe_id)
+                    mask = 0
+                    for ingredient_id in ingredient_ids:
+                        mask |= 1 << self._bit(ingredient_id)
+                    if mask:
+                        self._store(recipe_id, mask)
+            # A recipe left without ingredients has no rows to load
+            self._publish(removed=not all(ingredient_ids_by_recipe.values()))
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if self._bits is not None:
+                self._discard(recipe_id)
+            self._publish(removed=True)
+
+    def reset(self):
+        # Drop the index; it is rebuilt from the database on next use
+        with self._lock:
+            self._bits = None
+            self._ingredients = []
+            self._masks = {}
+            self._buckets = defaultdict(set)
+            self._version = None
+            self._removals = None
+
+    def match(self, ingredient_ids, max_missing=0):
+        """
+        Return (recipe_id, missing_mask) for recipes missing at most
+        `max_missing` ingredients, fewest missing first.
+        """
+        pantry = self.mask_for(ingredient_ids)
+        have = pantry.bit_count()
+        matches = []
+        with self._lock:
+            for size, recipe_ids in self._buckets.items():
+                # A recipe with more ingredients than the pantry holds
+                # plus the allowance is always missing too many
+                if size > have + max_missing:
+                    continue
+                for recipe_id in recipe_ids:
+                    missing = self._masks[recipe_id] & ~pantry
+                    count = missing.bit_count()
+                    if count <= max_missing:
+                        matches.append((count, -size, recipe_id, missing))
+        matches.sort()
+        return [(recipe_id, missing) for _, _, recipe_id, missing in matches]
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,169 @@
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Recipe, RecipeSimilarity
+
+# Neighbours stored per recipe
+TOP_N = 20
+# Recipes whose neighbours are computed and written together
+BATCH_SIZE = 500
+# Interactions per user that take part in the computation (newest
+# ratings, then newest saves); very active users would otherwise
+# dominate the pair count
+MAX_ITEMS_PER_USER = 500
+# Implicit weight of saving a recipe, on the same 0-1 scale as score / 5
+SAVE_WEIGHT = 1.0
+# Categorical fields compared for content-based neighbours
+CONTENT_FIELDS = ('cuisine_type', 'meal_type', 'dietary_tags',
+                  'difficulty_level')
+# Scale of content match scores. Cosine scores can be as small, so
+# content rows are stored with collaborative=False and ranked by that flag
+# first; the weight only keeps summed recommendation scores comparable
+CONTENT_WEIGHT = 0.01
+# Newest recipes per category value considered as content neighbours
+CONTENT_CANDIDATES = 1000
+
+
+def load_interactions():
+    """
+    Sparse user x recipe matrix from ratings and saves.
+
+    Returns (by_user, by_recipe): {user_id: {recipe_id: weight}} and its
+    transpose. A rating contributes score / 5, a save SAVE_WEIGHT.
+    """
+    from interactions.models import Rating, SavedRecipe
+
+    by_user = defaultdict(dict)
+    ratings = (
+        Rating.objects.order_by('user_id', '-created_at')
+        .values_list('user_id', 'recipe_id', 'score')
+    )
+    for user_id, recipe_id, score in ratings.iterator(chunk_size=5000):
+        by_user[user_id][recipe_id] = score / 5
+    saves = (
+        SavedRecipe.objects.order_by('user_id', '-saved_at')
+        .values_list('user_id', 'recipe_id')
+    )
+    for user_id, recipe_id in saves.iterator(chunk_size=5000):
+        row = by_user[user_id]
+        row[recipe_id] = row.get(recipe_id, 0) + SAVE_WEIGHT
+
+    by_recipe = defaultdict(dict)
+    for user_id, row in by_user.items():
+        if len(row) > MAX_ITEMS_PER_USER:
+            row = dict(list(row.items())[:MAX_ITEMS_PER_USER])
+            by_user[user_id] = row
+        for recipe_id, weight in row.items():
+            by_recipe[recipe_id][user_id] = weight
+    return by_user, by_recipe
+
+
+def collaborative_scores(recipe_ids, by_user, by_recipe, norms):
+    """
+    Cosine similarity between each recipe in the batch and every recipe
+    sharing a user with it: {recipe_id: {other_id: score}}.
+    """
+    batch = {}
+    for recipe_id in recipe_ids:
+        dots = defaultdict(float)
+        for user_id, weight in by_recipe.get(recipe_id, {}).items():
+            for other_id, other_weight in by_user[user_id].items():
+                dots[other_id] += weight * other_weight
+        dots.pop(recipe_id, None)
+        norm = norms.get(recipe_id)
+        batch[recipe_id] = {
+            other_id: dot / (norm * norms[other_id])
+            for other_id, dot in dots.items()
+        }
+    return batch
+
+
+def content_scores(recipe_ids, attributes, groups, top_n):
+    """
+    Recipes sharing categorical fields, for recipes with too few
+    collaborative neighbours: {recipe_id: {other_id: score}}.
+    """
+    batch = {}
+    for recipe_id in recipe_ids:
+        mine = attributes[recipe_id]
+        scores = defaultdict(int)
+        for field, value in zip(CONTENT_FIELDS, mine):
+            if not value:
+                continue
+            for other_id in groups[field].get(value, [])[-CONTENT_CANDIDATES:]:
+                scores[other_id] += 1
+        scores.pop(recipe_id, None)
+        best = heapq.nlargest(
+            top_n, scores.items(), key=lambda item: (item[1], item[0]))
+        batch[recipe_id] = {
+            other_id: CONTENT_WEIGHT * shared / len(CONTENT_FIELDS)
+            for other_id, shared in best
+        }
+    return batch
+
+
+def build_similarities(top_n=TOP_N, batch_size=BATCH_SIZE):
+    """
+    Recompute RecipeSimilarity for every recipe. Returns rows written.
+
+    Collaborative neighbours come first; recipes with fewer than `top_n`
+    of them are topped up with content-based neighbours (stored with
+    collaborative=False) so new recipes still get suggestions. Each batch
+    is replaced in its own transaction.
+    """
+    by_user, by_recipe = load_interactions()
+    norms = {
+        recipe_id: math.sqrt(sum(w * w for w in users.values()))
+        for recipe_id, users in by_recipe.items()
+    }
+
+    attributes = {}
+    groups = {field: defaultdict(list) for field in CONTENT_FIELDS}
+    rows = Recipe.objects.order_by('pk').values_list('pk', *CONTENT_FIELDS)
+    for pk, *values in rows.iterator(chunk_size=5000):
+        attributes[pk] = values
+        for field, value in zip(CONTENT_FIELDS, values):
+            if value:
+                groups[field][value].append(pk)
+
+    recipe_ids = list(attributes)
+    written = 0
+    for start in range(0, len(recipe_ids), batch_size):
+        batch_ids = recipe_ids[start:start + batch_size]
+        collaborative = collaborative_scores(
+            batch_ids, by_user, by_recipe, norms)
+        sparse = [
+            pk for pk in batch_ids if len(collaborative.get(pk, ())) < top_n]
+        content = content_scores(sparse, attributes, groups, top_n)
+
+        objects = []
+        for recipe_id in batch_ids:
+            best = heapq.nlargest(
+                top_n, collaborative.get(recipe_id, {}).items(),
+                key=lambda item: (item[1], -item[0]))
+            objects += [
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=other_id, score=score)
+                for other_id, score in best
+                if other_id in attributes
+            ]
+            # Content neighbours only fill the remaining places
+            taken = {other_id for other_id, _ in best}
+            filler = sorted(
+                content.get(recipe_id, {}).items(),
+                key=lambda item: (-item[1], item[0]))
+            objects += [
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=other_id, score=score,
+                    collaborative=False)
+                for other_id, score in filler
+                if other_id not in taken
+            ][:top_n - len(best)]
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=batch_ids).delete()
+            RecipeSimilarity.objects.bulk_create(objects, batch_size=1000)
+        written += len(objects)
+    return written
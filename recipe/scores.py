@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Abs, Cast
+from django.utils import timezone
+
+from .cache import invalidate_lists
+from .models import Recipe, ScoreRefresh
+
+# Weight of the site-wide mean in the Bayesian average, in ratings: a
+# recipe needs about this many ratings before its own mean dominates
+PRIOR_RATINGS = 10
+# Stored scores closer than this to the current value are not rewritten
+SCORE_TOLERANCE = 0.001
+# Trending points of one interaction before decay; ratings are scaled by
+# score / 5
+VIEW_WEIGHT = 1.0
+RATING_WEIGHT = 3.0
+COMMENT_WEIGHT = 3.0
+SAVE_WEIGHT = 4.0
+# Trending points lose half their weight every TRENDING_HALF_LIFE
+TRENDING_HALF_LIFE = timedelta(hours=24)
+# Engagement counted by the first refresh
+INITIAL_WINDOW = timedelta(days=7)
+# Decayed scores below this drop to 0 and leave /trending/
+MIN_TRENDING = 0.01
+# Interactions are read up to this long ago, so rows whose transaction
+# was still open at refresh time are picked up by the next run
+COMMIT_LAG = timedelta(seconds=30)
+BATCH_SIZE = 500
+
+
+def site_mean_rating():
+    totals = Recipe.objects.aggregate(
+        rating_sum=Sum('rating_sum'), ratings_count=Sum('ratings_count'))
+    if not totals['ratings_count']:
+        return 0.0
+    return totals['rating_sum'] / totals['ratings_count']
+
+
+def bayesian_average(prior_mean, prior=PRIOR_RATINGS):
+    """
+    Expression for (prior * prior_mean + rating_sum) / (prior + ratings_count):
+    a recipe's mean rating pulled towards the site mean, so a single
+    5-star rating doesn't outrank a hundred 4.8s.
+    """
+    return (
+        (Value(prior * prior_mean) + Cast('rating_sum', FloatField()))
+        / (Value(float(prior)) + Cast('ratings_count', FloatField()))
+    )
+
+
+def refresh_rating_scores(prior=PRIOR_RATINGS):
+    """
+    Store the Bayesian average of each rated recipe in `score`; unrated
+    recipes score 0. Only rows whose score changed are written.
+    """
+    expression = bayesian_average(site_mean_rating(), prior)
+    updated = (
+        Recipe.objects.filter(ratings_count__gt=0)
+        .alias(drift=Abs(F('score') - expression))
+        .filter(drift__gt=SCORE_TOLERANCE)
+        .update(score=expression)
+    )
+    # Recipes that lost their last rating
+    updated += (
+        Recipe.objects.filter(ratings_count=0)
+        .exclude(score=0)
+        .update(score=0)
+    )
+    return updated
+
+
+def _decay(elapsed):
+    return 0.5 ** (elapsed / TRENDING_HALF_LIFE)
+
+
+def _trending_points(since, until):
+    # Decayed points per recipe for interactions in (since, until]
+    from interactions.models import Comment, Rating, SavedRecipe
+
+    points = defaultdict(float)
+    ratings = (
+        Rating.objects.filter(updated_at__gt=since, updated_at__lte=until)
+        .values_list('recipe_id', 'updated_at', 'score')
+    )
+    for recipe_id, at, score in ratings.iterator(chunk_size=2000):
+        points[recipe_id] += RATING_WEIGHT * score / 5 * _decay(until - at)
+
+    comments = (
+        Comment.objects.filter(created_at__gt=since, created_at__lte=until)
+        .values_list('recipe_id', 'created_at')
+    )
+    for recipe_id, at in comments.iterator(chunk_size=2000):
+        points[recipe_id] += COMMENT_WEIGHT * _decay(until - at)
+
+    saves = (
+        SavedRecipe.objects.filter(saved_at__gt=since, saved_at__lte=until)
+        .values_list('recipe_id', 'saved_at')
+    )
+    for recipe_id, at in saves.iterator(chunk_size=2000):
+        points[recipe_id] += SAVE_WEIGHT * _decay(until - at)
+    return points
+
+
+def refresh_trending_scores(now=None):
+    """
+    Fold engagement since the previous run into `trending_score`.
+
+    Stored scores are first decayed by the time elapsed since that run,
+    then each recipe with new ratings, comments, saves or views gets its
+    new points added. Views carry no timestamp and count as of now.
+    Returns the number of recipes that gained points.
+    """
+    until = (now or timezone.now()) - COMMIT_LAG
+
+    with transaction.atomic():
+        state = ScoreRefresh.objects.select_for_update().first()
+        if state is None:
+            since = until - INITIAL_WINDOW
+            # Earlier views can't be dated; start counting from here
+            Recipe.objects.update(trending_views=F('views_count'))
+        else:
+            since = state.refreshed_at
+        if since >= until:
+            return 0
+
+        decayed = Recipe.objects.filter(trending_score__gt=0)
+        decayed.update(
+            trending_score=F('trending_score') * _decay(until - since))
+        decayed.filter(trending_score__lt=MIN_TRENDING).update(
+            trending_score=0)
+
+        points = _trending_points(since, until)
+        seen_views = {}
+        viewed = (
+            Recipe.objects.filter(views_count__gt=F('trending_views'))
+            .values_list('id', 'views_count', 'trending_views')
+        )
+        for recipe_id, views, counted in viewed.iterator(chunk_size=2000):
+            points[recipe_id] += VIEW_WEIGHT * (views - counted)
+            seen_views[recipe_id] = views
+
+        recipe_ids = list(points)
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = (
+                Recipe.objects.only('trending_score', 'trending_views')
+                .in_bulk(recipe_ids[start:start + BATCH_SIZE])
+            )
+            for recipe_id, recipe in batch.items():
+                recipe.trending_score += points[recipe_id]
+                recipe.trending_views = seen_views.get(
+                    recipe_id, recipe.trending_views)
+            Recipe.objects.bulk_update(
+                batch.values(), ['trending_score', 'trending_views'])
+
+        if state is None:
+            ScoreRefresh.objects.create(refreshed_at=until)
+        else:
+            state.refreshed_at = until
+            state.save(update_fields=['refreshed_at'])
+    return len(recipe_ids)
+
+
+def refresh_scores(now=None):
+    """Refresh both rankings; run periodically. Returns (rated, trending)"""
+    rated = refresh_rating_scores()
+    trending = refresh_trending_scores(now)
+    # Cached list pages may be ordered by either score
+    invalidate_lists()
+    return rated, trending
@@ -0,0 +1,274 @@
+import bisect
+import heapq
+import math
+import re
+import sys
+import threading
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+# Columns covered by the full-text index, with their relative weights
+SEARCH_FIELDS = {
+    'title': 'A',
+    'description': 'B',
+    'ingredients': 'B',
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+class BaseSearchBackend:
+    """
+    Full-text search over recipes.
+
+    `search` filters a queryset to the recipes matching every term and
+    annotates a `search_rank` relevance score. `update` and `remove` keep
+    the index current for backends that maintain it themselves.
+    """
+
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+    def update(self, recipe):
+        pass
+
+    def remove(self, recipe_id):
+        pass
+
+    def reset(self):
+        pass
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    # tsvector search served by the GIN index added in the migrations
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        words = tokenize(' '.join(terms))
+        if not words:
+            return queryset
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            search_type='raw',
+            config='english',
+        )
+        vector = search_vector()
+        return (
+            queryset
+            .alias(search_document=vector)
+            .filter(search_document=query)
+            .annotate(search_rank=SearchRank(vector, query))
+        )
+
+
+def search_vector():
+    # Shared by the query and the index so the planner can use the index
+    from django.contrib.postgres.search import SearchVector
+
+    vectors = [
+        SearchVector(field, weight=weight, config='english')
+        for field, weight in SEARCH_FIELDS.items()
+    ]
+    combined = vectors[0]
+    for vector in vectors[1:]:
+        combined = combined + vector
+    return combined
+
+
+class MySQLSearchBackend(BaseSearchBackend):
+    # MATCH ... AGAINST served by the FULLTEXT index added in the migrations
+
+    def search(self, queryset, terms):
+        words = tokenize(' '.join(terms))
+        if not words:
+            return queryset
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ', '.join(
+            f'{table}.{connection.ops.quote_name(field)}'
+            for field in SEARCH_FIELDS
+        )
+        against = ' '.join(f'+{word}*' for word in words)
+        match = RawSQL(
+            f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)',
+            [against],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=match).filter(search_rank__gt=0)
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """
+    In-process inverted index, for SQLite and tests.
+
+    Built from the database on first use and kept current from recipe
+    save and delete signals. Terms match word prefixes; ranking is TF-IDF
+    with field weights. Only the `max_results` best matches are returned,
+    which keeps the relevance CASE and the id list within SQL limits.
+    """
+    weights = {'A': 2.0, 'B': 1.0}
+    max_results = 200
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        # Sorted tokens, so a prefix maps to one contiguous slice
+        self._vocabulary = []
+        self._documents = {}
+
+    def _ensure_built(self):
+        if self._postings is not None:
+            return
+        from .models import Recipe
+
+        with self._lock:
+            if self._postings is not None:
+                return
+            self._postings = defaultdict(dict)
+            rows = Recipe.objects.values_list('pk', *SEARCH_FIELDS)
+            for pk, *values in rows.iterator(chunk_size=2000):
+                self._add(pk, dict(zip(SEARCH_FIELDS, values)), build=True)
+            self._vocabulary = sorted(self._postings)
+
+    def _add(self, pk, values, build=False):
+        scores = defaultdict(float)
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(values.get(field)):
+                scores[token] += self.weights[weight]
+        for token, score in scores.items():
+            if not build and token not in self._postings:
+                bisect.insort(self._vocabulary, token)
+            self._postings[token][pk] = score
+        self._documents[pk] = list(scores)
+
+    def _discard(self, pk):
+        for token in self._documents.pop(pk, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(pk, None)
+                if not postings:
+                    del self._postings[token]
+                    index = bisect.bisect_left(self._vocabulary, token)
+                    del self._vocabulary[index]
+
+    def update(self, recipe):
+        if self._postings is None:
+            return
+        with self._lock:
+            self._discard(recipe.pk)
+            self._add(recipe.pk, {
+                field: getattr(recipe, field) for field in SEARCH_FIELDS
+            })
+
+    def remove(self, recipe_id):
+        if self._postings is None:
+            return
+        with self._lock:
+            self._discard(recipe_id)
+
+    def reset(self):
+        # Drop the index; it is rebuilt from the database on next use
+        with self._lock:
+            self._postings = None
+            self._vocabulary = []
+            self._documents = {}
+
+    def _prefixed(self, word):
+        start = bisect.bisect_left(self._vocabulary, word)
+        end = bisect.bisect_left(self._vocabulary, word + chr(sys.maxunicode))
+        return self._vocabulary[start:end]
+
+    def rank(self, words):
+        """Return {recipe_id: score} for recipes matching every word"""
+        self._ensure_built()
+        total = max(len(self._documents), 1)
+        ranks = None
+        with self._lock:
+            for word in words:
+                matches = defaultdict(float)
+                for token in self._prefixed(word):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for pk, score in postings.items():
+                        matches[pk] += score * idf
+                if ranks is None:
+                    ranks = matches
+                else:
+                    ranks = {
+                        pk: ranks[pk] + score
+                        for pk, score in matches.items() if pk in ranks
+                    }
+                if not ranks:
+                    break
+        return ranks or {}
+
+    def search(self, queryset, terms):
+        words = tokenize(' '.join(terms))
+        if not words:
+            return queryset
+        ranks = self.rank(words)
+        if not ranks:
+            return queryset.none()
+        if len(ranks) > self.max_results:
+            ranks = dict(heapq.nlargest(
+                self.max_results, ranks.items(), key=itemgetter(1)))
+        return queryset.filter(pk__in=list(ranks)).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(score)) for pk, score in ranks.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'mysql': MySQLSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Backend from RECIPE_SEARCH_BACKEND, or picked by database vendor"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'RECIPE_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        else:
+            _backend = BACKENDS.get(
+                connection.vendor, InvertedIndexSearchBackend)()
+    return _backend
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the full-text index, ordered by relevance.
+
+    Must come after OrderingFilter in `filter_backends` so relevance wins
+    unless the client asked for an explicit ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        queryset = get_search_backend().search(queryset, terms)
+        if 'search_rank' not in queryset.query.annotations:
+            return queryset
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
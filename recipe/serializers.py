@@ -1,9 +1,21 @@
 from rest_framework import serializers
 from users.serializers import UserProfileSerializer
-from .models import Recipe
+from interactions.viewer_state import (MAX_STATE_BATCH, get_viewer_state,
+                                       ViewerStateListSerializer)
+from api.images import ImageVariantsField
+from api.sparse import SparseFieldsetsMixin
+from api.uploads import ImageUploadField
+from .models import Recipe, RecipeIngredient
 
-class RecipeSerializer(serializers.ModelSerializer):
-    author = UserProfileSerializer(read_only=True)
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='ingredient.name', read_only=True)
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ['name', 'quantity', 'unit', 'text']
+
+
+class RecipeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     author_username = serializers.CharField(
         source='author.username', read_only=True)
     average_rating = serializers.ReadOnlyField()
@@ -11,8 +23,11 @@ class RecipeSerializer(serializers.ModelSerializer):
     comments_count = serializers.ReadOnlyField()
     saves_count = serializers.ReadOnlyField()
     total_time = serializers.ReadOnlyField()
+    ingredient_items = RecipeIngredientSerializer(
+        source='recipe_ingredients', many=True, read_only=True)
     is_saved = serializers.SerializerMethodField()
     user_rating = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -20,9 +35,9 @@ class RecipeSerializer(serializers.ModelSerializer):
             'id',
             'title',
             'description',
-            'author',
             'author_username',
             'ingredients',
+            'ingredient_items',
             'instructions',
             'cuisine_type',
             'meal_type',
@@ -33,6 +48,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'servings',
             'difficulty_level',
             'image',
+            'image_variants',
             'average_rating',
             'ratings_count',
             'comments_count',
@@ -50,22 +66,34 @@ class RecipeSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at'
         ]
+        list_serializer_class = ViewerStateListSerializer
+        # The full author profile is only added on ?expand=author
+        expandable_fields = {
+            'author': lambda: UserProfileSerializer(read_only=True),
+        }
+        # Columns behind model properties, for ?fields= queryset pruning
+        field_columns = {
+            'average_rating': ['ratings_count', 'rating_sum'],
+            'total_time': ['prep_time', 'cook_time'],
+        }
+        field_prefetches = {
+            'ingredient_items': ['recipe_ingredients__ingredient'],
+        }
 
     def get_is_saved(self, obj):
         # """Check if current user has saved this recipe"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.saved_by.filter(id=request.user.id).exists()
-        return False
+        return get_viewer_state(self.context).is_saved(obj.id)
 
     def get_user_rating(self, obj):
         # """Get current user's rating for this recipe"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            rating = obj.ratings.filter(id=request.user.id).first()
-            if rating:
-                return rating.score
-        return None
+        return get_viewer_state(self.context).user_rating(obj.id)
+
+    def load_viewer_state(self, state, instances):
+        # Only for the fields being rendered (see ?fields=)
+        if 'is_saved' in self.fields or 'user_rating' in self.fields:
+            state.load_recipes(recipe.id for recipe in instances)
+        if 'author' in self.fields:
+            state.load_users(recipe.author_id for recipe in instances)
 
     def validate_title(self, value):
         # """Ensure title is not empty and has minimum length"""
@@ -92,12 +120,13 @@ class RecipeSerializer(serializers.ModelSerializer):
         return value
  
  
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Simplified serializer for listing recipes"""
     author_username = serializers.CharField(
         source='author.username', read_only=True)
     average_rating = serializers.ReadOnlyField()
     total_time = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -110,14 +139,80 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'meal_type',
             'difficulty_level',
             'image',
+            'image_variants',
             'average_rating',
             'total_time',
             'servings',
             'created_at',
         ]
+        list_serializer_class = ViewerStateListSerializer
+        expandable_fields = RecipeSerializer.Meta.expandable_fields
+        field_columns = RecipeSerializer.Meta.field_columns
+
+    def load_viewer_state(self, state, instances):
+        if 'author' in self.fields:
+            state.load_users(recipe.author_id for recipe in instances)
+
+
+class RecipeIngredientMatchSerializer(RecipeListSerializer):
+    # """Recipe list row with how many of the requested ingredients it uses"""
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + [
+            'matched_ingredients',
+            'coverage',
+        ]
+
+
+class RecipeSimilarSerializer(RecipeListSerializer):
+    # """Recipe list row with its precomputed similarity score"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + ['similarity']
+
+
+class PantrySerializer(serializers.Serializer):
+    # """Ingredients on hand and how many missing ones are acceptable"""
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=200,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, max_value=10, default=0)
+
+
+class RecipeStateSerializer(serializers.Serializer):
+    # """Recipe ids to look up the current user's saves and ratings for"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_STATE_BATCH,
+    )
+
+
+class PantryMatchSerializer(RecipeListSerializer):
+    # """Recipe list row with the ingredients the pantry lacks"""
+    missing_count = serializers.SerializerMethodField()
+    missing_ingredients = serializers.ListField(
+        child=serializers.CharField(), read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + [
+            'missing_count',
+            'missing_ingredients',
+        ]
+
+    def get_missing_count(self, obj):
+        return len(obj.missing_ingredients)
+
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     # """Serializer for creating and updating recipes"""
+    image = ImageUploadField(required=False, allow_null=True)
 
     class Meta:
         model = Recipe
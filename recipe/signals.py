@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.images import watch_image_field
+from tasks.queue import enqueue
+from users.counters import adjust_counters
+from . import feed
+from .cache import invalidate_recipe
+from .ingredients import sync_recipe_ingredients
+from .models import Recipe
+from .pantry import pantry_index
+from .search import SEARCH_FIELDS, get_search_backend
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def count_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        adjust_counters([instance.author_id], recipes_count=1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, origin=None, **kwargs):
+    # Recipes deleted along with their author need no count
+    if isinstance(origin, get_user_model()):
+        return
+    adjust_counters([instance.author_id], recipes_count=-1)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, update_fields=None, **kwargs):
+    # Counter and view updates don't touch the searchable text
+    if update_fields and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    # Like the pantry index, only committed text becomes searchable
+    transaction.on_commit(lambda: get_search_backend().update(instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove(recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def parse_recipe_ingredients(sender, instance, created, update_fields=None,
+                             **kwargs):
+    # Re-parse RecipeIngredient rows only when the ingredient text changed
+    if update_fields and 'ingredients' not in update_fields:
+        return
+    if 'ingredients' in instance.get_deferred_fields():
+        return
+    if not created and (
+            getattr(instance, '_stored_ingredients', None) == instance.ingredients):
+        return
+    ingredient_ids = sync_recipe_ingredients(instance)
+    instance._stored_ingredients = instance.ingredients
+    # Rolled back saves must not reach the index
+    transaction.on_commit(
+        lambda: pantry_index.update_recipe(instance.pk, ingredient_ids))
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_recipe_ingredients(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: pantry_index.remove_recipe(recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    # Timelines are only maintained under the fan-out-on-write strategy
+    if created and feed.feed_strategy() == 'write':
+        enqueue('feed.fan_out', recipe_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().following.through)
+def follow_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if feed.feed_strategy() != 'write':
+        return
+    if action == 'pre_clear':
+        # pk_set is empty for clears, so collect the pairs beforehand
+        related = instance.followers if reverse else instance.following
+        pk_set = set(related.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for pk in pk_set or ():
+        # Forward: instance follows pk. Reverse: pk follows instance
+        user_id, author_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+        if action == 'post_add':
+            feed.backfill_author(user_id, author_id)
+            feed.trim_feed(user_id)
+        else:
+            feed.remove_author(user_id, author_id)
+
+
+# Thumbnails are made by the task worker; cached responses show the
+# variants once they exist
+watch_image_field(Recipe, 'image', 'image_variants', on_ready=invalidate_recipe)
@@ -1,3 +1,2005 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+import inspect
+import io
+import json
+import shutil
+import struct
+import tempfile
+import threading
+import tracemalloc
+from unittest import mock
+import uuid
+import zlib
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from PIL import Image, PngImagePlugin
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, transaction
+from django.db.models import QuerySet
+from django.test import (SimpleTestCase, TransactionTestCase, override_settings,
+                         skipUnlessDBFeature)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import resolve, reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import (APIClient, APIRequestFactory, APITestCase,
+                                 force_authenticate)
+
+from api.async_views import AsyncReadMixin
+from api.compiled import compile_serializer
+from api.pagination import KeysetPagination
+from api.renderers import FastJSONRenderer
+
+from interactions.models import Comment, Rating, SavedRecipe
+from interactions.serializers import CommentSerializer
+from tasks.models import Task
+from tasks.queue import run_until_empty
+from users.models import User
+from users.serializers import FollowSerializer
+from . import bulk
+from .counters import rebuild_counters
+from .events import RedisBroker, get_broker, recipe_channel
+from .filters import RecipeFilter
+from .ingredients import parse_ingredient_line
+from .models import FeedEntry, Ingredient, Recipe, RecipeSimilarity, ScoreRefresh
+from .pantry import PantryIndex, pantry_index
+from .recommendations import build_similarities
+from .scores import refresh_scores, refresh_trending_scores
+from .search import get_search_backend
+from .serializers import RecipeListSerializer, RecipeSerializer
+from .view_counter import view_buffer
+
+
+def make_recipe(author, **kwargs):
+    data = {
+        'title': 'Test recipe',
+        'description': 'A recipe used in tests',
+        'ingredients': 'flour\nwater',
+        'instructions': 'Mix and bake',
+    }
+    data.update(kwargs)
+    return Recipe.objects.create(author=author, **data)
+
+
+@override_settings(RECIPE_VIEW_FLUSH_INTERVAL=0)
+class RecipeAPITestCase(APITestCase):
+    # Cached responses and view counts must not leak between tests. Views
+    # are only written by explicit flushes, never by the flusher thread
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_buffer.flush)
+
+
+class RecipeListQueryCountTests(RecipeAPITestCase):
+    # The list endpoints must cost the same number of queries for any page size
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+
+    def create_recipes(self, count):
+        # Run the on-commit cache invalidation so lists aren't served stale
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                recipe = make_recipe(self.author, title=f'Recipe number {i}')
+                Rating.objects.create(user=self.fan, recipe=recipe, score=4)
+                Comment.objects.create(
+                    user=self.fan, recipe=recipe, comment='Nice')
+                SavedRecipe.objects.create(user=self.fan, recipe=recipe)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_recipe_list_query_count_is_constant(self):
+        self.create_recipes(1)
+        small, _ = self.count_queries(reverse('recipe-list-create'))
+
+        self.create_recipes(9)
+        full, response = self.count_queries(reverse('recipe-list-create'))
+
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(small, full)
+        # COUNT(*) and the page itself
+        self.assertEqual(full, 2)
+
+    def test_recipe_list_reads_stored_counters(self):
+        self.create_recipes(1)
+        _, response = self.count_queries(reverse('recipe-list-create'))
+        self.assertEqual(response.data['results'][0]['average_rating'], 4.0)
+
+    def test_saved_recipes_query_count_is_constant(self):
+        self.client.force_authenticate(self.fan)
+        self.create_recipes(1)
+        small, _ = self.count_queries(reverse('saved-recipes'))
+
+        self.create_recipes(5)
+        full, response = self.count_queries(reverse('saved-recipes'))
+
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(small, full)
+
+
+class RecipeCounterTests(RecipeAPITestCase):
+    # Stored counters must follow every interaction write and delete
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass1234')
+
+    def counters(self, recipe):
+        return (
+            Recipe.objects.filter(pk=recipe.pk)
+            .values('ratings_count', 'rating_sum', 'comments_count', 'saves_count')
+            .get()
+        )
+
+    def assertCounters(self, recipe, ratings=0, rating_sum=0, comments=0, saves=0):
+        self.assertEqual(self.counters(recipe), {
+            'ratings_count': ratings, 'rating_sum': rating_sum,
+            'comments_count': comments, 'saves_count': saves,
+        })
+
+    def interact(self, recipe):
+        for user, score in ((self.fan, 4), (self.other, 2)):
+            Rating.objects.create(user=user, recipe=recipe, score=score)
+            Comment.objects.create(user=user, recipe=recipe, comment='Nice')
+            SavedRecipe.objects.create(user=user, recipe=recipe)
+
+    def test_rating_create_update_delete(self):
+        recipe = make_recipe(self.author)
+        rating = Rating.objects.create(user=self.fan, recipe=recipe, score=4)
+        self.assertCounters(recipe, ratings=1, rating_sum=4)
+
+        rating.score = 2
+        rating.save()
+        self.assertCounters(recipe, ratings=1, rating_sum=2)
+
+        # A freshly loaded instance knows its stored score too
+        rating = Rating.objects.get(pk=rating.pk)
+        rating.score = 5
+        rating.save()
+        self.assertCounters(recipe, ratings=1, rating_sum=5)
+
+        rating.delete()
+        self.assertCounters(recipe)
+
+    def test_comment_and_save_delete(self):
+        recipe = make_recipe(self.author)
+        self.interact(recipe)
+        self.assertCounters(recipe, ratings=2, rating_sum=6, comments=2, saves=2)
+
+        Comment.objects.filter(user=self.fan).first().delete()
+        SavedRecipe.objects.get(user=self.fan, recipe=recipe).delete()
+        self.assertCounters(recipe, ratings=2, rating_sum=6, comments=1, saves=1)
+
+        # Queryset deletes send post_delete per row as well
+        Comment.objects.filter(recipe=recipe).delete()
+        SavedRecipe.objects.filter(recipe=recipe).delete()
+        self.assertCounters(recipe, ratings=2, rating_sum=6)
+
+    def test_user_delete_updates_counters(self):
+        recipe = make_recipe(self.author)
+        self.interact(recipe)
+        self.other.delete()
+        self.assertCounters(recipe, ratings=1, rating_sum=4, comments=1, saves=1)
+
+    def test_recipe_delete_skips_counter_updates(self):
+        kept = make_recipe(self.author, title='Kept')
+        self.interact(kept)
+        for delete in (lambda r: r.delete(),
+                       lambda r: Recipe.objects.filter(pk=r.pk).delete()):
+            recipe = make_recipe(self.author)
+            self.interact(recipe)
+            with CaptureQueriesContext(connection) as ctx:
+                delete(recipe)
+            self.assertFalse(Recipe.objects.filter(pk=recipe.pk).exists())
+            self.assertFalse(Rating.objects.filter(recipe_id=recipe.pk).exists())
+            updates = [q['sql'] for q in ctx.captured_queries
+                       if q['sql'].startswith('UPDATE "recipe_recipe"')]
+            self.assertEqual(updates, [])
+        self.assertCounters(kept, ratings=2, rating_sum=6, comments=2, saves=2)
+
+    def test_rebuild_counters_restores_drifted_values(self):
+        recipes = [make_recipe(self.author, title=f'Recipe {i}') for i in range(2)]
+        self.interact(recipes[0])
+        Recipe.objects.update(
+            ratings_count=7, rating_sum=-3, comments_count=9, saves_count=1)
+
+        self.assertEqual(rebuild_counters(), 2)
+        self.assertCounters(recipes[0], ratings=2, rating_sum=6, comments=2, saves=2)
+        self.assertCounters(recipes[1])
+
+    def test_rebuild_command_limits_to_recipes(self):
+        recipes = [make_recipe(self.author, title=f'Recipe {i}') for i in range(2)]
+        Recipe.objects.update(ratings_count=7)
+
+        out = io.StringIO()
+        call_command('rebuild_recipe_counters', recipe=[recipes[0].pk], stdout=out)
+        self.assertIn('1 recipe(s)', out.getvalue())
+        self.assertEqual(self.counters(recipes[0])['ratings_count'], 0)
+        self.assertEqual(self.counters(recipes[1])['ratings_count'], 7)
+
+
+class RecipeViewerStateTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    def test_detail_reports_viewer_rating_and_save(self):
+        Rating.objects.create(user=self.fan, recipe=self.recipe, score=3)
+        SavedRecipe.objects.create(user=self.fan, recipe=self.recipe)
+        self.client.force_authenticate(self.fan)
+
+        response = self.client.get(
+            reverse('recipe-detail', args=[self.recipe.pk]))
+
+        self.assertEqual(response.data['user_rating'], 3)
+        self.assertTrue(response.data['is_saved'])
+
+    def test_detail_for_anonymous_viewer(self):
+        response = self.client.get(
+            reverse('recipe-detail', args=[self.recipe.pk]))
+
+        self.assertIsNone(response.data['user_rating'])
+        self.assertFalse(response.data['is_saved'])
+
+
+class RecipeCursorPaginationTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        for i in range(25):
+            make_recipe(cls.author, title=f'Recipe number {i}')
+
+    def test_cursor_pages_cover_every_recipe_once(self):
+        url = reverse('recipe-list-create') + '?paginate=cursor'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_cursor_page_skips_count_unless_requested(self):
+        url = reverse('recipe-list-create') + '?paginate=cursor'
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        response = self.client.get(url + '&count=true')
+        self.assertEqual(response.data['count'], 25)
+
+
+class RecipeViewCountTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    def setUp(self):
+        super().setUp()
+        self.recipe.refresh_from_db()
+        self.url = reverse('recipe-detail', args=[self.recipe.pk])
+
+    def test_detail_get_does_not_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.data['views_count'], self.recipe.views_count + 1)
+        self.assertFalse(any(
+            query['sql'].startswith('UPDATE') for query in ctx.captured_queries))
+        # A zero interval means no background flusher
+        self.assertIsNone(view_buffer._thread)
+
+    def test_flush_writes_deduplicated_views(self):
+        before = self.recipe.views_count
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(view_buffer.flush(), 2)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, before + 2)
+
+
+    def test_failed_flush_is_not_counted_twice(self):
+        other = make_recipe(self.author, title='Other recipe')
+        before = self.recipe.views_count
+        # Different increments, so two UPDATEs
+        view_buffer.record(self.recipe.pk)
+        view_buffer.record(other.pk)
+        view_buffer.record(other.pk)
+
+        update = QuerySet.update
+        calls = []
+
+        def fail_second(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('lost connection')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', fail_second), \
+                self.assertLogs('recipe.view_counter', 'ERROR'):
+            self.assertEqual(view_buffer.flush(), 0)
+        self.assertEqual(view_buffer.flush(), 3)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, before + 1)
+        self.assertEqual(other.views_count, 2)
+
+
+class RecipeSearchTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.soup = make_recipe(
+            cls.author, title='Garlic soup', ingredients='garlic\nstock')
+        cls.pasta = make_recipe(
+            cls.author, title='Basil pasta', ingredients='pasta\nbasil\ngarlic')
+
+    def setUp(self):
+        super().setUp()
+        # The in-process index outlives the rolled back test transactions
+        get_search_backend().reset()
+
+    def search(self, term):
+        response = self.client.get(
+            reverse('recipe-list-create'), {'search': term})
+        return [row['id'] for row in response.data['results']]
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('garlic basil'), [self.pasta.pk])
+
+    def test_results_are_ranked_by_relevance(self):
+        # Title matches weigh more than ingredient matches
+        self.assertEqual(self.search('garl'), [self.soup.pk, self.pasta.pk])
+
+    def test_index_follows_recipe_changes(self):
+        self.soup.title = 'Onion soup'
+        self.soup.ingredients = 'onion\nstock'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.save()
+        self.assertEqual(self.search('onion'), [self.soup.pk])
+        self.assertEqual(self.search('garlic'), [self.pasta.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pasta.delete()
+        self.assertEqual(self.search('basil'), [])
+
+    def test_rolled_back_changes_are_not_indexed(self):
+        pasta_id = self.pasta.pk
+        self.assertEqual(self.search('garlic'), [self.soup.pk, pasta_id])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.soup.title = 'Onion soup'
+                    self.soup.save()
+                    self.pasta.delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.search('onion'), [])
+        self.assertEqual(self.search('basil'), [pasta_id])
+
+    def test_ranked_set_is_capped(self):
+        backend = get_search_backend()
+        with mock.patch.object(backend, 'max_results', 1):
+            self.assertEqual(self.search('garl'), [self.soup.pk])
+        self.assertEqual(backend._prefixed('ba'), ['basil'])
+
+
+class RecipeResponseCacheTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    def test_anonymous_list_is_served_from_cache(self):
+        url = reverse('recipe-list-create')
+        first = self.client.get(url, {'cuisine': 'other', 'page': 1})
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url, {'page': 1, 'cuisine': 'other'})
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.data, second.data)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.example.com'])
+    def test_cache_is_kept_per_host_and_scheme(self):
+        # Cached bodies hold absolute URLs built for the original request
+        urls = [
+            reverse('recipe-list-create'),
+            reverse('recipe-detail', args=[self.recipe.pk]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+            response = self.client.get(url, HTTP_HOST='cdn.example.com')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(
+                self.client.get(url, secure=True)['X-Cache'], 'MISS')
+
+    def test_rating_invalidates_list_and_detail(self):
+        list_url = reverse('recipe-list-create')
+        detail_url = reverse('recipe-detail', args=[self.recipe.pk])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.fan, recipe=self.recipe, score=5)
+
+        response = self.client.get(list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['average_rating'], 5.0)
+        response = self.client.get(detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['ratings_count'], 1)
+
+    def test_comment_only_invalidates_detail(self):
+        list_url = reverse('recipe-list-create')
+        detail_url = reverse('recipe-detail', args=[self.recipe.pk])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                user=self.fan, recipe=self.recipe, comment='Lovely')
+
+        self.assertEqual(self.client.get(list_url)['X-Cache'], 'HIT')
+        response = self.client.get(detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['comments_count'], 1)
+
+    def test_authenticated_reads_bypass_cache(self):
+        self.client.force_authenticate(self.fan)
+        response = self.client.get(reverse('recipe-list-create'))
+        self.assertNotIn('X-Cache', response)
+
+
+class RecipeIngredientTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.pesto = make_recipe(
+            cls.author, title='Pesto pasta',
+            ingredients='200g spaghetti\n2 cloves garlic, minced\nFresh basil leaves')
+        cls.bread = make_recipe(
+            cls.author, title='Garlic bread',
+            ingredients='1 baguette\n3 cloves of garlic\n50 g butter')
+
+    def test_ingredient_text_is_parsed(self):
+        items = self.pesto.recipe_ingredients.select_related('ingredient')
+        self.assertEqual(
+            [(item.ingredient.name, item.unit) for item in items],
+            [('spaghetti', 'g'), ('garlic', 'clove'), ('basil', '')],
+        )
+
+    def test_recipes_ranked_by_ingredient_coverage(self):
+        response = self.client.get(
+            reverse('recipes-by-ingredients'), {'ingredients': 'Garlic,basil'})
+
+        rows = response.data['results']
+        self.assertEqual([row['id'] for row in rows],
+                         [self.pesto.pk, self.bread.pk])
+        self.assertEqual(rows[0]['matched_ingredients'], 2)
+        self.assertEqual(rows[1]['coverage'], 0.5)
+
+    def test_editing_ingredients_reparses(self):
+        self.bread.ingredients = '1 baguette\nbasil'
+        self.bread.save()
+
+        response = self.client.get(
+            reverse('recipes-by-ingredients'), {'ingredients': 'garlic'})
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], [self.pesto.pk])
+
+    def test_ingredients_are_required(self):
+        response = self.client.get(reverse('recipes-by-ingredients'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_unstorable_quantities_do_not_break_saves(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(reverse('recipe-list-create'), {
+            'title': 'Odd amounts', 'description': 'Bad numbers',
+            'ingredients': '1/0 cup flour\n99999999999 cups sugar',
+            'instructions': 'Mix',
+        })
+
+        self.assertEqual(response.status_code, 201)
+        items = Recipe.objects.get(title='Odd amounts').recipe_ingredients.all()
+        self.assertEqual(
+            [(item.ingredient.name, item.quantity, item.unit) for item in items],
+            [('flour', None, 'cup'), ('sugar', None, 'cup')],
+        )
+
+
+class IngredientParserTests(SimpleTestCase):
+
+    def parse(self, line):
+        item = parse_ingredient_line(line)
+        return item.name, item.quantity, item.unit
+
+    def test_quantities_and_units(self):
+        cases = {
+            '2 1/2 cups plain flour': ('plain flour', Decimal('2.50'), 'cup'),
+            '200g spaghetti': ('spaghetti', Decimal('200.00'), 'g'),
+            '½ tsp salt': ('salt', Decimal('0.50'), 'tsp'),
+            '2-3 cloves garlic, minced': ('garlic', Decimal('2.00'), 'clove'),
+            '- 1.5 kg potatoes': ('potato', Decimal('1.50'), 'kg'),
+            'Fresh basil leaves': ('basil', None, ''),
+        }
+        for line, expected in cases.items():
+            with self.subTest(line):
+                self.assertEqual(self.parse(line), expected)
+
+    def test_unit_after_the_name(self):
+        self.assertEqual(self.parse('2 garlic cloves'), ('garlic', Decimal('2.00'), 'clove'))
+        self.assertEqual(self.parse('3 bread slices'), ('bread', Decimal('3.00'), 'slice'))
+
+    def test_division_by_zero_has_no_quantity(self):
+        self.assertEqual(self.parse('1/0 cup flour'), ('flour', None, 'cup'))
+
+    def test_quantity_too_large_to_store_is_dropped(self):
+        self.assertEqual(self.parse('99999999999 cups sugar'), ('sugar', None, 'cup'))
+        self.assertEqual(
+            self.parse('99999999.99 g salt'), ('salt', Decimal('99999999.99'), 'g'))
+
+    def test_exponent_is_not_split_into_quantity_and_name(self):
+        self.assertEqual(self.parse('1e400 g salt'), ('1e400 g salt', None, ''))
+
+    def test_blank_lines(self):
+        self.assertIsNone(parse_ingredient_line('   '))
+        self.assertIsNone(parse_ingredient_line('- '))
+
+
+class PantryMatchTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.toast = make_recipe(
+            cls.author, title='Garlic toast', ingredients='bread\ngarlic')
+        cls.pesto = make_recipe(
+            cls.author, title='Pesto pasta',
+            ingredients='spaghetti\ngarlic\nbasil\nparmesan')
+
+    def setUp(self):
+        super().setUp()
+        # The in-process index outlives the rolled back test transactions
+        pantry_index.reset()
+
+    def match(self, ingredients, max_missing=0):
+        response = self.client.post(
+            reverse('recipe-pantry'),
+            {'ingredients': ingredients, 'max_missing': max_missing},
+            format='json',
+        )
+        return [
+            (row['id'], row['missing_ingredients'])
+            for row in response.data['results']
+        ]
+
+    def test_exact_matches_only_by_default(self):
+        self.assertEqual(
+            self.match(['Bread', 'garlic', 'basil']), [(self.toast.pk, [])])
+
+    def test_recipes_missing_up_to_k_ingredients(self):
+        self.assertEqual(
+            self.match(['bread', 'garlic', 'spaghetti', 'basil'], 1),
+            [(self.toast.pk, []), (self.pesto.pk, ['parmesan'])],
+        )
+
+    def test_index_follows_recipe_changes(self):
+        self.match(['bread'])  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.toast.ingredients = 'bread\nbutter'
+            self.toast.save()
+        self.assertEqual(self.match(['bread', 'garlic']), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.toast.delete()
+        self.assertEqual(self.match(['bread', 'butter']), [])
+
+    def test_rolled_back_save_leaves_index_alone(self):
+        self.match(['bread'])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.toast.ingredients = 'bread\nbutter'
+                self.toast.save()
+                raise RuntimeError
+        self.assertEqual(
+            self.match(['bread', 'garlic']), [(self.toast.pk, [])])
+
+    def test_other_processes_pick_up_changes(self):
+        # A second index stands in for another worker's copy
+        other = PantryIndex()
+        garlic = Ingredient.objects.get(name='garlic').pk
+        bread = Ingredient.objects.get(name='bread').pk
+        self.assertEqual(
+            [recipe_id for recipe_id, _ in other.match([garlic, bread])],
+            [self.toast.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            soup = make_recipe(self.author, title='Soup', ingredients='garlic')
+        with CaptureQueriesContext(connection) as ctx:
+            matches = other.match([garlic, bread])
+        self.assertEqual(
+            [recipe_id for recipe_id, _ in matches], [self.toast.pk, soup.pk])
+        # Only the new rows are loaded
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.toast.delete()
+        self.assertEqual(
+            [recipe_id for recipe_id, _ in other.match([garlic, bread])],
+            [soup.pk])
+
+        with CaptureQueriesContext(connection) as ctx:
+            other.match([garlic])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+
+class RecipeFeedTests(RecipeAPITestCase):
+    # Both feed strategies must return the same pages
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass1234')
+        cls.chef = User.objects.create_user(
+            username='chef', email='chef@example.com', password='pass1234')
+        cls.baker = User.objects.create_user(
+            username='baker', email='baker@example.com', password='pass1234')
+        cls.stranger = User.objects.create_user(
+            username='stranger', email='stranger@example.com',
+            password='pass1234')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.reader)
+
+    def publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipes = [
+                make_recipe(author, title=f'{author.username} {i}')
+                for i in range(6)
+                for author in (self.chef, self.baker, self.stranger)
+            ]
+        # Timelines are filled by the feed.fan_out task
+        run_until_empty()
+        return [r.pk for r in reversed(recipes) if r.author != self.stranger]
+
+    def read_feed(self):
+        ids = []
+        url = reverse('recipe-feed')
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_fan_out_on_read(self):
+        self.reader.following.add(self.chef, self.baker)
+        expected = self.publish()
+        self.assertEqual(self.read_feed(), expected)
+
+    @override_settings(RECIPE_FEED_STRATEGY='write')
+    def test_fan_out_on_write(self):
+        self.reader.following.add(self.chef, self.baker)
+        expected = self.publish()
+        self.assertEqual(self.read_feed(), expected)
+
+    @override_settings(RECIPE_FEED_STRATEGY='write')
+    def test_fan_out_is_queued(self):
+        # Neither publishing nor importing writes timelines on the request
+        self.reader.following.add(self.chef)
+        make_recipe(self.chef, title='Posted')
+        rows = [(1, {'title': 'Imported', 'description': 'x',
+                     'ingredients': '1 cup rice', 'instructions': 'Boil'}, None)]
+        bulk.import_recipes(rows, self.chef)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(Task.objects.filter(name='feed.fan_out').count(), 2)
+
+        run_until_empty()
+        self.assertEqual(
+            sorted(FeedEntry.objects.filter(user=self.reader)
+                   .values_list('recipe__title', flat=True)),
+            ['Imported', 'Posted'])
+
+    @override_settings(RECIPE_FEED_STRATEGY='write')
+    def test_follow_changes_update_timeline(self):
+        expected = self.publish()
+        self.assertEqual(self.read_feed(), [])
+
+        self.chef.followers.add(self.reader)
+        self.reader.following.add(self.baker)
+        self.assertEqual(self.read_feed(), expected)
+
+        self.reader.following.remove(self.baker)
+        self.assertEqual(
+            self.read_feed(),
+            [pk for pk in expected if Recipe.objects.get(pk=pk).author == self.chef],
+        )
+
+    @override_settings(RECIPE_FEED_STRATEGY='write', RECIPE_FEED_MAX_LENGTH=5)
+    def test_timeline_is_capped(self):
+        expected = self.publish()
+        self.reader.following.add(self.chef, self.baker)
+        self.assertEqual(self.read_feed(), expected[:5])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('recipe-feed'), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 404)
+
+
+class RecipeRecommendationTests(RecipeAPITestCase):
+    # Similar and recommended recipes come from the precomputed table
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.users = [
+            User.objects.create_user(
+                username=f'cook{i}', email=f'cook{i}@example.com',
+                password='pass1234')
+            for i in range(3)
+        ]
+        cls.pasta = make_recipe(cls.author, title='Pasta', cuisine_type='italian')
+        cls.pizza = make_recipe(cls.author, title='Pizza', cuisine_type='italian')
+        cls.salad = make_recipe(cls.author, title='Salad', cuisine_type='mexican')
+        cls.curry = make_recipe(cls.author, title='Curry', cuisine_type='indian')
+        # Everyone who liked pasta also liked pizza, one also liked salad
+        for user in cls.users:
+            Rating.objects.create(user=user, recipe=cls.pasta, score=5)
+            SavedRecipe.objects.create(user=user, recipe=cls.pizza)
+        Rating.objects.create(user=cls.users[0], recipe=cls.salad, score=2)
+        build_similarities()
+
+    def test_similar_recipes_in_one_query(self):
+        url = reverse('recipe-similar', kwargs={'pk': self.pasta.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        ids = [row['id'] for row in response.data]
+        self.assertEqual(ids[:2], [self.pizza.pk, self.salad.pk])
+
+    def test_content_neighbours_for_recipes_without_interactions(self):
+        fresh = make_recipe(self.author, title='Lasagne', cuisine_type='italian')
+        build_similarities()
+        url = reverse('recipe-similar', kwargs={'pk': fresh.pk})
+        ids = [row['id'] for row in self.client.get(url).data]
+        self.assertEqual(set(ids[:2]), {self.pasta.pk, self.pizza.pk})
+
+    def test_content_neighbours_rank_after_collaborative(self):
+        # A weak co-interaction signal scores below CONTENT_WEIGHT
+        lasagne = make_recipe(self.author, title='Lasagne', cuisine_type='italian')
+        RecipeSimilarity.objects.filter(recipe=self.pasta).delete()
+        RecipeSimilarity.objects.bulk_create([
+            RecipeSimilarity(recipe=self.pasta, similar=self.salad, score=0.001),
+            RecipeSimilarity(recipe=self.pasta, similar=lasagne, score=0.01,
+                             collaborative=False),
+        ])
+        url = reverse('recipe-similar', kwargs={'pk': self.pasta.pk})
+        ids = [row['id'] for row in self.client.get(url).data]
+        self.assertEqual(ids, [self.salad.pk, lasagne.pk])
+
+        newcomer = User.objects.create_user(
+            username='newcomer', email='newcomer@example.com',
+            password='pass1234')
+        Rating.objects.create(user=newcomer, recipe=self.pasta, score=4)
+        self.client.force_authenticate(newcomer)
+        ids = [row['id'] for row in self.client.get(reverse('recipes-recommended')).data]
+        self.assertEqual(ids[:2], [self.salad.pk, lasagne.pk])
+
+    def test_built_content_neighbours_are_flagged(self):
+        fresh = make_recipe(self.author, title='Lasagne', cuisine_type='italian')
+        build_similarities()
+        self.assertFalse(RecipeSimilarity.objects.filter(
+            recipe=fresh, collaborative=True).exists())
+        rows = list(RecipeSimilarity.objects.filter(recipe=self.pasta)
+                    .values_list('similar_id', 'collaborative'))
+        # Pizza and salad share raters with pasta; content fills the rest
+        self.assertEqual(rows[:2], [(self.pizza.pk, True), (self.salad.pk, True)])
+        self.assertTrue(all(not collaborative for _, collaborative in rows[2:]))
+
+    def test_similar_for_missing_recipe(self):
+        url = reverse('recipe-similar', kwargs={'pk': 999999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_recommended_excludes_known_recipes(self):
+        newcomer = User.objects.create_user(
+            username='newcomer', email='newcomer@example.com',
+            password='pass1234')
+        Rating.objects.create(user=newcomer, recipe=self.pasta, score=4)
+        self.client.force_authenticate(newcomer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('recipes-recommended'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        ids = [row['id'] for row in response.data]
+        self.assertEqual(ids[0], self.pizza.pk)
+        self.assertNotIn(self.pasta.pk, ids)
+
+
+@override_settings(RECIPE_EVENTS_KEEPALIVE=0.05)
+class RecipeEventStreamTests(RecipeAPITestCase):
+    # The SSE endpoint sends a snapshot, then pushed engagement events
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    async def test_snapshot_keepalive_and_events(self):
+        response = await self.async_client.get(
+            reverse('recipe-events', kwargs={'pk': self.recipe.pk}))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        first = (await anext(stream)).decode()
+        self.assertTrue(first.startswith('event: snapshot\n'))
+        self.assertIn('"ratings_count": 0', first)
+        self.assertEqual(await anext(stream), b': keep-alive\n\n')
+
+        get_broker().publish(
+            recipe_channel(self.recipe.pk),
+            {'event': 'save', 'data': {'saves_count': 1}})
+        self.assertEqual(
+            (await anext(stream)).decode(),
+            'event: save\ndata: {"saves_count": 1}\n\n')
+        # A client disconnect cancels the task waiting on the stream
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertFalse(
+            get_broker().has_subscribers(recipe_channel(self.recipe.pk)))
+
+    async def test_missing_recipe(self):
+        response = await self.async_client.get(
+            reverse('recipe-events', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_engagement_changes_are_published(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        subscription = get_broker().subscribe(
+            recipe_channel(self.recipe.pk), loop=loop)
+        self.addCleanup(subscription.close)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.fan, recipe=self.recipe, score=4)
+            Comment.objects.create(
+                user=self.fan, recipe=self.recipe, comment='Lovely')
+
+        rating = loop.run_until_complete(subscription.get(timeout=1))
+        comment = loop.run_until_complete(subscription.get(timeout=1))
+        self.assertEqual(rating['event'], 'rating')
+        self.assertEqual(rating['data']['average_rating'], 4.0)
+        self.assertEqual(comment['event'], 'comment')
+        self.assertEqual(comment['data']['comment']['comment'], 'Lovely')
+        self.assertEqual(comment['data']['comments_count'], 1)
+
+
+    def test_redis_listener_reconnects(self):
+        # A dropped Redis connection must not leave watchers without events
+        import redis
+
+        channel = recipe_channel(self.recipe.pk)
+        stop = threading.Event()
+
+        def messages():
+            yield {'type': 'pmessage', 'channel': channel.encode(),
+                   'data': json.dumps({'event': 'save'})}
+            # Until the broker closes the subscription
+            stop.wait()
+
+        client = mock.Mock()
+        client.pubsub.side_effect = [
+            mock.Mock(**{'listen.side_effect': redis.ConnectionError('reset')}),
+            mock.Mock(**{'listen.return_value': messages(),
+                         'close.side_effect': stop.set}),
+        ]
+        with mock.patch('redis.Redis.from_url', return_value=client):
+            broker = RedisBroker('redis://unused')
+        broker.reconnect_delay = 0
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        with self.assertLogs('recipe.events', 'WARNING'):
+            subscription = broker.subscribe(channel, loop=loop)
+            event = loop.run_until_complete(subscription.get(timeout=5))
+        self.assertEqual(event, {'event': 'save'})
+        self.assertEqual(client.pubsub.call_count, 2)
+
+        listener = broker._listener
+        broker.close()
+        listener.join(5)
+        self.assertFalse(listener.is_alive())
+        # A listener that exits is replaced on the next subscribe
+        self.assertIsNone(broker._listener)
+
+
+class AsyncReadViewTests(RecipeAPITestCase):
+    # Async GET handlers must answer exactly like the sync views
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.fan.following.add(cls.author)
+        cls.recipes = [
+            make_recipe(cls.author, title=f'Recipe {i}') for i in range(12)]
+        Comment.objects.create(
+            user=cls.fan, recipe=cls.recipes[0], comment='Tasty')
+        Rating.objects.create(user=cls.fan, recipe=cls.recipes[0], score=5)
+
+    def compare(self, url_name, kwargs=None, query=None, user=None):
+        match = resolve(reverse(url_name, kwargs=kwargs))
+        sync_view = match.func
+        # Under WSGI (API_ASYNC_VIEWS off) the URLconf holds the sync view
+        self.assertTrue(issubclass(sync_view.cls, AsyncReadMixin))
+        self.assertFalse(inspect.iscoroutinefunction(sync_view))
+        with override_settings(API_ASYNC_VIEWS=True):
+            async_view = sync_view.cls.as_view(**sync_view.initkwargs)
+        self.assertTrue(inspect.iscoroutinefunction(async_view))
+
+        responses = []
+        for view in (sync_view, async_to_sync(async_view)):
+            request = APIRequestFactory().get(
+                reverse(url_name, kwargs=kwargs), query or {})
+            if user:
+                force_authenticate(request, user)
+            responses.append(view(request, **match.kwargs))
+        sync_response, async_response = responses
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.data, sync_response.data)
+        return async_response
+
+    def test_recipe_list(self):
+        self.compare('recipe-list-create', user=self.fan)
+        self.compare('recipe-list-create', query={'page': 2}, user=self.fan)
+        self.compare('recipe-list-create', query={'paginate': 'cursor'},
+                     user=self.fan)
+        self.compare('recipe-list-create', query={'page': 9}, user=self.fan)
+
+    def test_recipe_detail(self):
+        pk = self.recipes[0].pk
+        self.compare('recipe-detail', {'pk': pk}, user=self.fan)
+        self.compare('recipe-detail', {'pk': 999999}, user=self.fan)
+
+    def test_comment_list(self):
+        self.compare('recipe-comments', {'recipe_pk': self.recipes[0].pk})
+
+    def test_user_endpoints(self):
+        self.compare('user-detail', {'username': 'author'}, user=self.fan)
+        self.compare('user-detail', {'username': 'nobody'})
+        self.compare('followers-list', {'username': 'author'}, user=self.fan)
+        self.compare('following-list', {'username': 'fan'},
+                     query={'paginate': 'cursor'})
+        self.compare('followers-list', {'username': 'nobody'})
+
+
+class RecipeBulkImportExportTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass1234',
+            is_staff=True)
+        cls.cook = User.objects.create_user(
+            username='cook', email='cook@example.com', password='pass1234')
+
+    def setUp(self):
+        super().setUp()
+        get_search_backend().reset()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, content):
+        return self.client.post(
+            reverse('recipe-import'),
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart',
+        )
+
+    def test_jsonl_import_reports_bad_rows(self):
+        rows = [
+            {'title': 'Garlic bread', 'description': 'Crispy',
+             'ingredients': '2 slices bread\n2 cloves garlic',
+             'instructions': 'Toast', 'servings': 2},
+            {'title': 'No description'},
+            {'title': 'Bad servings', 'description': 'x', 'ingredients': 'y',
+             'instructions': 'z', 'servings': 0},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload('recipes.jsonl', content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            [error['line'] for error in response.data['errors']], [2, 3, 4])
+        self.assertIn('description', response.data['errors'][0]['errors'])
+
+        recipe = Recipe.objects.get(title='Garlic bread')
+        self.assertEqual(recipe.author, self.admin)
+        self.assertEqual(
+            sorted(recipe.recipe_ingredients.values_list(
+                'ingredient__name', flat=True)),
+            ['bread', 'garlic'])
+        results = self.client.get(
+            reverse('recipe-list-create'), {'search': 'garlic'}).data['results']
+        self.assertEqual([row['id'] for row in results], [recipe.pk])
+
+    def test_import_without_returned_ids_stays_bulk(self):
+        # MySQL can't return ids from a bulk insert
+        rows = [
+            (index, {'title': f'Imported {index}', 'description': 'x',
+                     'ingredients': f'{index} cups rice', 'instructions': 'Boil'},
+             None)
+            for index in range(1, 4)
+        ]
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', False), \
+                self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                result = bulk.import_recipes(rows, self.cook)
+
+        self.assertEqual(result.created, 3)
+        inserts = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('INSERT INTO "recipe_recipe"')]
+        self.assertEqual(len(inserts), 1)
+        recipes = Recipe.objects.filter(author=self.cook).order_by('pk')
+        self.assertEqual(
+            [recipe.recipe_ingredients.get().quantity for recipe in recipes],
+            [1, 2, 3])
+        self.assertFalse(Recipe.objects.filter(import_batch__isnull=False).exists())
+        self.cook.refresh_from_db()
+        self.assertEqual(self.cook.recipes_count, 3)
+        # Imports don't notify followers
+        self.assertFalse(Task.objects.filter(name='notifications.new_recipe').exists())
+
+    def test_csv_export_round_trip(self):
+        make_recipe(self.cook, title='Stew, slow cooked',
+                    ingredients='beef\ncarrots', prep_time=20)
+        make_recipe(self.cook, title='Salad')
+
+        response = self.client.get(reverse('recipe-export'), {'fmt': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+
+        response = self.upload('recipes.csv', content)
+        self.assertEqual(response.data['created'], 2)
+        copy = Recipe.objects.get(title='Stew, slow cooked', author=self.admin)
+        self.assertEqual(copy.ingredients, 'beef\ncarrots')
+        self.assertEqual(copy.prep_time, 20)
+
+    def test_jsonl_export(self):
+        recipe = make_recipe(self.cook)
+        response = self.client.get(reverse('recipe-export'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], recipe.pk)
+        self.assertEqual(json.loads(lines[0])['author'], 'cook')
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.cook)
+        self.assertEqual(self.client.get(reverse('recipe-export')).status_code, 403)
+        self.assertEqual(self.upload('r.jsonl', '{}').status_code, 403)
+
+
+def make_image(name='photo.jpg', size=(800, 600), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class TempMediaTestCase(RecipeAPITestCase):
+    # Uploaded files go to a throwaway MEDIA_ROOT
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook = User.objects.create_user(
+            username='cook', email='cook@example.com', password='pass1234')
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=(160, 320, 1280))
+class RecipeImageVariantsTests(TempMediaTestCase):
+
+    def test_variants_generated_off_request(self):
+        recipe = make_recipe(self.cook, image=make_image())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, {})
+        self.assertTrue(
+            Task.objects.filter(name='images.generate_variants').exists())
+
+        run_until_empty()
+        recipe.refresh_from_db()
+        # No upscaling past the 800px original
+        self.assertEqual(sorted(recipe.image_variants['webp']), ['160', '320'])
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        with default_storage.open(recipe.image_variants['jpeg']['160']) as file:
+            self.assertEqual(Image.open(file).size, (160, 120))
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.pk]))
+        variants = response.data['image_variants']
+        self.assertTrue(variants['webp']['320'].startswith('http://testserver/'))
+        self.assertEqual(
+            variants['srcset']['webp'],
+            f"{variants['webp']['160']} 160w, {variants['webp']['320']} 320w")
+        response = self.client.get(reverse('recipe-list-create'))
+        self.assertEqual(response.data['results'][0]['image_variants'], variants)
+
+    def test_identical_images_share_variants(self):
+        first = make_recipe(self.cook, image=make_image('a.jpg'))
+        second = make_recipe(self.cook, image=make_image('b.jpg'))
+        run_until_empty()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants['webp'], second.image_variants['webp'])
+
+    def test_removed_or_unreadable_image(self):
+        recipe = make_recipe(self.cook, image=SimpleUploadedFile(
+            'broken.jpg', b'not an image', content_type='image/jpeg'))
+        run_until_empty()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants['error'], 'unreadable')
+        self.assertFalse(
+            Task.objects.filter(name='images.generate_variants').exists())
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.pk]))
+        self.assertEqual(response.data['image_variants'], {})
+
+        recipe.image = None
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, {})
+
+    def test_unrelated_saves_do_not_requeue(self):
+        recipe = make_recipe(self.cook, image=make_image())
+        run_until_empty()
+        recipe.refresh_from_db()
+        recipe.title = 'Renamed'
+        recipe.save()
+        self.assertFalse(
+            Task.objects.filter(name='images.generate_variants').exists())
+
+
+def png_header(width, height):
+    # A PNG that claims the given size but holds no pixel data
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data)))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr)
+            + chunk(b'IDAT', zlib.compress(b'')) + chunk(b'IEND', b''))
+
+
+class RecipeImageUploadTests(TempMediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.cook)
+
+    def upload(self, file):
+        return self.client.post(reverse('recipe-list-create'), {
+            'title': 'Photo recipe', 'description': 'Has a picture',
+            'ingredients': 'flour', 'instructions': 'Bake', 'image': file,
+        }, format='multipart')
+
+    def stored_image(self, response):
+        return Recipe.objects.get(title='Photo recipe').image
+
+    def test_jpeg_metadata_stripped_keeping_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation
+        exif[0x010F] = 'Camera maker'
+        exif[0x8825] = {2: (51.0, 30.0, 0.0)}  # GPS latitude
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 32), 'blue').save(
+            buffer, 'JPEG', exif=exif, comment=b'private note')
+
+        response = self.upload(SimpleUploadedFile(
+            'photo.jpg', buffer.getvalue(), content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 201, response.data)
+        with self.stored_image(response).open('rb') as file:
+            data = file.read()
+            file.seek(0)
+            image = Image.open(file)
+            self.assertEqual(dict(image.getexif()), {0x0112: 6})
+            self.assertEqual(image.size, (64, 32))
+            image.load()
+        self.assertNotIn(b'private note', data)
+        self.assertNotIn(b'Camera maker', data)
+
+    def test_png_text_chunks_stripped(self):
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Author', 'Someone')
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 20), 'green').save(buffer, 'PNG', pnginfo=info)
+
+        response = self.upload(SimpleUploadedFile(
+            'photo.png', buffer.getvalue(), content_type='image/png'))
+        self.assertEqual(response.status_code, 201, response.data)
+        with self.stored_image(response).open('rb') as file:
+            image = Image.open(file)
+            image.load()
+            self.assertNotIn('Author', image.info)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=2048)
+    def test_oversized_file_rejected(self):
+        buffer = io.BytesIO()
+        Image.effect_noise((200, 200), 100).save(buffer, 'JPEG')
+        response = self.upload(SimpleUploadedFile(
+            'big.jpg', buffer.getvalue(), content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2.0\xa0KB', str(response.data['image'][0]))
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=10_000)
+    def test_too_many_pixels_rejected(self):
+        response = self.upload(make_image(size=(200, 100)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('200x100', str(response.data['image'][0]))
+
+    def test_decompression_bomb_rejected_from_header(self):
+        response = self.upload(SimpleUploadedFile(
+            'bomb.png', png_header(60_000, 60_000), content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_upload_memory_does_not_grow_with_file_size(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (16, 16)).save(buffer, 'JPEG')
+        # Data after the end-of-image marker is kept as is
+        content = buffer.getvalue() + bytes(8 * 1024 * 1024)
+        request = APIRequestFactory().post(
+            reverse('recipe-list-create'),
+            {'image': SimpleUploadedFile('big.jpg', content, 'image/jpeg')},
+            format='multipart')
+
+        # ru_maxrss is a process-wide high-water mark; trace the parse alone
+        tracemalloc.start()
+        try:
+            upload = request.FILES['image']
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.addCleanup(upload.close)
+
+        self.assertEqual(upload.size, len(content))
+        self.assertTrue(hasattr(upload, 'temporary_file_path'))
+        self.assertLess(peak, 1024 * 1024)
+
+
+class RecipeRatingTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = User.objects.create_user(
+            username='chef', email='chef@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.critic = User.objects.create_user(
+            username='critic', email='critic@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.chef)
+
+    def rate(self, user, score):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('recipe-rate', args=[self.recipe.pk]), {'score': score})
+
+    def test_average_in_response_matches_stored_counters(self):
+        Rating.objects.create(user=self.critic, recipe=self.recipe, score=2)
+
+        response = self.rate(self.fan, 5)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recipe_average_rating'], 3.5)
+
+        response = self.rate(self.fan, 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['recipe_average_rating'], 2.5)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.ratings_count, self.recipe.rating_sum), (2, 5))
+
+    def test_recipe_read_once(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('recipe-rate', args=[self.recipe.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'score': 4})
+        recipe_reads = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "recipe_recipe"' in query['sql']
+        ]
+        self.assertEqual(len(recipe_reads), 1)
+
+    def test_own_recipe_and_delete(self):
+        response = self.rate(self.chef, 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Rating.objects.exists())
+
+        self.rate(self.fan, 4)
+        response = self.client.delete(
+            reverse('recipe-rate', args=[self.recipe.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.ratings_count, self.recipe.rating_sum), (0, 0))
+
+
+class RecipeScoreTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = User.objects.create_user(
+            username='chef', email='chef@example.com', password='pass1234')
+        cls.fans = [
+            User.objects.create_user(
+                username=f'fan{i}', email=f'fan{i}@example.com',
+                password='pass1234')
+            for i in range(8)
+        ]
+        cls.lucky = make_recipe(cls.chef, title='One lucky rating')
+        cls.loved = make_recipe(cls.chef, title='Loved')
+        cls.unrated = make_recipe(cls.chef, title='Unrated')
+
+    def later(self, **delta):
+        # Past the commit lag, so interactions made now are counted
+        return timezone.now() + timedelta(minutes=1, **delta)
+
+    def test_top_rated_uses_bayesian_average(self):
+        disliked = make_recipe(self.chef, title='Disliked')
+        Rating.objects.create(user=self.fans[0], recipe=self.lucky, score=5)
+        for fan in self.fans:
+            Rating.objects.create(user=fan, recipe=self.loved, score=5)
+        for fan in self.fans[:4]:
+            Rating.objects.create(user=fan, recipe=disliked, score=1)
+
+        refresh_scores(now=self.later())
+        response = self.client.get(
+            reverse('recipe-list-create'), {'ordering': '-score'})
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(
+            titles, ['Loved', 'One lucky rating', 'Disliked', 'Unrated'])
+
+        self.lucky.refresh_from_db()
+        # (10 * site mean + 5) / (10 + 1), site mean = 49 / 13
+        self.assertAlmostEqual(self.lucky.score, (10 * 49 / 13 + 5) / 11)
+
+    def test_ties_broken_by_id(self):
+        response = self.client.get(
+            reverse('recipe-list-create'), {'ordering': 'score'})
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_trending_decays_and_counts_new_engagement(self):
+        SavedRecipe.objects.create(user=self.fans[0], recipe=self.lucky)
+        Comment.objects.create(user=self.fans[1], recipe=self.loved,
+                               comment='Great')
+        Recipe.objects.filter(pk=self.unrated.pk).update(views_count=3)
+
+        now = self.later()
+        # Views from before the first run can't be dated and are skipped
+        self.assertEqual(refresh_trending_scores(now=now), 2)
+        response = self.client.get(reverse('recipes-trending'))
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(titles, ['One lucky rating', 'Loved'])
+
+        self.lucky.refresh_from_db()
+        saved_score = self.lucky.trending_score
+        self.assertAlmostEqual(saved_score, 4.0, places=2)
+
+        # Two half-lives later the save is worth a quarter, and new views
+        # on another recipe count in full
+        Recipe.objects.filter(pk=self.unrated.pk).update(views_count=8)
+        refresh_trending_scores(now=now + timedelta(hours=48))
+        self.lucky.refresh_from_db()
+        self.unrated.refresh_from_db()
+        self.assertAlmostEqual(self.lucky.trending_score, saved_score / 4)
+        self.assertEqual(self.unrated.trending_score, 5)
+        self.assertEqual(self.unrated.trending_views, 8)
+
+        # Nothing new: no points added, the watermark still moves
+        self.assertEqual(
+            refresh_trending_scores(now=now + timedelta(hours=49)), 0)
+        self.assertEqual(
+            ScoreRefresh.objects.get().refreshed_at,
+            now + timedelta(hours=49) - timedelta(seconds=30))
+
+
+class RecipeFilterTests(RecipeAPITestCase):
+    # Every supported filter combination must be answered from an index
+    INDEXED_FILTERS = [
+        {'cuisine': 'italian'},
+        {'cuisine': 'italian', 'meal': 'dinner'},
+        {'meal': 'lunch'},
+        {'dietary': 'vegan'},
+        {'dietary': 'vegan', 'difficulty': 'easy'},
+        {'difficulty': 'hard'},
+        {'author': 'chef'},
+        {'cuisine': 'thai', 'prep_time_max': 30, 'servings_min': 2},
+        {'meal': 'dinner', 'difficulty': 'easy', 'cook_time_min': 10},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = User.objects.create_user(
+            username='chef', email='chef@example.com', password='pass1234')
+        cls.pasta = make_recipe(cls.chef, title='Pasta', cuisine_type='italian',
+                                meal_type='dinner', prep_time=10)
+        cls.curry = make_recipe(cls.chef, title='Curry', cuisine_type='thai',
+                                meal_type='dinner', dietary_tags='vegan',
+                                difficulty_level='easy', prep_time=40)
+
+    def plan(self, params):
+        queryset = RecipeFilter(params, queryset=Recipe.objects.for_list()).qs
+        queryset = queryset.order_by('-created_at', '-id')
+        if connection.vendor == 'mysql':
+            return self.mysql_plan(queryset)
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would always be read sequentially
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def mysql_plan(self, queryset):
+        # EXPLAIN rows for recipe_recipe, as dicts
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # Tiny test tables would always be scanned; make seeks look cheap
+            cursor.execute('SET SESSION max_seeks_for_key = 1')
+            try:
+                cursor.execute('EXPLAIN ' + sql, params)
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            finally:
+                cursor.execute('SET SESSION max_seeks_for_key = DEFAULT')
+        return [row for row in rows if row['table'] == 'recipe_recipe']
+
+    def test_filter_combinations_use_an_index(self):
+        if connection.vendor not in ('sqlite', 'postgresql', 'mysql'):
+            self.skipTest(f"No plan check for {connection.vendor}")
+        for params in self.INDEXED_FILTERS:
+            with self.subTest(**params):
+                plan = self.plan(params)
+                if connection.vendor == 'sqlite':
+                    self.assertRegex(
+                        plan, r'SEARCH recipe_recipe USING (COVERING )?INDEX')
+                elif connection.vendor == 'postgresql':
+                    self.assertNotIn('Seq Scan on recipe_recipe', plan)
+                else:
+                    self.assertTrue(plan)
+                    for row in plan:
+                        self.assertNotEqual(row['type'], 'ALL')
+                        self.assertIsNotNone(row['key'])
+
+    def test_filters_are_case_insensitive(self):
+        url = reverse('recipe-list-create')
+        response = self.client.get(url, {'cuisine': 'Italian'})
+        self.assertEqual(
+            [row['title'] for row in response.data['results']], ['Pasta'])
+
+        response = self.client.get(
+            url, {'meal': 'DINNER', 'dietary': ' Vegan', 'prep_time_min': 20})
+        self.assertEqual(
+            [row['title'] for row in response.data['results']], ['Curry'])
+
+        response = self.client.get(url, {'author': 'chef', 'servings_max': 0})
+        self.assertEqual(response.data['results'], [])
+
+
+class RecipeSaveWriteTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.fan)
+        self.url = reverse('recipe-save', args=[self.recipe.pk])
+
+    def saves_count(self):
+        self.recipe.refresh_from_db()
+        return self.recipe.saves_count
+
+    def test_put_and_delete_are_idempotent(self):
+        self.assertEqual(self.client.put(self.url).status_code, 201)
+        response = self.client.put(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_saved'])
+        self.assertEqual(self.saves_count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.data['is_saved'])
+        self.assertEqual(self.saves_count(), 0)
+        self.assertFalse(SavedRecipe.objects.exists())
+
+    def test_cannot_save_own_recipe(self):
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.put(self.url).status_code, 400)
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+    def test_idempotency_key_replays_toggle(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='retry-1')
+        retry = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(self.saves_count(), 1)
+
+    def test_idempotency_key_in_progress_conflicts(self):
+        # Another worker holds the key
+        from api.idempotency import _cache_key
+
+        request = APIRequestFactory().post(self.url)
+        request.user = self.fan
+        cache.add(_cache_key(request, 'busy') + ':lock', True)
+
+        response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='busy')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.saves_count(), 0)
+
+
+    def test_idempotency_key_with_other_body_is_rejected(self):
+        first = self.client.post(
+            self.url, {'note': 'a'}, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+        same = self.client.post(
+            self.url, {'note': 'a'}, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+        other = self.client.post(
+            self.url, {'note': 'b'}, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(same['Idempotent-Replayed'], 'true')
+        self.assertEqual(other.status_code, 422)
+        self.assertIn('error', other.data)
+        self.assertEqual(self.saves_count(), 1)
+
+
+class WriteHelperTests(RecipeAPITestCase):
+    # api.writes builds its statements from private ORM APIs
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.recipe = make_recipe(cls.author)
+
+    def test_private_orm_signatures(self):
+        from django.db.models import QuerySet, sql
+
+        init = inspect.signature(sql.InsertQuery.__init__).parameters
+        self.assertIn('on_conflict', init)
+        self.assertEqual(
+            list(inspect.signature(sql.InsertQuery.insert_values).parameters),
+            ['self', 'fields', 'objs', 'raw'])
+        self.assertEqual(
+            list(inspect.signature(QuerySet._raw_delete).parameters),
+            ['self', 'using'])
+
+    def test_insert_ignore_and_delete_where(self):
+        from api.writes import delete_where, insert_ignore
+
+        values = {'user_id': self.author.pk, 'recipe_id': self.recipe.pk}
+        self.assertTrue(insert_ignore(SavedRecipe, **values))
+        self.assertFalse(insert_ignore(SavedRecipe, **values))
+        self.assertEqual(SavedRecipe.objects.filter(**values).count(), 1)
+
+        self.assertEqual(delete_where(SavedRecipe, **values), 1)
+        self.assertEqual(delete_where(SavedRecipe, **values), 0)
+        self.assertFalse(SavedRecipe.objects.exists())
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentRecipeSaveTests(TransactionTestCase):
+    # Double clicks and retries from many clients must leave saves_count
+    # equal to the saved rows. Needs a database that takes writes from
+    # several connections (not SQLite)
+
+    THREADS = 8
+    ROUNDS = 25
+
+    def test_saves_count_does_not_drift(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        fans = [
+            User.objects.create_user(
+                username=f'fan{i}', email=f'fan{i}@example.com',
+                password='pass1234')
+            for i in range(3)
+        ]
+        recipe = make_recipe(author)
+        url = reverse('recipe-save', args=[recipe.pk])
+        errors = []
+
+        def hammer(seed):
+            client = APIClient()
+            try:
+                for i in range(self.ROUNDS):
+                    client.force_authenticate(fans[(seed + i) % len(fans)])
+                    method = (client.put, client.delete, client.post)[(seed * i) % 3]
+                    response = method(url)
+                    if response.status_code not in (200, 201):
+                        errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=hammer, args=(seed,))
+            for seed in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.saves_count, SavedRecipe.objects.filter(recipe=recipe).count())
+
+
+class RecipeStateTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipes = [make_recipe(cls.author, title=f'R{i}') for i in range(5)]
+        SavedRecipe.objects.create(user=cls.fan, recipe=cls.recipes[0])
+        Rating.objects.create(user=cls.fan, recipe=cls.recipes[1], score=4)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.fan)
+        self.url = reverse('recipe-state')
+
+    def test_states_in_request_order(self):
+        ids = [r.pk for r in self.recipes[:3]]
+        response = self.client.post(
+            self.url, {'ids': [ids[1], ids[0], 999999, ids[2], ids[1]]},
+            format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['recipes'], [
+            {'id': ids[1], 'is_saved': False, 'user_rating': 4},
+            {'id': ids[0], 'is_saved': True, 'user_rating': None},
+            {'id': ids[2], 'is_saved': False, 'user_rating': None},
+        ])
+        self.assertEqual(response.data['missing'], [999999])
+
+    def test_one_query_per_table(self):
+        ids = [r.pk for r in self.recipes]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url, {'ids': ids}, format='json')
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_batch_size_is_capped(self):
+        from interactions.viewer_state import MAX_STATE_BATCH
+
+        response = self.client.post(
+            self.url, {'ids': list(range(1, MAX_STATE_BATCH + 2))},
+            format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(None)
+        response = self.client.post(self.url, {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class SparseFieldsetTests(RecipeAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234')
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipes = [
+            make_recipe(cls.author, title=f'Recipe number {i}')
+            for i in range(3)
+        ]
+        cls.fan.following.add(cls.author)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in ctx.captured_queries]
+
+    def test_list_fields_prune_columns_and_joins(self):
+        url = reverse('recipe-list-create')
+        response, queries = self.get(url, {'fields': 'id,title'})
+
+        self.assertEqual(
+            set(response.data['results'][0]), {'id', 'title'})
+        select = queries[-1]
+        self.assertNotIn('JOIN', select)
+        self.assertNotIn('"description"', select)
+
+    def test_list_exclude(self):
+        url = reverse('recipe-list-create')
+        response, _ = self.get(url, {'exclude': 'description,image_variants'})
+
+        row = response.data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('image_variants', row)
+        self.assertIn('average_rating', row)
+
+    def test_expand_author_on_list(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('recipe-list-create')
+        response, queries = self.get(
+            url, {'fields': 'id,author', 'expand': 'author'})
+
+        rows = response.data['results']
+        self.assertEqual(set(rows[0]), {'id', 'author'})
+        self.assertEqual(rows[0]['author']['username'], 'author')
+        self.assertTrue(rows[0]['author']['is_following'])
+        # Count, page, and one follow lookup for every author on the page
+        self.assertEqual(len(queries), 3)
+
+    def test_expand_author_on_detail(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('recipe-detail', args=[self.recipes[0].pk])
+
+        plain, _ = self.get(url, {})
+        self.assertNotIn('author', plain.data)
+
+        response, _ = self.get(url, {'expand': 'author'})
+        self.assertEqual(response.data['author']['username'], 'author')
+        self.assertTrue(response.data['author']['is_following'])
+        self.assertIn('ingredient_items', response.data)
+
+    def test_detail_skips_unrequested_work(self):
+        self.client.force_authenticate(self.fan)
+        url = reverse('recipe-detail', args=[self.recipes[0].pk])
+
+        full, full_queries = self.get(url, {})
+        sparse, sparse_queries = self.get(url, {'fields': 'id,title,total_time'})
+
+        self.assertIn('ingredient_items', full.data)
+        self.assertEqual(sparse.data, {
+            'id': self.recipes[0].pk,
+            'title': 'Recipe number 0',
+            'total_time': 0,
+        })
+        # No ingredient prefetch, save/rating or follow lookups
+        self.assertEqual(len(sparse_queries), 1)
+        self.assertLess(len(sparse_queries), len(full_queries))
+        self.assertNotIn('JOIN', sparse_queries[0])
+
+    def test_cached_detail_keeps_fieldsets_apart(self):
+        url = reverse('recipe-detail', args=[self.recipes[0].pk])
+
+        self.client.get(url)
+        response = self.client.get(url, {'fields': 'title'})
+
+        self.assertEqual(response.data, {'title': 'Recipe number 0'})
+        self.assertIn('description', self.client.get(url).data)
+
+    def test_unknown_fields_are_rejected(self):
+        url = reverse('recipe-list-create')
+        for params in ({'fields': 'title,secret'}, {'expand': 'title'}):
+            with self.subTest(**params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(API_FAST_PATH=True)
+class CompiledListTests(RecipeAPITestCase):
+    # The fast path (api.compiled + api.renderers) must render the same bytes
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass1234',
+            bio='Cuisinière \u2028 née à Montréal')
+        User.objects.filter(pk=cls.author.pk).update(
+            profile_picture='profile_pictures/me.jpg',
+            profile_picture_variants={
+                'webp': {'160': 'variants/ab/me-160.webp'},
+                'jpeg': {'160': 'variants/ab/me-160.jpg'},
+            })
+        cls.fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass1234')
+        cls.recipes = [
+            make_recipe(cls.author, title='Crème brûlée \u2029 "classique" \u2713',
+                        prep_time=15, cook_time=40, image='recipes/creme.jpg',
+                        image_variants={
+                            'webp': {'320': 'variants/cd/c-320.webp',
+                                     '160': 'variants/cd/c-160.webp'},
+                            'jpeg': {'160': 'variants/cd/c-160.jpg'},
+                        }),
+            make_recipe(cls.author, title='Plain', description=''),
+            make_recipe(cls.fan, title='Broken variants',
+                        image_variants={'error': 'unreadable'}),
+        ]
+        for user, score in ((cls.fan, 5), (cls.author, 4)):
+            Rating.objects.create(user=user, recipe=cls.recipes[0], score=score)
+        Rating.objects.create(user=cls.fan, recipe=cls.recipes[1], score=2)
+        cls.fan.following.add(cls.author)
+        for user, text in ((cls.fan, 'Très bon\n\t\U0001f60b'), (cls.author, 'Merci')):
+            Comment.objects.create(user=user, recipe=cls.recipes[0], comment=text)
+
+    def assertSameBytes(self, url, params=None):
+        fast = self.client.get(url, params)
+        cache.clear()
+        with override_settings(API_FAST_PATH=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_fast_path_is_opt_in(self):
+        # With the flag off nothing is compiled and orjson is never called
+        url = reverse('recipe-list-create')
+        with override_settings(API_FAST_PATH=False), \
+                mock.patch('api.compiled.compile_serializer') as compile_, \
+                mock.patch('api.renderers.orjson') as orjson:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        compile_.assert_not_called()
+        orjson.dumps.assert_not_called()
+
+    def test_compiles_hot_list_serializers(self):
+        request = Request(APIRequestFactory().get('/'))
+        for serializer_class in (RecipeListSerializer, CommentSerializer,
+                                 FollowSerializer):
+            with self.subTest(serializer_class.__name__):
+                serializer = serializer_class(many=True, context={'request': request})
+                self.assertIsNotNone(compile_serializer(serializer))
+        # Reverse relations have no compiled form
+        self.assertIsNone(compile_serializer(
+            RecipeSerializer(many=True, context={'request': request})))
+
+    def test_recipe_list_bytes_match(self):
+        url = reverse('recipe-list-create')
+        for user in (None, self.fan):
+            self.client.force_authenticate(user)
+            for params in ({}, {'expand': 'author'},
+                           {'fields': 'id,title,average_rating'},
+                           {'paginate': 'cursor'},
+                           {'ordering': 'title', 'paginate': 'cursor'}):
+                with self.subTest(user=user, **params):
+                    cache.clear()
+                    response = self.assertSameBytes(url, params)
+                    self.assertIn('\\u2029', response.content.decode())
+
+    def test_recipe_list_cursor_pages_match(self):
+        url = reverse('recipe-list-create')
+        with mock.patch.object(KeysetPagination, 'page_size', 1):
+            first = self.assertSameBytes(url, {'paginate': 'cursor'})
+            self.assertSameBytes(first.data['next'])
+
+    def test_comment_list_bytes_match(self):
+        url = reverse('recipe-comments', args=[self.recipes[0].pk])
+        for user in (None, self.fan):
+            with self.subTest(user=user):
+                self.client.force_authenticate(user)
+                response = self.assertSameBytes(url)
+                self.assertEqual(response.data['count'], 2)
+
+    def test_renderer_matches_json_renderer(self):
+        values = [
+            {'title': 'naïve \u2028 \u2029 "quoted" \\ \x00 \x1f \U0001f60b'},
+            [0.1, 1e-05, 1e16, 123456789.123, 2.5e-300, -0.0, 4.333333333333333],
+            {'big': 2 ** 70, 'small': -2 ** 63},
+            {1: 'non-string key', 'nested': [{'a': None, 'b': True}]},
+            {'when': timezone.now(), 'price': Decimal('3.10'),
+             'day': timezone.now().date(), 'id': uuid.uuid4()},
+            'plain string',
+            None,
+        ]
+        fast, slow = FastJSONRenderer(), JSONRenderer()
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(fast.render(value), slow.render(value))
+        indented = 'application/json; indent=2'
+        self.assertEqual(
+            fast.render(values[0], indented), slow.render(values[0], indented))
+
+    def test_renderer_checks_serializer_float_fields(self):
+        # Only fields that can hold floats are checked in serializer output
+        class Scores(serializers.Serializer):
+            name = serializers.CharField()
+            score = serializers.FloatField()
+            extra = serializers.ReadOnlyField()
+
+        class Page(serializers.Serializer):
+            title = serializers.CharField()
+            scores = Scores(many=True)
+
+        rows = [
+            {'title': 't', 'scores': [{'name': 'a', 'score': 0.5, 'extra': None}]},
+            {'title': 't', 'scores': [{'name': 'a', 'score': 1e-05, 'extra': None}]},
+            {'title': 't', 'scores': [{'name': 'a', 'score': 1.0,
+                                       'extra': {'deep': [1e16]}}]},
+        ]
+        fast, slow = FastJSONRenderer(), JSONRenderer()
+        for row in rows:
+            for data in (Page(row).data, Page([row], many=True).data,
+                         {'results': Page([row], many=True).data}):
+                with self.subTest(data=data):
+                    self.assertEqual(fast.render(data), slow.render(data))
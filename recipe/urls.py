@@ -1,18 +1,43 @@
 from django.urls import path
+from .async_views import recipe_events
 from .views import (
     RecipeListCreateView,
     RecipeDetailView,
     MyRecipesView,
     RecipeRatingView,
     RecipeSaveView,
-    MySavedRecipesView
+    RecipeStateView,
+    MySavedRecipesView,
+    RecipeCacheStatsView,
+    RecipeByIngredientsView,
+    PantryMatchView,
+    RecipeFeedView,
+    SimilarRecipesView,
+    RecommendedRecipesView,
+    TrendingRecipesView,
+    RecipeImportView,
+    RecipeExportView
 )
 
 urlpatterns = [
     path('', RecipeListCreateView.as_view(), name='recipe-list-create'),
     path('<int:pk>/', RecipeDetailView.as_view(), name='recipe-detail'),
+    path('feed/', RecipeFeedView.as_view(), name='recipe-feed'),
+    path('recommended/', RecommendedRecipesView.as_view(),
+         name='recipes-recommended'),
+    path('trending/', TrendingRecipesView.as_view(), name='recipes-trending'),
+    path('<int:pk>/similar/', SimilarRecipesView.as_view(),
+         name='recipe-similar'),
     path('my-recipes/', MyRecipesView.as_view(), name='my-recipes'),
+    path('by-ingredients/', RecipeByIngredientsView.as_view(),
+         name='recipes-by-ingredients'),
+    path('pantry/', PantryMatchView.as_view(), name='recipe-pantry'),
+    path('<int:pk>/events/', recipe_events, name='recipe-events'),
     path('<int:pk>/rate/', RecipeRatingView.as_view(), name='recipe-rate'),
     path('<int:pk>/save/', RecipeSaveView.as_view(), name='recipe-save'),
+    path('state/', RecipeStateView.as_view(), name='recipe-state'),
     path('saved-recipes/', MySavedRecipesView.as_view(), name='saved-recipes'),
+    path('import/', RecipeImportView.as_view(), name='recipe-import'),
+    path('export/', RecipeExportView.as_view(), name='recipe-export'),
+    path('cache-stats/', RecipeCacheStatsView.as_view(), name='recipe-cache-stats'),
 ]
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCountBuffer:
+    """
+    Collects recipe views in memory and writes them in batches.
+
+    A background thread flushes every RECIPE_VIEW_FLUSH_INTERVAL seconds
+    with one UPDATE ... SET views_count = views_count + n per distinct n,
+    and once more when the process exits. Repeat views by the same viewer
+    within RECIPE_VIEW_DEDUP_WINDOW seconds are not counted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._exit_hook = False
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'RECIPE_VIEW_FLUSH_INTERVAL', 10)
+
+    @property
+    def dedup_window(self):
+        return getattr(settings, 'RECIPE_VIEW_DEDUP_WINDOW', 30 * 60)
+
+    def record(self, recipe_id, viewer_key=None):
+        """Count one view; returns False if the viewer was seen recently"""
+        if viewer_key and self.dedup_window:
+            key = f'recipe:viewed:{recipe_id}:{viewer_key}'
+            if not cache.add(key, 1, timeout=self.dedup_window):
+                return False
+
+        with self._lock:
+            self._pending[recipe_id] += 1
+        self._ensure_flusher()
+        return True
+
+    def pending(self, recipe_id):
+        with self._lock:
+            return self._pending[recipe_id]
+
+    def flush(self):
+        """Write buffered views to the database, returns the number written"""
+        from .models import Recipe
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        # Recipes with the same increment share one UPDATE
+        by_increment = defaultdict(list)
+        for recipe_id, count in pending.items():
+            by_increment[count].append(recipe_id)
+
+        # All or nothing, so a failed batch can be re-queued whole without
+        # counting the groups already written twice
+        try:
+            with transaction.atomic():
+                for count, recipe_ids in by_increment.items():
+                    Recipe.objects.filter(pk__in=recipe_ids).update(
+                        views_count=F('views_count') + count)
+        except DatabaseError:
+            logger.exception("Failed to flush recipe view counts")
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+
+        return sum(pending.values())
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still buffered"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+            self._thread = None
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self._thread is not None or not self.flush_interval:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='recipe-view-flusher', daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+            close_old_connections()
+
+
+view_buffer = ViewCountBuffer()
+
+
+def viewer_key(request):
+    # Identify the viewer for de-duplication: user id, else client address
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    address = request.META.get('REMOTE_ADDR')
+    return f'ip:{address}' if address else None
@@ -1,32 +1,66 @@
-from rest_framework import generics, filters, status
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
-from .models import Recipe
+from django.http import StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from api.async_views import AsyncReadMixin
+from api.compiled import CompiledListMixin
+from api.idempotency import idempotent
+from api.pagination import query_limit
+from api.sparse import SparseQuerysetMixin
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from .models import Ingredient, Recipe, RecipeIngredient
+from .ingredients import normalize_name
+from .pantry import pantry_index
+from . import bulk
+from .feed import decode_cursor, encode_cursor, get_feed_page
 from .serializers import (
     RecipeSerializer,
     RecipeListSerializer,
-    RecipeCreateUpdateSerializer
+    RecipeCreateUpdateSerializer,
+    RecipeIngredientMatchSerializer,
+    RecipeSimilarSerializer,
+    PantrySerializer,
+    PantryMatchSerializer,
+    RecipeStateSerializer
 )
 from .permissions import IsAuthorOrReadOnly
+from .view_counter import view_buffer, viewer_key
+from .search import RecipeSearchFilter
+from .filters import RecipeFilter, StableOrderingFilter
+from . import cache as response_cache
 from django_filters.rest_framework import DjangoFilterBackend
 from interactions.models import Rating, SavedRecipe
+from interactions.saves import save_recipe, unsave_recipe
+from interactions.viewer_state import ViewerState
 from interactions.serializers import RatingSerializer, RatingCreateUpdateSerializer
 
 
-class RecipeListCreateView(generics.ListCreateAPIView):
+class RecipeListCreateView(CompiledListMixin, SparseQuerysetMixin, AsyncReadMixin,
+                           generics.ListCreateAPIView):
   
-    queryset = Recipe.objects.all().select_related('author')
+    queryset = Recipe.objects.for_list()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter
+        StableOrderingFilter,
+        RecipeSearchFilter,
     ]
     # filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = RecipeFilter
     search_fields = ['title', 'description', 'ingredients']
-    ordering_fields = ['created_at', 'title', 'prep_time', 'cook_time']
-    ordering = ['-created_at']
+    # `score` (top rated) and `trending_score` are stored by recipe.scores
+    ordering_fields = ['created_at', 'title', 'prep_time', 'cook_time',
+                       'score', 'trending_score']
+    ordering = ['-created_at', '-id']
   
 
     def get_serializer_class(self):
@@ -35,41 +69,28 @@ class RecipeListCreateView(generics.ListCreateAPIView):
             return RecipeCreateUpdateSerializer
         return RecipeListSerializer
 
-    def get_queryset(self):
-        # Apply filters based on query parameters
-    
-        queryset = super().get_queryset()
-
-        # Filter by cuisine type
-        cuisine = self.request.query_params.get('cuisine', None)
-        if cuisine:
-            queryset = queryset.filter(cuisine_type=cuisine)
-
-        # Filter by meal type
-        meal = self.request.query_params.get('meal', None)
-        if meal:
-            queryset = queryset.filter(meal_type=meal)
-
-        # Filter by dietary tags
-        dietary = self.request.query_params.get('dietary', None)
-        if dietary:
-            queryset = queryset.filter(dietary_tags=dietary)
+    def list(self, request, *args, **kwargs):
+        # Anonymous reads are served from the response cache
+        if not response_cache.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
 
-        # Filter by difficulty
-        difficulty = self.request.query_params.get('difficulty', None)
-        if difficulty:
-            queryset = queryset.filter(difficulty_level=difficulty)
-
-        # Filter by author
-        author = self.request.query_params.get('author', None)
-        if author:
-            queryset = queryset.filter(author__username=author)
+        data, hit = response_cache.get_or_build(
+            response_cache.list_cache_key(request),
+            lambda: super(RecipeListCreateView, self).list(
+                request, *args, **kwargs).data,
+        )
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
 
-        return queryset
+    async def alist(self, request, *args, **kwargs):
+        if not response_cache.is_cacheable(request):
+            return await super().alist(request, *args, **kwargs)
+        # The response cache and its single-flight lock are sync
+        return await sync_to_async(self.list)(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-     
-        serializer.save(author=self.request.user)
+        # The author's stored recipe count is updated with the insert
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
 
     def create(self, request, *args, **kwargs):
      
@@ -77,10 +98,9 @@ class RecipeListCreateView(generics.ListCreateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
 
-        # Return full recipe details
-        recipe = Recipe.objects.get(id=serializer.instance.id)
+        # Return full recipe details; the saved instance already has them
         response_serializer = RecipeSerializer(
-            recipe, context={'request': request})
+            serializer.instance, context={'request': request})
 
         return Response({
             "message": "Recipe created successfully!",
@@ -88,8 +108,10 @@ class RecipeListCreateView(generics.ListCreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
-class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Recipe.objects.all().select_related('author')
+class RecipeDetailView(SparseQuerysetMixin, AsyncReadMixin,
+                       generics.RetrieveUpdateDestroyAPIView):
+    queryset = Recipe.objects.all().select_related('author').prefetch_related(
+        'recipe_ingredients__ingredient')
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     lookup_field = 'pk'
 
@@ -99,14 +121,34 @@ class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
         return RecipeSerializer
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-
-        # Increment view count
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
+        if not response_cache.is_cacheable(request):
+            return Response(self.get_detail_data())
+
+        # Anonymous reads are served from the response cache
+        pk = self.kwargs[self.lookup_field]
+        data, hit = response_cache.get_or_build(
+            response_cache.detail_cache_key(pk, request), self.get_detail_data)
+        if hit:
+            view_buffer.record(pk, viewer_key(request))
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if response_cache.is_cacheable(request):
+            return await sync_to_async(self.retrieve)(request, *args, **kwargs)
+        instance = await self.aget_object()
+        return Response(await sync_to_async(self.get_detail_data)(instance))
+
+    def get_detail_data(self, instance=None):
+        if instance is None:
+            instance = self.get_object()
+
+        # Buffer the view; it is written to the database in batches
+        view_buffer.record(instance.pk, viewer_key(self.request))
+        if 'views_count' not in instance.get_deferred_fields():
+            instance.views_count += view_buffer.pending(instance.pk)
 
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return serializer.data
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -116,6 +158,9 @@ class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
+        # Ingredients may have been re-parsed, drop the prefetched rows
+        instance._prefetched_objects_cache = {}
+
         # Return full recipe details
         response_serializer = RecipeSerializer(
             instance, context={'request': request})
@@ -154,23 +199,39 @@ class RecipeRatingView(generics.GenericAPIView):
 
     def post(self, request, pk):
         """Rate a recipe (create or update)"""
-        recipe = get_object_or_404(Recipe, pk=pk)
-
-        # Check if user is rating their own recipe
-        if recipe.author == request.user:
-            return Response({
-                "error": "You cannot rate your own recipe."
-            }, status=status.HTTP_400_BAD_REQUEST)
-
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
 
-        # Create or update rating
-        rating, created = Rating.objects.update_or_create(
-            user=request.user,
-            recipe=recipe,
-            defaults={'score': serializer.validated_data['score']}
-        )
+        with transaction.atomic():
+            # Lock the recipe so its counters only change through this
+            # rating until the transaction ends
+            recipe = get_object_or_404(
+                Recipe.objects.select_for_update(), pk=pk)
+
+            # Check if user is rating their own recipe
+            if recipe.author_id == request.user.id:
+                return Response({
+                    "error": "You cannot rate your own recipe."
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer.is_valid(raise_exception=True)
+            score = serializer.validated_data['score']
+
+            # Create or update rating; the post_save signal updates the
+            # stored counters with F() expressions
+            rating = Rating.objects.filter(
+                user=request.user, recipe=recipe).first()
+            created = rating is None
+            if created:
+                rating = Rating(user=request.user, recipe=recipe)
+                previous = 0
+            else:
+                previous = rating.score
+            rating.score = score
+            rating.save()
+
+        # Mirror the update on the locked row instead of reading it again
+        recipe.ratings_count += created
+        recipe.rating_sum += score - previous
 
         # Return response
         response_serializer = RatingSerializer(
@@ -205,18 +266,209 @@ class RecipeRatingView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class MyRecipesView(generics.ListAPIView):
+class RecipeByIngredientsView(generics.ListAPIView):
+    # """
+    # GET: Recipes using any of ?ingredients=garlic,basil, ranked by how
+    # many of the requested ingredients they contain
+    # """
+    serializer_class = RecipeIngredientMatchSerializer
+    pagination_class = PageNumberPagination
+    filter_backends = []
+    max_ingredients = 20
+
+    def get_ingredient_names(self):
+        names = {
+            normalize_name(name)
+            for value in self.request.query_params.getlist('ingredients')
+            for name in value.split(',')
+        }
+        names.discard('')
+        if not names:
+            raise ValidationError({
+                "ingredients": "Provide at least one ingredient."
+            })
+        if len(names) > self.max_ingredients:
+            raise ValidationError({
+                "ingredients": f"At most {self.max_ingredients} ingredients are allowed."
+            })
+        return names
+
+    def get_queryset(self):
+        # Grouped scan of the (ingredient, recipe) index, no recipe rows
+        return (
+            RecipeIngredient.objects
+            .filter(ingredient__name__in=self.get_ingredient_names())
+            .values('recipe_id')
+            .annotate(matched=Count('ingredient_id'))
+            .order_by('-matched', '-recipe_id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        requested = len(self.get_ingredient_names())
+        page = self.paginate_queryset(self.get_queryset())
+        recipes = Recipe.objects.for_list().in_bulk(
+            [row['recipe_id'] for row in page])
+
+        results = []
+        for row in page:
+            recipe = recipes.get(row['recipe_id'])
+            if recipe is None:
+                continue
+            recipe.matched_ingredients = row['matched']
+            recipe.coverage = round(row['matched'] / requested, 2)
+            results.append(recipe)
+
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PantryMatchView(generics.GenericAPIView):
+    # """
+    # POST: Recipes the given pantry can make, or is missing at most
+    # `max_missing` ingredients for
+    # """
+    serializer_class = PantrySerializer
+    pagination_class = PageNumberPagination
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        names = {
+            normalize_name(name)
+            for name in serializer.validated_data['ingredients']
+        }
+        pantry_ids = Ingredient.objects.filter(
+            name__in=names).values_list('id', flat=True)
+        matches = pantry_index.match(
+            pantry_ids, serializer.validated_data['max_missing'])
+
+        page = self.paginate_queryset(matches)
+        recipes = Recipe.objects.for_list().in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        missing = {
+            recipe_id: pantry_index.ingredient_ids(mask)
+            for recipe_id, mask in page
+        }
+        ingredient_names = Ingredient.objects.in_bulk(
+            {pk for ids in missing.values() for pk in ids})
+
+        results = []
+        for recipe_id, _ in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.missing_ingredients = sorted(
+                ingredient_names[pk].name for pk in missing[recipe_id])
+            results.append(recipe)
+
+        return self.get_paginated_response(
+            PantryMatchSerializer(
+                results, many=True, context=self.get_serializer_context()
+            ).data
+        )
+
+
+class SimilarRecipesView(generics.ListAPIView):
+    # """
+    # GET: Recipes most similar to this one, from the precomputed
+    # table built by `manage.py build_recipe_similarities`
+    # """
+    serializer_class = RecipeSimilarSerializer
+    pagination_class = None
+    filter_backends = []
+
+    def get_queryset(self):
+        return (
+            Recipe.objects.for_list()
+            .filter(neighbour_of__recipe_id=self.kwargs['pk'])
+            .annotate(similarity=F('neighbour_of__score'),
+                      collaborative=F('neighbour_of__collaborative'))
+            .order_by('-collaborative', '-similarity', '-id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        recipes = list(self.get_queryset())
+        # Only an empty result needs to tell "no neighbours" from a 404
+        if not recipes:
+            get_object_or_404(Recipe.objects.only('id'), pk=kwargs['pk'])
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+
+class RecommendedRecipesView(generics.ListAPIView):
+    # """
+    # GET: Recipes recommended for the current user, scored by summing
+    # the similarity of each neighbour of the recipes they rated or saved
+    # """
+    serializer_class = RecipeSimilarSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+    filter_backends = []
+    default_limit = 20
+    max_limit = 50
+
+    def get_limit(self):
+        return query_limit(self.request, self.default_limit, self.max_limit)
+
+    def get_queryset(self):
+        user = self.request.user
+        rated = Rating.objects.filter(user=user).values('recipe_id')
+        saved = SavedRecipe.objects.filter(user=user).values('recipe_id')
+        return (
+            Recipe.objects.for_list()
+            .filter(
+                Q(neighbour_of__recipe_id__in=rated)
+                | Q(neighbour_of__recipe_id__in=saved)
+            )
+            .exclude(Q(pk__in=rated) | Q(pk__in=saved))
+            .exclude(author=user)
+            .annotate(
+                similarity=Sum('neighbour_of__score'),
+                # Co-interaction evidence ranks before content matches
+                collaborative_similarity=Coalesce(Sum(
+                    'neighbour_of__score',
+                    filter=Q(neighbour_of__collaborative=True)), 0.0),
+            )
+            .order_by('-collaborative_similarity', '-similarity', '-id')
+            [:self.get_limit()]
+        )
+
+
+class TrendingRecipesView(SparseQuerysetMixin, AsyncReadMixin, generics.ListAPIView):
+    # """
+    # GET: Recipes with the most recent engagement, by the time-decayed
+    # score stored by `manage.py refresh_recipe_scores`
+    # """
+    serializer_class = RecipeListSerializer
+    filter_backends = []
+    cursor_ordering = ('-trending_score', '-id')
+
+    def get_queryset(self):
+        return (
+            Recipe.objects.for_list()
+            .filter(trending_score__gt=0)
+            .order_by('-trending_score', '-id')
+        )
+
+
+class MyRecipesView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = RecipeListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Recipe.objects.filter(author=self.request.user).order_by('-created_at')
+        return Recipe.objects.for_list().filter(
+            author=self.request.user).order_by('-created_at')
 
 
 class RecipeSaveView(generics.GenericAPIView):
     # """
     # POST: Save/bookmark a recipe (toggle)
+    # PUT: Save a recipe (no-op if already saved)
+    # DELETE: Remove a saved recipe (no-op if not saved)
     # GET: Check if recipe is saved
+    # Writes accept an Idempotency-Key header for safe retries
     # """
     permission_classes = [IsAuthenticated]
 
@@ -230,34 +482,184 @@ class RecipeSaveView(generics.GenericAPIView):
             "is_saved": is_saved
         })
 
+    def own_recipe_error(self):
+        return Response({
+            "error": "You cannot save your own recipe."
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def saved_response(self, recipe, created):
+        if created:
+            return Response({
+                "message": f"'{recipe.title}' has been saved to your favorites!",
+                "is_saved": True
+            }, status=status.HTTP_201_CREATED)
+        return Response({
+            "message": f"'{recipe.title}' is already in your saved recipes.",
+            "is_saved": True
+        }, status=status.HTTP_200_OK)
+
+    @idempotent
     def post(self, request, pk):
         """Toggle save/unsave recipe"""
-        recipe = get_object_or_404(Recipe, pk=pk)
+        recipe = get_object_or_404(Recipe.objects.only('author_id', 'title'), pk=pk)
 
         # Check if user is trying to save their own recipe
-        if recipe.author == request.user:
-            return Response({
-                "error": "You cannot save your own recipe."
-            }, status=status.HTTP_400_BAD_REQUEST)
+        if recipe.author_id == request.user.pk:
+            return self.own_recipe_error()
 
-        # Check if already saved
-        saved_recipe = SavedRecipe.objects.filter(
-            user=request.user, recipe=recipe).first()
-
-        if saved_recipe:
-            # Unsave
-            saved_recipe.delete()
+        # Unsave if saved, otherwise save
+        if unsave_recipe(request.user, recipe):
             return Response({
                 "message": f"'{recipe.title}' has been removed from your saved recipes.",
                 "is_saved": False
             }, status=status.HTTP_200_OK)
+        return self.saved_response(recipe, save_recipe(request.user, recipe))
+
+    @idempotent
+    def put(self, request, pk):
+        """Save recipe"""
+        recipe = get_object_or_404(Recipe.objects.only('author_id', 'title'), pk=pk)
+
+        if recipe.author_id == request.user.pk:
+            return self.own_recipe_error()
+
+        return self.saved_response(recipe, save_recipe(request.user, recipe))
+
+    @idempotent
+    def delete(self, request, pk):
+        """Unsave recipe"""
+        recipe = get_object_or_404(Recipe.objects.only('title'), pk=pk)
+
+        if unsave_recipe(request.user, recipe):
+            message = f"'{recipe.title}' has been removed from your saved recipes."
         else:
-            # Save
-            SavedRecipe.objects.create(user=request.user, recipe=recipe)
-            return Response({
-                "message": f"'{recipe.title}' has been saved to your favorites!",
-                "is_saved": True
-            }, status=status.HTTP_201_CREATED)
+            message = f"'{recipe.title}' is not in your saved recipes."
+        return Response({
+            "message": message,
+            "is_saved": False
+        }, status=status.HTTP_200_OK)
+
+
+class RecipeStateView(generics.GenericAPIView):
+    # """
+    # POST: The current user's save and rating for up to MAX_STATE_BATCH
+    # recipes at once, in place of one GET per recipe
+    # """
+    serializer_class = RecipeStateSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # One IN query per table: recipes, saves, ratings
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        existing = set(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        state = ViewerState(request.user)
+        state.load_recipes(existing)
+
+        return Response({
+            "recipes": [
+                {
+                    "id": pk,
+                    "is_saved": state.is_saved(pk),
+                    "user_rating": state.user_rating(pk),
+                }
+                for pk in ids if pk in existing
+            ],
+            "missing": [pk for pk in ids if pk not in existing]
+        })
+
+
+class RecipeFeedView(generics.GenericAPIView):
+    # """
+    # GET: Home feed of recipes from the authors the user follows,
+    # newest first, paginated with an opaque ?cursor=
+    # """
+    permission_classes = [IsAuthenticated]
+    serializer_class = RecipeListSerializer
+
+    def get(self, request):
+        position = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError:
+                raise NotFound('Invalid cursor')
+
+        recipes, last = get_feed_page(
+            request.user, position, limit=api_settings.PAGE_SIZE)
+        next_url = None
+        if last:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_cursor(*last))
+
+        serializer = self.get_serializer(recipes, many=True)
+        return Response({
+            "next": next_url,
+            "previous": None,
+            "results": serializer.data
+        })
+
+
+class RecipeImportView(generics.GenericAPIView):
+    # """
+    # POST: Import recipes from an uploaded JSONL or CSV `file` (admin only).
+    # Recipes belong to the importing user; invalid rows are reported
+    # with their line number and field errors
+    # """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": "Upload a JSONL or CSV file."})
+        fmt = request.data.get('fmt') or bulk.guess_format(upload.name)
+        if fmt not in bulk.FORMATS:
+            raise ValidationError({"fmt": f"Must be one of {', '.join(bulk.FORMATS)}."})
+
+        upload.seek(0)
+        rows = bulk.read_rows(bulk.open_text(upload.file), fmt)
+        result = bulk.import_recipes(rows, request.user)
+
+        return Response({
+            "message": f"Imported {result.created} recipe(s).",
+            **result.as_dict()
+        }, status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
+
+class RecipeExportView(generics.GenericAPIView):
+    # """
+    # GET: Stream every recipe as ?fmt=jsonl (default) or ?fmt=csv
+    # (admin only)
+    # """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('fmt', 'jsonl')
+        if fmt not in bulk.FORMATS:
+            raise ValidationError({"fmt": f"Must be one of {', '.join(bulk.FORMATS)}."})
+
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            bulk.export_rows(Recipe.objects.all(), fmt),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="recipes.{fmt}"'
+        return response
+
+
+class RecipeCacheStatsView(generics.GenericAPIView):
+    # """
+    # GET: Response cache hit/miss counters (admin only)
+    # """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.cache_stats())
 
 
 class MySavedRecipesView(generics.ListAPIView):
@@ -268,10 +670,12 @@ class MySavedRecipesView(generics.ListAPIView):
     
     def get(self, request):
         """Get all saved recipes by current user"""
-        saved_recipes = SavedRecipe.objects.filter(user=request.user).select_related('recipe', 'recipe__author')
-        
-        # Get just the recipes
-        recipes = [saved.recipe for saved in saved_recipes]
+        recipes = list(RecipeListSerializer.prune_queryset(
+            Recipe.objects.for_list()
+            .filter(saved_by__user=request.user)
+            .order_by('-saved_by__saved_at'),
+            request,
+        ))
         
         serializer = RecipeListSerializer(recipes, many=True, context={'request': request})
         
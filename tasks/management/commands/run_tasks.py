@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.queue import requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (notifications, image variants, ...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Run the due tasks once and exit")
+        parser.add_argument('--batch', type=int, default=100,
+                            help="Tasks claimed per poll")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Requeue tasks running longer than this")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale task(s).")
+
+        while True:
+            succeeded, failed = run_pending(options['batch'])
+            if succeeded or failed:
+                self.stdout.write(f"Ran {succeeded} task(s), {failed} failed.")
+            if options['once']:
+                break
+            if not succeeded and not failed:
+                time.sleep(options['sleep'])
@@ -0,0 +1,107 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """
+    Register a function as a background task under `name`.
+
+    Task functions take JSON-serializable keyword arguments and run inside
+    a transaction, so a failed attempt leaves no partial writes behind.
+    """
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def max_attempts():
+    return getattr(settings, 'TASK_MAX_ATTEMPTS', 5)
+
+
+def enqueue(name, run_at=None, **kwargs):
+    """
+    Queue a task. The row is written in the caller's transaction, so the
+    task only becomes visible to workers if that transaction commits.
+    """
+    if name not in _registry:
+        raise KeyError(f"Unknown task: {name}")
+    return Task.objects.create(
+        name=name, kwargs=kwargs, run_at=run_at or timezone.now())
+
+
+def _claim(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        due = Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent workers skip each other's rows instead of waiting
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+        # run_at doubles as the claim time while a task is running
+        Task.objects.filter(pk__in=ids).update(status=Task.RUNNING, run_at=now)
+    return list(Task.objects.filter(pk__in=ids).order_by('run_at', 'id'))
+
+
+def _run(job):
+    func = _registry.get(job.name)
+    try:
+        if func is None:
+            raise KeyError(f"Unknown task: {job.name}")
+        with transaction.atomic():
+            func(**job.kwargs)
+            job.delete()
+        return True
+    except Exception:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        if job.attempts >= max_attempts():
+            job.status = Task.FAILED
+            logger.exception("Task %s (%s) failed", job.pk, job.name)
+        else:
+            # Exponential backoff: 2s, 4s, 8s, ...
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        job.save(update_fields=['attempts', 'last_error', 'status', 'run_at'])
+        return False
+
+
+def requeue_stale(seconds):
+    """Return tasks left running by a crashed worker to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    return Task.objects.filter(
+        status=Task.RUNNING, run_at__lt=cutoff).update(status=Task.PENDING)
+
+
+def run_pending(limit=100):
+    """
+    Run up to `limit` due tasks, oldest first. Returns (succeeded, failed).
+    """
+    succeeded = failed = 0
+    for job in _claim(limit):
+        if _run(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def run_until_empty(limit=100):
+    """Run due tasks, including ones they enqueue, until none are left"""
+    total = (0, 0)
+    while True:
+        succeeded, failed = run_pending(limit)
+        if not succeeded and not failed:
+            return total
+        total = (total[0] + succeeded, total[1] + failed)
@@ -0,0 +1,49 @@
+from django.test import TestCase, override_settings
+
+from .models import Task
+from .queue import enqueue, run_pending, task
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.explode')
+def explode():
+    Task.objects.create(name='side-effect')
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_and_removes_task(self):
+        enqueue('tests.record', value=1)
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASK_MAX_ATTEMPTS=2)
+    def test_failures_roll_back_and_retry_later(self):
+        job = enqueue('tests.explode')
+        self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.PENDING, 1))
+        self.assertIn('boom', job.last_error)
+        # The side effect was rolled back and the retry isn't due yet
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(run_pending(), (0, 0))
+
+        Task.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue('tests.missing')
@@ -0,0 +1,86 @@
+from django.db.models import (Case, Count, F, IntegerField, OuterRef, Subquery,
+                              Value, When)
+from django.db.models.functions import Coalesce
+
+
+def adjust_counters(user_ids, **deltas):
+    """
+    Apply the same deltas to the stored counters of `user_ids` in a
+    single UPDATE.
+
+    Uses F() expressions so concurrent writers never overwrite each other.
+    """
+    from .models import User
+
+    changes = {
+        field: F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if changes:
+        User.objects.filter(pk__in=user_ids).update(**changes)
+
+
+def adjust_follow_counters(user_id, related_ids, delta, reverse=False):
+    """
+    Record `delta` follows between `user_id` and each of `related_ids`:
+    the user follows them, or with `reverse` they follow the user.
+
+    Both sides are updated in one UPDATE, so two requests following in
+    opposite directions lock the rows in the same order and can't deadlock.
+    """
+    from .models import User
+
+    related_ids = set(related_ids)
+    if not delta or not related_ids:
+        return
+    mine, theirs = (
+        ('followers_count', 'following_count') if reverse
+        else ('following_count', 'followers_count')
+    )
+    User.objects.filter(pk__in=related_ids | {user_id}).update(**{
+        mine: F(mine) + Case(
+            When(pk=user_id, then=Value(delta * len(related_ids))),
+            default=Value(0)),
+        theirs: F(theirs) + Case(
+            When(pk__in=related_ids, then=Value(delta)),
+            default=Value(0)),
+    })
+
+
+def _count_subquery(model, field):
+    # Correlated COUNT of `model` rows grouped by `field`, 0 when empty
+    rows = (
+        model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def counter_expressions(follow_model, recipe_model):
+    """Expressions computing every stored user counter from the source tables"""
+    return {
+        'followers_count': _count_subquery(follow_model, 'to_user'),
+        'following_count': _count_subquery(follow_model, 'from_user'),
+        'recipes_count': _count_subquery(recipe_model, 'author'),
+    }
+
+
+def rebuild_counters(queryset=None):
+    """
+    Recompute stored user counters from the follow and recipe tables.
+
+    Runs as one UPDATE with correlated subqueries and returns the number
+    of users updated.
+    """
+    from recipe.models import Recipe
+    from .models import User
+
+    if queryset is None:
+        queryset = User.objects.all()
+    return queryset.update(
+        **counter_expressions(User.following.through, Recipe))
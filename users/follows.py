@@ -0,0 +1,45 @@
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+from api.writes import delete_where, insert_ignore
+from .counters import adjust_follow_counters
+from .models import User
+
+Follow = User.following.through
+
+
+def _send(action, user, target_id):
+    m2m_changed.send(
+        sender=Follow, instance=user, action=action, reverse=False,
+        model=User, pk_set={target_id}, using=router.db_for_write(Follow))
+
+
+def follow(user, target):
+    """
+    Make `user` follow `target` with a single conditional INSERT.
+
+    Returns False if they already did. Safe to call concurrently: only
+    the request that inserts the row sends post_add, which updates the
+    counters, the feed and notifications.
+    """
+    with transaction.atomic():
+        if not insert_ignore(Follow, from_user_id=user.pk, to_user_id=target.pk):
+            return False
+        _send('post_add', user, target.pk)
+    return True
+
+
+def unfollow(user, target):
+    """
+    Make `user` stop following `target` with a single DELETE.
+
+    Returns False if they didn't follow them.
+    """
+    with transaction.atomic():
+        if not delete_where(Follow, from_user_id=user.pk, to_user_id=target.pk):
+            return False
+        # The row is already gone, so pre_remove (which counts the rows
+        # about to go) isn't sent; the counters are adjusted here instead
+        adjust_follow_counters(user.pk, [target.pk], -1)
+        _send('post_remove', user, target.pk)
+    return True
@@ -0,0 +1,71 @@
+import heapq
+from collections import Counter
+
+from .models import User
+
+Follow = User.following.through
+
+SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 50
+# Followed accounts whose own follows are read for suggestions; keeps the
+# cost bounded for users who follow thousands of accounts
+MAX_SUGGESTION_SOURCES = 2000
+BATCH_SIZE = 500
+
+
+def mutual_follows(user):
+    """Users who follow `user` and are followed back, as one join"""
+    return (
+        User.objects.filter(followers=user, following=user)
+        .order_by('-created_at', '-id')
+    )
+
+
+def followed_by_following(viewer, user):
+    """People `viewer` follows who also follow `user`"""
+    return (
+        User.objects.filter(followers=viewer, following=user)
+        .exclude(pk=viewer.pk)
+        .order_by('-created_at', '-id')
+    )
+
+
+def follow_suggestions(viewer, limit=SUGGESTION_LIMIT):
+    """
+    Users followed by the people `viewer` follows, ranked by how many of
+    them follow each one.
+
+    Reads the follow rows of the followed accounts in batches and tallies
+    them in memory. Accounts the viewer already follows are left out.
+    Returns users with a `mutual_count` attribute, most shared first.
+    """
+    following = list(
+        Follow.objects.filter(from_user=viewer)
+        .order_by('to_user_id')
+        .values_list('to_user_id', flat=True)
+    )
+    excluded = set(following)
+    excluded.add(viewer.pk)
+
+    counts = Counter()
+    sources = following[:MAX_SUGGESTION_SOURCES]
+    for start in range(0, len(sources), BATCH_SIZE):
+        rows = (
+            Follow.objects.filter(from_user_id__in=sources[start:start + BATCH_SIZE])
+            .values_list('to_user_id', flat=True)
+        )
+        counts.update(
+            user_id for user_id in rows.iterator(chunk_size=2000)
+            if user_id not in excluded)
+
+    # Ties go to the older account
+    top = heapq.nlargest(
+        limit, counts.items(), key=lambda item: (item[1], -item[0]))
+    users = User.objects.in_bulk([user_id for user_id, _ in top])
+    suggestions = []
+    for user_id, count in top:
+        user = users.get(user_id)
+        if user is not None:
+            user.mutual_count = count
+            suggestions.append(user)
+    return suggestions
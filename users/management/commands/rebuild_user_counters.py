@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.counters import rebuild_counters
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild stored follower, following and recipe counters on users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help="Only rebuild the given username (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = User.objects.all()
+        if options['usernames']:
+            queryset = queryset.filter(username__in=options['usernames'])
+
+        with transaction.atomic():
+            updated = rebuild_counters(queryset)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {updated} user(s)."
+        ))
@@ -7,6 +7,8 @@ class User(AbstractUser):
     bio = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(
         upload_to='profile_pics/', blank=True, null=True)
+    # Resized copies made by the background worker, see api.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -18,18 +20,17 @@ class User(AbstractUser):
         blank=True
     )  
 
+    # Denormalized counters, maintained by users.signals and
+    # recipe.signals and rebuilt with `manage.py rebuild_user_counters`
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    recipes_count = models.IntegerField(default=0)
+
     def __str__(self):
         return self.username
  
     class Meta:
         ordering = ['-created_at']
-     
-    @property
-    def followers_count(self):
-        # """Get number of followers"""
-        return self.followers.count()
-    
-    @property
-    def following_count(self):
-        # """Get number of users this user is following"""
-        return self.following.count()
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
@@ -2,6 +2,10 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from interactions.viewer_state import (MAX_STATE_BATCH, get_viewer_state,
+                                       ViewerStateListSerializer)
+from api.images import ImageVariantsField
+from api.uploads import ImageUploadField
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -49,31 +53,28 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
     is_following = serializers.SerializerMethodField()
+    profile_picture = ImageUploadField(required=False, allow_null=True)
+    profile_picture_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'bio', 'profile_picture',
+            'profile_picture_variants',
             'followers_count', 'following_count', 'is_following',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'username',
-                            'email', 'created_at', 'updated_at']
-
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
+                            'email', 'followers_count', 'following_count',
+                            'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
 
     def get_is_following(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return request.user.following.filter(id=obj.id).exists()
-        return False
+        return get_viewer_state(self.context).is_following(obj.id)
+
+    def load_viewer_state(self, state, instances):
+        state.load_users(user.id for user in instances)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -102,10 +103,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class FollowSerializer(serializers.ModelSerializer):
     # """Serializer for follow/following lists"""
-    recipes_count = serializers.SerializerMethodField()
-    followers_count = serializers.IntegerField(read_only=True)
-    following_count = serializers.IntegerField(read_only=True)
     is_following = serializers.SerializerMethodField()
+    profile_picture_variants = ImageVariantsField()
 
     class Meta:
         model = User
@@ -114,17 +113,35 @@ class FollowSerializer(serializers.ModelSerializer):
             'username',
             'bio',
             'profile_picture',
+            'profile_picture_variants',
             'recipes_count', 
             'followers_count',
             'following_count',
             'is_following'
         ]
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        read_only_fields = fields
+        list_serializer_class = ViewerStateListSerializer
 
     def get_is_following(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return request.user.following.filter(id=obj.id).exists()
-        return False
+        return get_viewer_state(self.context).is_following(obj.id)
+
+    def load_viewer_state(self, state, instances):
+        state.load_users(user.id for user in instances)
+
+
+class FollowSuggestionSerializer(FollowSerializer):
+    # Number of people you follow who follow this user
+    mutual_count = serializers.IntegerField(read_only=True)
+
+    class Meta(FollowSerializer.Meta):
+        fields = FollowSerializer.Meta.fields + ['mutual_count']
+        read_only_fields = fields
+
+
+class FollowStateSerializer(serializers.Serializer):
+    # """Usernames to look up the current user's follow state for"""
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150),
+        allow_empty=False,
+        max_length=MAX_STATE_BATCH,
+    )
@@ -0,0 +1,45 @@
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from api.images import watch_image_field
+from .counters import adjust_counters, adjust_follow_counters
+from .models import User
+
+Follow = User.following.through
+
+
+@receiver(m2m_changed, sender=Follow)
+def follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    # Runs inside the transaction of the add/remove/clear. Forward:
+    # instance follows pk_set. Reverse: pk_set follow instance
+    mine, theirs = ('to_user', 'from_user') if reverse else ('from_user', 'to_user')
+    if action in ('pre_remove', 'pre_clear'):
+        # pk_set may name users that aren't related (and is empty for
+        # clears), so count the rows actually being deleted. Locking them
+        # makes a concurrent remove of the same rows wait and count none
+        rows = Follow.objects.filter(**{mine: instance}).select_for_update()
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{theirs}__in': pk_set})
+        pk_set = set(rows.values_list(f'{theirs}_id', flat=True))
+        delta = -1
+    elif action == 'post_add':
+        # Only the pairs that were actually inserted
+        delta = 1
+    else:
+        return
+    adjust_follow_counters(instance.pk, pk_set, delta, reverse=reverse)
+
+
+@receiver(pre_delete, sender=User)
+def unfollow_deleted_user(sender, instance, **kwargs):
+    # Follow rows cascade without m2m_changed
+    adjust_counters(
+        Follow.objects.filter(from_user=instance).values('to_user'),
+        followers_count=-1)
+    adjust_counters(
+        Follow.objects.filter(to_user=instance).values('from_user'),
+        following_count=-1)
+
+
+# Profile picture thumbnails are made by the task worker
+watch_image_field(User, 'profile_picture', 'profile_picture_variants')
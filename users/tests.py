@@ -1,3 +1,440 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from .models import User
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password='pass1234')
+
+
+class FollowListQueryCountTests(APITestCase):
+    # Follower/following lists must not issue queries per listed user
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = make_user('star')
+        cls.viewer = make_user('viewer')
+
+    def add_followers(self, count):
+        start = self.star.followers.count()
+        for i in range(start, start + count):
+            follower = make_user(f'follower{i}')
+            follower.following.add(self.star)
+            self.viewer.following.add(follower)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_followers_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.viewer)
+        url = reverse('followers-list', args=[self.star.username])
+
+        self.add_followers(1)
+        small, _ = self.count_queries(url)
+        self.add_followers(5)
+        large, response = self.count_queries(url)
+
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['followers_count'], 6)
+        self.assertTrue(all(
+            row['is_following'] for row in response.data['followers']))
+        self.assertEqual(response.data['followers'][0]['following_count'], 1)
+
+    def test_following_list_query_count_is_constant(self):
+        url = reverse('following-list', args=[self.viewer.username])
+
+        self.add_followers(1)
+        small, _ = self.count_queries(url)
+        self.add_followers(5)
+        large, response = self.count_queries(url)
+
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['following_count'], 6)
+
+
+@override_settings(API_FAST_PATH=True)
+class CompiledFollowListTests(APITestCase):
+    # Follow lists render the same bytes with and without api.compiled
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = make_user('star')
+        cls.viewer = make_user('viewer')
+        for i, bio in enumerate(['', 'Pâtissière \u2028 à Lyon', 'chef']):
+            follower = make_user(f'follower{i}')
+            User.objects.filter(pk=follower.pk).update(
+                bio=bio, profile_picture=f'profile_pictures/{i}.jpg' if i else '')
+            follower.following.add(cls.star)
+            if i:
+                cls.viewer.following.add(follower)
+
+    def assertSameBytes(self, url, params=None):
+        fast = self.client.get(url, params)
+        with override_settings(API_FAST_PATH=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_follow_lists_bytes_match(self):
+        for name, username in (('followers-list', 'star'),
+                               ('following-list', 'viewer')):
+            url = reverse(name, args=[username])
+            for user in (None, self.viewer):
+                for params in ({}, {'paginate': 'cursor'}):
+                    with self.subTest(name, user=user, **params):
+                        self.client.force_authenticate(user)
+                        self.assertSameBytes(url, params)
+
+
+class UserCounterTests(APITestCase):
+    # Stored counters must match the follow and recipe tables
+
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.carol = make_user('carol')
+
+    def assertCountersConsistent(self):
+        from .counters import rebuild_counters
+
+        stored = {
+            user.pk: (user.followers_count, user.following_count,
+                      user.recipes_count)
+            for user in User.objects.all()
+        }
+        rebuild_counters()
+        rebuilt = {
+            user.pk: (user.followers_count, user.following_count,
+                      user.recipes_count)
+            for user in User.objects.all()
+        }
+        self.assertEqual(stored, rebuilt)
+
+    def test_follow_toggle_updates_counts(self):
+        self.client.force_authenticate(self.alice)
+        url = reverse('follow-user', args=[self.bob.username])
+
+        self.client.post(url)
+        self.bob.refresh_from_db()
+        self.alice.refresh_from_db()
+        self.assertEqual(self.bob.followers_count, 1)
+        self.assertEqual(self.alice.following_count, 1)
+        self.assertCountersConsistent()
+
+        self.client.post(url)
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.followers_count, 0)
+        self.assertCountersConsistent()
+
+    def test_m2m_operations_keep_counts(self):
+        self.alice.following.add(self.bob, self.carol)
+        # Already followed; must not be counted twice
+        self.alice.following.add(self.bob)
+        self.carol.followers.add(self.bob)
+        self.assertCountersConsistent()
+
+        # Not followed; must not be subtracted
+        self.bob.following.remove(self.alice)
+        self.carol.followers.remove(self.alice)
+        self.assertCountersConsistent()
+
+        self.alice.following.clear()
+        self.carol.followers.clear()
+        self.assertCountersConsistent()
+        self.assertEqual(
+            User.objects.filter(followers_count__gt=0).count(), 0)
+
+    def test_deleting_user_updates_counts(self):
+        self.alice.following.add(self.bob)
+        self.carol.following.add(self.alice)
+        self.alice.delete()
+
+        self.bob.refresh_from_db()
+        self.carol.refresh_from_db()
+        self.assertEqual(self.bob.followers_count, 0)
+        self.assertEqual(self.carol.following_count, 0)
+        self.assertCountersConsistent()
+
+    def test_recipe_count(self):
+        from recipe.models import Recipe
+
+        recipe = Recipe.objects.create(
+            author=self.alice, title='Soup', description='Hot',
+            ingredients='water', instructions='Boil')
+        Recipe.objects.create(
+            author=self.alice, title='Bread', description='Baked',
+            ingredients='flour', instructions='Bake')
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.recipes_count, 2)
+
+        recipe.delete()
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.recipes_count, 1)
+        self.assertCountersConsistent()
+
+    def test_profile_reads_stored_counts(self):
+        self.bob.following.add(self.alice)
+        url = reverse('user-detail', args=[self.alice.username])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['followers_count'], 1)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in ctx.captured_queries))
+
+
+class FollowGraphTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user('viewer')
+        cls.star = make_user('star')
+        cls.friends = [make_user(f'friend{i}') for i in range(3)]
+        cls.others = [make_user(f'other{i}') for i in range(3)]
+
+        # viewer <-> friend0 and friend1 follow each other
+        cls.viewer.following.add(*cls.friends)
+        cls.friends[0].following.add(cls.viewer, cls.star)
+        cls.friends[1].following.add(cls.viewer, cls.star, cls.others[0])
+        cls.friends[2].following.add(cls.others[0], cls.others[1])
+
+    def test_mutual_follows(self):
+        url = reverse('mutual-follows', args=[self.viewer.username])
+        response = self.client.get(url)
+
+        usernames = {row['username'] for row in response.data['results']}
+        self.assertEqual(usernames, {'friend0', 'friend1'})
+
+    def test_followed_by_following(self):
+        self.client.force_authenticate(self.viewer)
+        url = reverse('followed-by-following', args=[self.star.username])
+        response = self.client.get(url)
+
+        usernames = {row['username'] for row in response.data['results']}
+        self.assertEqual(usernames, {'friend0', 'friend1'})
+
+    def test_suggestions(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get(reverse('follow-suggestions'))
+
+        suggestions = [
+            (row['username'], row['mutual_count'])
+            for row in response.data['suggestions']
+        ]
+        # Ties go to the older account
+        self.assertEqual(
+            suggestions, [('star', 2), ('other0', 2), ('other1', 1)])
+
+    def test_suggestions_skip_followed_users(self):
+        self.viewer.following.add(self.star)
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get(reverse('follow-suggestions'), {'limit': 1})
+
+        self.assertEqual(
+            [row['username'] for row in response.data['suggestions']],
+            ['other0'])
+
+    def test_suggestions_reject_non_integer_limit(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get(
+            reverse('follow-suggestions'), {'limit': 'ten'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit', response.data)
+
+
+class FollowWriteTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user('alice')
+        cls.bob = make_user('bob')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.alice)
+        self.url = reverse('follow-user', args=[self.bob.username])
+
+    def counts(self):
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        return self.alice.following_count, self.bob.followers_count
+
+    def test_put_and_delete_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['is_following'])
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertTrue(self.alice.following.filter(pk=self.bob.pk).exists())
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.data['is_following'])
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_put_is_one_statement_when_already_following(self):
+        self.alice.following.add(self.bob)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.put(self.url)
+
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if 'users_user_following' in query['sql']
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('INSERT', writes[0])
+
+    def test_cannot_follow_yourself(self):
+        url = reverse('follow-user', args=[self.alice.username])
+        for method in (self.client.put, self.client.delete, self.client.post):
+            self.assertEqual(method(url).status_code, 400)
+
+    def test_idempotency_key_replays_toggle(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        retry = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        # The retry didn't toggle the follow back off
+        self.assertEqual(self.counts(), (1, 1))
+
+        # A new key is a new request
+        response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='def')
+        self.assertFalse(response.data['is_following'])
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_idempotency_keys_are_per_user(self):
+        self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+        carol = make_user('carol')
+        self.client.force_authenticate(carol)
+
+        response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.followers_count, 2)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentFollowTests(TransactionTestCase):
+    # Many clients setting and unsetting the same follows at once must
+    # leave the stored counters equal to the follow rows. Needs a database
+    # that takes writes from several connections (not SQLite)
+
+    THREADS = 8
+    ROUNDS = 25
+
+    def test_counters_do_not_drift(self):
+        from .counters import rebuild_counters
+
+        fans = [make_user(f'fan{i}') for i in range(4)]
+        stars = [make_user(f'star{i}') for i in range(2)]
+        errors = []
+
+        def hammer(seed):
+            client = APIClient()
+            try:
+                for i in range(self.ROUNDS):
+                    fan = fans[(seed + i) % len(fans)]
+                    star = stars[i % len(stars)]
+                    client.force_authenticate(fan)
+                    url = reverse('follow-user', args=[star.username])
+                    method = (client.put, client.delete, client.post)[(seed * i) % 3]
+                    response = method(url)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=hammer, args=(seed,))
+            for seed in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stored = list(User.objects.order_by('pk').values_list(
+            'followers_count', 'following_count'))
+        rebuild_counters()
+        rebuilt = list(User.objects.order_by('pk').values_list(
+            'followers_count', 'following_count'))
+        self.assertEqual(stored, rebuilt)
+
+
+class FollowStateTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user('viewer')
+        cls.users = [make_user(f'user{i}') for i in range(4)]
+        cls.viewer.following.add(cls.users[0], cls.users[2])
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+        self.url = reverse('follow-state')
+
+    def test_states_in_request_order(self):
+        usernames = ['user2', 'user1', 'nobody', 'user0', 'user2']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                self.url, {'usernames': usernames}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['users'], [
+            {'username': 'user2', 'is_following': True},
+            {'username': 'user1', 'is_following': False},
+            {'username': 'user0', 'is_following': True},
+        ])
+        self.assertEqual(response.data['missing'], ['nobody'])
+        # Users, then follows
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_case_insensitive_match(self):
+        # MySQL's default collation finds 'User2' for a stored 'user2'
+        def filter_ignoring_case(username__in):
+            query = Q()
+            for name in username__in:
+                query |= Q(username__iexact=name)
+            return User.objects.all().filter(query)
+
+        usernames = ['User2', 'USER1', 'nobody']
+        with mock.patch.object(User.objects, 'filter', filter_ignoring_case):
+            response = self.client.post(
+                self.url, {'usernames': usernames}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['users'], [
+            {'username': 'User2', 'is_following': True},
+            {'username': 'USER1', 'is_following': False},
+        ])
+        self.assertEqual(response.data['missing'], ['nobody'])
+
+    def test_batch_size_is_capped(self):
+        from interactions.viewer_state import MAX_STATE_BATCH
+
+        usernames = [f'user{i}' for i in range(MAX_STATE_BATCH + 1)]
+        response = self.client.post(
+            self.url, {'usernames': usernames}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -2,7 +2,9 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (RegisterView, LoginView, ProfileView, UserDetailView,
-                    FollowUserView, FollowersListView, FollowingListView)
+                    FollowUserView, FollowersListView, FollowingListView,
+                    MutualFollowsView, FollowedByFollowingView,
+                    FollowSuggestionsView, FollowStateView)
 
 
 urlpatterns = [
@@ -10,11 +12,18 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('follow-state/', FollowStateView.as_view(), name='follow-state'),
+    path('suggestions/', FollowSuggestionsView.as_view(),
+         name='follow-suggestions'),
     path('<str:username>/', UserDetailView.as_view(), name='user-detail'),
     path('<str:username>/follow/', FollowUserView.as_view(),
          name='follow-user'),
     path('<str:username>/followers/', FollowersListView.as_view(),
          name='followers-list'),
     path('<str:username>/following/',
-         FollowingListView.as_view(), name='following-list')
+         FollowingListView.as_view(), name='following-list'),
+    path('<str:username>/mutual/', MutualFollowsView.as_view(),
+         name='mutual-follows'),
+    path('<str:username>/followed-by/', FollowedByFollowingView.as_view(),
+         name='followed-by-following'),
 ]
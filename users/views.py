@@ -7,8 +7,16 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import CustomTokenObtainPairSerializer, FollowSerializer
 from .permissions import IsOwnerOrReadOnly
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
+from api.idempotency import idempotent
+from api.pagination import query_limit
+from api.async_views import AsyncReadMixin
+from api.compiled import CompiledListMixin
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.db import transaction
+from . import graph
+from .follows import follow, unfollow
+from .serializers import FollowStateSerializer, FollowSuggestionSerializer
+from interactions.viewer_state import ViewerState
 
 
 class RegisterView(generics.CreateAPIView):
@@ -57,7 +65,7 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         })
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(AsyncReadMixin, generics.RetrieveAPIView):
     """
     View any user's public profile
     """
@@ -70,7 +78,10 @@ class UserDetailView(generics.RetrieveAPIView):
 class FollowUserView(APIView):
     # """
     # POST: Follow/unfollow a user (toggle)
+    # PUT: Follow a user (no-op if already following)
+    # DELETE: Unfollow a user (no-op if not following)
     # GET: Check if you're following a user
+    # Writes accept an Idempotency-Key header for safe retries
     # """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -84,38 +95,116 @@ class FollowUserView(APIView):
             "is_following": is_following
         })
 
+    def self_follow_error(self):
+        return Response({
+            "error": "You cannot follow yourself."
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    @idempotent
     def post(self, request, username):
         """Toggle follow/unfollow"""
         user_to_follow = get_object_or_404(User, username=username)
 
         # Can't follow yourself
         if user_to_follow == request.user:
-            return Response({
-                "error": "You cannot follow yourself."
-            }, status=status.HTTP_400_BAD_REQUEST)
+            return self.self_follow_error()
 
-        # Check if already following
-        if request.user.following.filter(id=user_to_follow.id).exists():
-            # Unfollow
-            request.user.following.remove(user_to_follow)
+        # Unfollow if following, otherwise follow
+        if unfollow(request.user, user_to_follow):
             return Response({
                 "message": f"You have unfollowed {user_to_follow.username}.",
                 "is_following": False
             }, status=status.HTTP_200_OK)
+        follow(request.user, user_to_follow)
+        return Response({
+            "message": f"You are now following {user_to_follow.username}!",
+            "is_following": True
+        }, status=status.HTTP_200_OK)
+
+    @idempotent
+    def put(self, request, username):
+        """Follow"""
+        user_to_follow = get_object_or_404(User, username=username)
+
+        # Can't follow yourself
+        if user_to_follow == request.user:
+            return self.self_follow_error()
+
+        if follow(request.user, user_to_follow):
+            message = f"You are now following {user_to_follow.username}!"
         else:
-            # Follow
-            request.user.following.add(user_to_follow)
-            return Response({
-                "message": f"You are now following {user_to_follow.username}!",
-                "is_following": True
-            }, status=status.HTTP_200_OK)
+            message = f"You are already following {user_to_follow.username}."
+        return Response({
+            "message": message,
+            "is_following": True
+        }, status=status.HTTP_200_OK)
+
+    @idempotent
+    def delete(self, request, username):
+        """Unfollow"""
+        user_to_unfollow = get_object_or_404(User, username=username)
+
+        # You never follow yourself, so there is nothing to unfollow
+        if user_to_unfollow == request.user:
+            return self.self_follow_error()
+
+        if unfollow(request.user, user_to_unfollow):
+            message = f"You have unfollowed {user_to_unfollow.username}."
+        else:
+            message = f"You are not following {user_to_unfollow.username}."
+        return Response({
+            "message": message,
+            "is_following": False
+        }, status=status.HTTP_200_OK)
+
+
+class FollowStateView(APIView):
+    # """
+    # POST: Whether the current user follows each of up to MAX_STATE_BATCH
+    # usernames, in place of one GET per user
+    # """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = FollowStateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # One IN query per table: users, follows
+        usernames = list(dict.fromkeys(serializer.validated_data['usernames']))
+        rows = (
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'id'))
+        # MySQL's default collation matches usernames regardless of case,
+        # so rows are found by the stored name or, failing that, lowercased
+        stored = {}
+        for username, pk in rows:
+            stored.setdefault(username.lower(), pk)
+            stored[username] = pk
+        ids = {
+            name: stored.get(name, stored.get(name.lower()))
+            for name in usernames
+        }
+        state = ViewerState(request.user)
+        state.load_users(pk for pk in ids.values() if pk is not None)
+
+        return Response({
+            "users": [
+                {
+                    "username": username,
+                    "is_following": state.is_following(pk),
+                }
+                for username, pk in ids.items() if pk is not None
+            ],
+            "missing": [name for name, pk in ids.items() if pk is None]
+        })
 
  
-class FollowersListView(generics.ListAPIView):
+class FollowersListView(CompiledListMixin, AsyncReadMixin, generics.ListAPIView):
     # """
     # GET: List all followers of a user 
     # """
     serializer_class = FollowSerializer
+    pagination_mode = None
 
     def get_queryset(self):
         username = self.kwargs.get('username')
@@ -125,21 +214,48 @@ class FollowersListView(generics.ListAPIView):
     def list(self, request, *args, **kwargs):
         username = self.kwargs.get('username')
         user = get_object_or_404(User, username=username)
-        queryset = self.get_queryset()
+        queryset = self.compiled_queryset(user.followers.all())
+
+        # Keyset pages on request (?paginate=cursor), full list otherwise
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
 
         return Response({
             "user": username,
-            "followers_count": queryset.count(),
+            "followers_count": user.followers_count,
             "followers": serializer.data
         })
 
+    async def alist(self, request, *args, **kwargs):
+        username = self.kwargs.get('username')
+        user = await aget_object_or_404(User, username=username)
+        queryset = self.compiled_queryset(user.followers.all())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            data = await self.aserialize(page, many=True)
+            return self.get_paginated_response(data)
+
+        users = [user async for user in queryset]
+        data = await self.aserialize(users, many=True)
+
+        return Response({
+            "user": username,
+            "followers_count": user.followers_count,
+            "followers": data
+        })
+
 
-class FollowingListView(generics.ListAPIView):
+class FollowingListView(CompiledListMixin, AsyncReadMixin, generics.ListAPIView):
     # """
     # GET: List all users that a user is following
     # """
     serializer_class = FollowSerializer
+    pagination_mode = None
 
     def get_queryset(self):
         username = self.kwargs.get('username')
@@ -149,11 +265,77 @@ class FollowingListView(generics.ListAPIView):
     def list(self, request, *args, **kwargs):
         username = self.kwargs.get('username')
         user = get_object_or_404(User, username=username)
-        queryset = self.get_queryset()
+        queryset = self.compiled_queryset(user.following.all())
+
+        # Keyset pages on request (?paginate=cursor), full list otherwise
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
 
         return Response({
             "user": username,
-            "following_count": queryset.count(),
+            "following_count": user.following_count,
             "following": serializer.data
         })
+
+    async def alist(self, request, *args, **kwargs):
+        username = self.kwargs.get('username')
+        user = await aget_object_or_404(User, username=username)
+        queryset = self.compiled_queryset(user.following.all())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            data = await self.aserialize(page, many=True)
+            return self.get_paginated_response(data)
+
+        users = [user async for user in queryset]
+        data = await self.aserialize(users, many=True)
+
+        return Response({
+            "user": username,
+            "following_count": user.following_count,
+            "following": data
+        })
+
+
+class MutualFollowsView(generics.ListAPIView):
+    # """
+    # GET: Users who follow a user and are followed back by them
+    # """
+    serializer_class = FollowSerializer
+
+    def get_queryset(self):
+        user = get_object_or_404(User, username=self.kwargs['username'])
+        return graph.mutual_follows(user)
+
+
+class FollowedByFollowingView(generics.ListAPIView):
+    # """
+    # GET: People you follow who also follow this user
+    # """
+    serializer_class = FollowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = get_object_or_404(User, username=self.kwargs['username'])
+        return graph.followed_by_following(self.request.user, user)
+
+
+class FollowSuggestionsView(APIView):
+    # """
+    # GET: Users followed by the people you follow, most shared first
+    # """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        limit = query_limit(
+            request, graph.SUGGESTION_LIMIT, graph.MAX_SUGGESTION_LIMIT)
+        users = graph.follow_suggestions(request.user, limit=limit)
+        serializer = FollowSuggestionSerializer(
+            users, many=True, context={'request': request})
+        return Response({
+            "suggestions": serializer.data
+        })